@@ -1,16 +1,17 @@
 import asyncio
 from datetime import datetime, timezone
-from typing import Tuple, Mapping, Sequence, Optional
+from typing import Tuple, Mapping, Sequence, Optional, Dict, AsyncIterator, Iterator
 
 from aiobungie import GameMode
 from clan_stats.clan_manager import ClanMembershipDatabase, AccountType, Member
 from clan_stats.clan_manager.membership_database import MembershipDatabase
-from clan_stats.data.retrieval.data_retriever import DataRetriever
+from clan_stats.data.retrieval.data_retriever import DataRetriever, DEFAULT_MAX_CONCURRENT_PLAYERS
 from clan_stats.data.types.activities import Activity
 from clan_stats.data.types.clan import Clan
 from clan_stats.data.types.individuals import MinimalPlayer, GroupMinimalPlayer
+from clan_stats.report_output import ReportOutput, MemberRow
 from clan_stats.terminal import term, MessageType
-from clan_stats.util.async_utils import collect_map
+from clan_stats.util.async_utils import merge_async_iterators, ResultStatus
 from clan_stats.util.itertools import not_empty, only
 from clan_stats.util.optional import require_else, require
 from clan_stats.util.set_helpers import find_differences
@@ -19,27 +20,20 @@ from clan_stats.util.set_helpers import find_differences
 def activity_summary(clan_id: int,
                      data_retriever: DataRetriever,
                      sort_by: str = "name",
-                     activity_mode: GameMode = GameMode.NONE):
-    clan, last_active = asyncio.run(_fetch_clan_data(data_retriever, clan_id, activity_mode))
-
-    clan_database = ClanMembershipDatabase(MembershipDatabase(ClanMembershipDatabase.path(clan_id)))
+                     activity_mode: GameMode = GameMode.NONE,
+                     output: Optional[ReportOutput] = None):
+    clan, last_active = asyncio.run(fetch_clan_data(data_retriever, clan_id, activity_mode))
+    if output is None:
+        print_activity_summary(clan, last_active, sort_by)
+    else:
+        output.write_all(member_rows(clan, last_active, sort_by))
 
-    found, missing, new_unknown = _find_discrepancies(clan, clan_database)
 
-    if sort_by == "name":
-        def name_key(player: MinimalPlayer):
-            return player.name.lower()
+def print_activity_summary(clan: Clan, last_active: Mapping[str, Optional[datetime]], sort_by: str = "name"):
+    clan_database = ClanMembershipDatabase(MembershipDatabase(ClanMembershipDatabase.path(clan.id)))
 
-        sorted_players = list(sorted(found, key=name_key))
-    elif sort_by == "active":
-        sorted_players = _sort_by_last_active(found, last_active)
-    elif sort_by == "discord":
-        def discord_sort_key(player: MinimalPlayer) -> str:
-            return clan_database.get_discord_name(player.primary_membership.membership_id).lower()
-
-        sorted_players = list(sorted(found, key=discord_sort_key))
-    else:
-        raise ValueError(f"Sort option {sort_by} unknown")
+    found, missing, new_unknown = _find_discrepancies(clan, clan_database)
+    sorted_players = _sort_players(found, last_active, clan_database, sort_by)
 
     term.print(MessageType.TEXT,
                f"Total members: {len(list(clan_database.current_members()))}, players in the bungie clan: {len(clan.players)}  ")
@@ -63,6 +57,59 @@ def activity_summary(clan_id: int,
         term.print_player_line(player, discord_name=join_date)
 
 
+def member_rows(clan: Clan, last_active: Mapping[str, Optional[datetime]], sort_by: str = "name"
+                ) -> Iterator[MemberRow]:
+    """The members of the Bungie clan and of the clan membership database, found in both first."""
+    clan_database = ClanMembershipDatabase(MembershipDatabase(ClanMembershipDatabase.path(clan.id)))
+
+    found, missing, new_unknown = _find_discrepancies(clan, clan_database)
+
+    for player in _sort_players(found, last_active, clan_database, sort_by):
+        yield MemberRow(clan_id=clan.id,
+                        player=player.name,
+                        membership_id=player.primary_membership.membership_id,
+                        discord_name=clan_database.get_discord_name(player.primary_membership.membership_id),
+                        last_active=last_active[player.name],
+                        in_bungie_clan=True,
+                        in_clan_database=True)
+    for member in sorted(missing, key=lambda m: require(m.bungie_name())):
+        yield MemberRow(clan_id=clan.id,
+                        player=require(member.bungie_name()),
+                        membership_id=require(member.bungie_id()),
+                        discord_name=member.discord_name(),
+                        last_active=None,
+                        in_bungie_clan=False,
+                        in_clan_database=True)
+    for player in sorted(new_unknown, key=lambda x: x.primary_membership.membership_id):
+        yield MemberRow(clan_id=clan.id,
+                        player=player.name,
+                        membership_id=player.primary_membership.membership_id,
+                        discord_name=None,
+                        last_active=last_active.get(player.name, player.last_online),
+                        in_bungie_clan=True,
+                        in_clan_database=False)
+
+
+def _sort_players(players: Sequence[GroupMinimalPlayer],
+                  last_active: Mapping[str, Optional[datetime]],
+                  clan_database: ClanMembershipDatabase,
+                  sort_by: str) -> Sequence[GroupMinimalPlayer]:
+    if sort_by == "name":
+        def name_key(player: MinimalPlayer):
+            return player.name.lower()
+
+        return list(sorted(players, key=name_key))
+    elif sort_by == "active":
+        return _sort_by_last_active(players, last_active)
+    elif sort_by == "discord":
+        def discord_sort_key(player: MinimalPlayer) -> str:
+            return clan_database.get_discord_name(player.primary_membership.membership_id).lower()
+
+        return list(sorted(players, key=discord_sort_key))
+    else:
+        raise ValueError(f"Sort option {sort_by} unknown")
+
+
 def _find_discrepancies(clan: Clan, clan_database: ClanMembershipDatabase
                         ) -> Tuple[Sequence[GroupMinimalPlayer], Sequence[Member], Sequence[GroupMinimalPlayer]]:
     differences = find_differences(
@@ -84,19 +131,8 @@ def _sort_by_last_active(players: Sequence[MinimalPlayer],
     return list(sorted(players, key=last_active_key))
 
 
-async def _get_most_recently_active(player_activities: Mapping[str, Optional[Sequence[Activity]]]
-                                    ) -> Mapping[str, Optional[datetime]]:
-    result = {}
-    for name, activities in player_activities.items():
-        if activities is None or len(activities) == 0:
-            result[name] = None
-        else:
-            result[name] = max(a.time_period.start for a in activities)
-    return result
-
-
-async def _fetch_clan_data(data_retriever: DataRetriever, clan_id: int, mode: GameMode = GameMode.NONE
-                           ) -> Tuple[Clan, Mapping[str, Optional[datetime]]]:
+async def fetch_clan_data(data_retriever: DataRetriever, clan_id: int, mode: GameMode = GameMode.NONE
+                          ) -> Tuple[Clan, Mapping[str, Optional[datetime]]]:
     async with data_retriever:
         clan = await data_retriever.get_clan(clan_id)
         last_active = await get_most_recent_activity(data_retriever, clan.players, mode=mode)
@@ -107,6 +143,34 @@ async def get_most_recent_activity(data_retriever: DataRetriever,
                                    players: Sequence[MinimalPlayer],
                                    mode: GameMode = GameMode.NONE
                                    ) -> Mapping[str, Optional[datetime]]:
-    player_activities = await collect_map({p.name: data_retriever.get_activities_for_player(p, mode=mode)
-                                           for p in players})
-    return await _get_most_recently_active(player_activities)
+    if mode == GameMode.NONE:
+        # The profiles say when each player last played, without retrieving their histories.
+        last_played = await data_retriever.get_last_played_for_player_list(players)
+        for player_name, result in last_played.items():
+            if result.status == ResultStatus.PRIVATE:
+                term.warning(f"Profile of {player_name} is private")
+            elif result.status == ResultStatus.ERROR:
+                term.warning(f"Could not retrieve when {player_name} last played: {result.error}")
+        return {player_name: result.value for player_name, result in last_played.items()}
+
+    # Only the latest start of an activity in the mode is kept for each player, so the activities are folded in
+    # as each page arrives.
+    result: Dict[str, Optional[datetime]] = {p.name: None for p in players}
+    async for player, activities in merge_async_iterators(
+            ((p, _warn_on_error(p, data_retriever.iter_activities_for_player(p, mode=mode))) for p in players),
+            DEFAULT_MAX_CONCURRENT_PLAYERS):
+        latest = max(a.time_period.start for a in activities)
+        if result[player.name] is None or latest > result[player.name]:
+            result[player.name] = latest
+    return result
+
+
+async def _warn_on_error(player: MinimalPlayer,
+                         activities: AsyncIterator[Sequence[Activity]]
+                         ) -> AsyncIterator[Sequence[Activity]]:
+    # One player's failure leaves their last activity unknown rather than losing the whole report.
+    try:
+        async for batch in activities:
+            yield batch
+    except Exception as e:
+        term.warning(f"Could not retrieve activities of {player.name}: {e}")
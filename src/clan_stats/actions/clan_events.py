@@ -1,13 +1,16 @@
 import asyncio
 from collections import defaultdict
 from datetime import timedelta, datetime, timezone
-from typing import Sequence, Dict, List, Tuple
+from pathlib import Path
+from typing import Sequence, Dict, List, Tuple, Optional, Iterator
 
 from clan_stats.data.manifest import Manifest
 from clan_stats.data.retrieval.data_retriever import DataRetriever
 from clan_stats.event.event_finder import find_events, Event
+from clan_stats.event.fireteam_history import FireteamHistory
 from clan_stats.event.fireteams import SharedFireteamFinder
 from clan_stats.fireteams import Fireteam
+from clan_stats.report_output import ReportOutput, ClanEventRow
 from clan_stats.terminal import MessageType, term
 from clan_stats.data.types.individuals import Player, MinimalPlayer
 from clan_stats.util.time import format_time_period_weekday_and_time, TimePeriod
@@ -17,12 +20,25 @@ def recent_clan_events(clan_id: int,
                        data_retriever: DataRetriever,
                        recency_days: int = 30,
                        min_clan_fireteam_members: int = 3,
-                       min_event_length: timedelta = timedelta(minutes=45)) -> None:
+                       min_event_length: timedelta = timedelta(minutes=45),
+                       history_directory: Path = Path("cache"),
+                       pgcr_budget: int = 0,
+                       output: Optional[ReportOutput] = None) -> None:
     recency_limit = datetime.now(timezone.utc) - timedelta(days=recency_days)
 
     shared_fireteams, players_in_range, manifest = asyncio.run(
-        _get_data(data_retriever, clan_id, recency_limit, min_clan_fireteam_members))
-
+        get_event_data(data_retriever, clan_id, recency_limit, min_clan_fireteam_members, history_directory,
+                       pgcr_budget))
+    if output is None:
+        print_clan_events(shared_fireteams, players_in_range, manifest, min_event_length)
+    else:
+        output.write_all(clan_event_rows(clan_id, shared_fireteams, manifest, min_event_length))
+
+
+def print_clan_events(shared_fireteams: Sequence[Fireteam],
+                      players_in_range: Sequence[MinimalPlayer],
+                      manifest: Manifest,
+                      min_event_length: timedelta = timedelta(minutes=45)) -> None:
     term.print(MessageType.SECTION, "Bungie Clan Members active in the time range:")
     for player in players_in_range:
         term.print_player_line(player)
@@ -53,21 +69,39 @@ def recent_clan_events(clan_id: int,
     term.print_columnar_list([f"{k} ({v})" for k, v in all_participants.items()])
 
 
-async def _get_data(data_retriever: DataRetriever,
-                    clan_id: int,
-                    recency_limit: datetime,
-                    min_clan_fireteam_members: int
-                    ) -> Tuple[Sequence[Fireteam], Sequence[MinimalPlayer], Manifest]:
-    async with data_retriever:
+def clan_event_rows(clan_id: int,
+                    shared_fireteams: Sequence[Fireteam],
+                    manifest: Manifest,
+                    min_event_length: timedelta = timedelta(minutes=45)) -> Iterator[ClanEventRow]:
+    for event in find_events(shared_fireteams, min_length=min_event_length):
+        # Named for its longest activity
+        activity = manifest.get_activity_name(event.highlight_activities()[0].director_activity_hash)
+        for name in sorted(event.participants_names()):
+            yield ClanEventRow(clan_id=clan_id, start=event.start(), end=event.end(), activity=activity, player=name)
+
+
+async def get_event_data(data_retriever: DataRetriever,
+                         clan_id: int,
+                         recency_limit: datetime,
+                         min_clan_fireteam_members: int,
+                         history_directory: Path,
+                         pgcr_budget: int
+                         ) -> Tuple[Sequence[Fireteam], Sequence[MinimalPlayer], Manifest]:
+    async with data_retriever, asyncio.TaskGroup() as tasks:
+        # The manifest downloads while the clan's activities are retrieved
+        manifest = tasks.create_task(data_retriever.get_manifest())
         clan = await data_retriever.get_clan(clan_id)
-        manifest = await data_retriever.get_manifest()
         players_in_range = list(p
                                 for p in clan.players
                                 if p.last_online > recency_limit)
 
-        shared_fireteams: Sequence[Fireteam] = await SharedFireteamFinder(data_retriever).shared_fireteams(
-            players_in_range,
-            recency_limit=recency_limit,
-            min_size=min_clan_fireteam_members)
+        with FireteamHistory(FireteamHistory.path(clan_id, history_directory)) as history:
+            shared_fireteams: Sequence[Fireteam] = await SharedFireteamFinder(data_retriever).clan_fireteams(
+                history,
+                players_in_range,
+                recency_limit=recency_limit,
+                min_size=min_clan_fireteam_members,
+                clan_members=clan.players,
+                pgcr_budget=pgcr_budget)
 
-    return shared_fireteams, players_in_range, manifest
+    return shared_fireteams, players_in_range, manifest.result()
@@ -1,15 +1,19 @@
 import asyncio
 from datetime import timedelta, datetime, timezone
+from pathlib import Path
 from logging import getLogger
-from typing import Sequence, Set, Tuple, Optional, Mapping
+from typing import Sequence, Set, Tuple, Optional, Mapping, Iterator
 
 from clan_stats.actions.activity_check import get_most_recent_activity
 from clan_stats.data.manifest import Manifest
 from clan_stats.data.retrieval.data_retriever import DataRetriever
+from clan_stats.data.types.activities import ActivityWithPost
 from clan_stats.data.types.clan import Clan
-from clan_stats.data.types.individuals import Player, MinimalPlayer
+from clan_stats.data.types.individuals import Player, MinimalPlayer, GroupMinimalPlayer
+from clan_stats.event.fireteam_history import FireteamHistory
 from clan_stats.event.fireteams import SharedFireteamFinder
 from clan_stats.fireteams import Fireteam
+from clan_stats.report_output import ReportOutput, ClanFireteamRow
 from clan_stats.terminal import term, MessageType
 from clan_stats.util.async_utils import collect_map
 from clan_stats.util.time import format_time_weekday_and_time
@@ -20,12 +24,26 @@ log = getLogger(__name__)
 def recent_clan_fireteams_summary(data_retriever: DataRetriever,
                                   clan_id: int,
                                   recency_days: int = 30,
-                                  min_clan_fireteam_members=2):
+                                  min_clan_fireteam_members=2,
+                                  history_directory: Path = Path("cache"),
+                                  pgcr_budget: int = 0,
+                                  output: Optional[ReportOutput] = None):
     recency_limit = datetime.now(timezone.utc) - timedelta(days=recency_days)
 
     clan, players_in_range, shared_fireteams, last_active, manifest \
-        = asyncio.run(_get_data(data_retriever, clan_id, recency_limit, min_clan_fireteam_members))
-
+        = asyncio.run(get_fireteam_data(data_retriever, clan_id, recency_limit, min_clan_fireteam_members,
+                                        history_directory, pgcr_budget))
+    if output is None:
+        print_clan_fireteams(clan, players_in_range, shared_fireteams, last_active, manifest)
+    else:
+        output.write_all(clan_fireteam_rows(clan, shared_fireteams, manifest))
+
+
+def print_clan_fireteams(clan: Clan,
+                         players_in_range: Sequence[MinimalPlayer],
+                         shared_fireteams: Sequence[Fireteam],
+                         last_active: Mapping[str, Optional[datetime]],
+                         manifest: Manifest):
     term.print(MessageType.SECTION, f"Clan Fireteam report for {clan.name}")
 
     term.print(MessageType.SECTION, "Bungie Clan Members active in the time range:")
@@ -59,33 +77,50 @@ def recent_clan_fireteams_summary(data_retriever: DataRetriever,
         inactive)
 
 
-async def _get_data(
+def clan_fireteam_rows(clan: Clan, shared_fireteams: Sequence[Fireteam], manifest: Manifest
+                       ) -> Iterator[ClanFireteamRow]:
+    for fireteam in sorted(shared_fireteams, key=lambda f: f.activity.time_period.start):
+        activity_name = manifest.get_activity_name(fireteam.activity.director_activity_hash)
+        for member_name in sorted(fireteam.member_names):
+            yield ClanFireteamRow(clan_id=clan.id,
+                                  instance_id=fireteam.activity.instance_id,
+                                  activity=activity_name,
+                                  start=fireteam.activity.time_period.start,
+                                  player=member_name)
+
+
+async def get_fireteam_data(
         data_retriever: DataRetriever,
         clan_id: int,
         recency_limit: datetime,
-        min_clan_fireteam_members: int
+        min_clan_fireteam_members: int,
+        history_directory: Path,
+        pgcr_budget: int
 ) -> Tuple[Clan, Sequence[MinimalPlayer], Sequence[Fireteam], Mapping[str, Optional[datetime]], Manifest]:
-    async with data_retriever:
+    async with data_retriever, asyncio.TaskGroup() as tasks:
+        # The manifest downloads while the clan's activities are retrieved
+        manifest = tasks.create_task(data_retriever.get_manifest())
         clan = await data_retriever.get_clan(clan_id)
-        players_in_range: Sequence[MinimalPlayer] = list(
+        players_in_range: Sequence[GroupMinimalPlayer] = list(
             p
             for p in clan.players
             if p.last_online is not None and p.last_online > recency_limit)
 
-        manifest = await data_retriever.get_manifest()
-
         last_active = await get_most_recent_activity(data_retriever, players_in_range)
 
-        shared_fireteams = await SharedFireteamFinder(data_retriever).shared_fireteams(
-            players_in_range,
-            recency_limit=recency_limit,
-            min_size=min_clan_fireteam_members)
+        with FireteamHistory(FireteamHistory.path(clan_id, history_directory)) as history:
+            shared_fireteams = await SharedFireteamFinder(data_retriever).clan_fireteams(
+                history,
+                players_in_range,
+                recency_limit=recency_limit,
+                min_size=min_clan_fireteam_members,
+                clan_members=clan.players,
+                pgcr_budget=pgcr_budget)
 
-    return clan, players_in_range, shared_fireteams, last_active, manifest
+    return clan, players_in_range, shared_fireteams, last_active, manifest.result()
 
 
-def is_activity_with_clanmates(activity, player, clan):
-    teammates = list(p for p in activity.post_activity.players if p.member_id != player.member_id)
-    activity_member_ids = set(p.member_id for p in activity.post_activity.players)
-    clan_member_ids = (p.member_id for p in clan.players)
-    return len(activity_member_ids.intersection(clan_member_ids)) > 0
+def is_activity_with_clanmates(activity: ActivityWithPost, player: MinimalPlayer, clan: Clan) -> bool:
+    return any(clan.is_member(p.primary_membership.membership_id)
+               for p in activity.players
+               if p != player)
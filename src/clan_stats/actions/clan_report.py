@@ -0,0 +1,149 @@
+import asyncio
+from datetime import timedelta, datetime
+from pathlib import Path
+from typing import NamedTuple, Sequence, Mapping, Optional, Dict, Callable
+
+from clan_stats.actions.activity_check import fetch_clan_data, print_activity_summary, member_rows
+from clan_stats.actions.clan_events import get_event_data, print_clan_events, clan_event_rows
+from clan_stats.actions.clan_fireteams import get_fireteam_data, print_clan_fireteams, clan_fireteam_rows
+from clan_stats.actions.raid_report import count_clan_raid_clears, print_raid_clears, raid_clear_rows
+from clan_stats.data.manifest import Manifest
+from clan_stats.data.raid_clears import RaidClears
+from clan_stats.data.retrieval.data_retriever import DataRetriever
+from clan_stats.data.retrieval.shared_data_retriever import SharedDataRetriever
+from clan_stats.data.types.activities import Activity
+from clan_stats.data.types.clan import Clan
+from clan_stats.data.types.individuals import MinimalPlayer
+from clan_stats.event.fireteam_history import FireteamHistory
+from clan_stats.fireteams import Fireteam
+from clan_stats.report_output import ReportOutput
+from clan_stats.terminal import term, MessageType
+from clan_stats.util.async_utils import Result
+from clan_stats.util.time import now
+
+
+class _ClanReports(NamedTuple):
+    clan: Clan
+    manifest: Manifest
+    last_active: Mapping[str, Optional[datetime]]
+    players_in_range: Sequence[MinimalPlayer]
+    fireteams: Sequence[Fireteam]
+    event_fireteams: Sequence[Fireteam]
+    event_players: Sequence[MinimalPlayer]
+    raid_results: Mapping[str, Result[Sequence[Activity]]]
+
+
+def report_all(clan_ids: Sequence[int],
+               data_retriever: DataRetriever,
+               recency_days: int = 30,
+               min_clan_fireteam_members: int = 2,
+               cache_directory: Path = Path("cache"),
+               pgcr_budget: int = 0,
+               min_event_length: timedelta = timedelta(minutes=45),
+               output: Optional[ReportOutput] = None) -> None:
+    """Print the member activities, clan fireteams, clan events and raid clears reports of each clan together.
+
+    The manifest and the clans are retrieved once for all the reports, rather than once by each, and the activities
+    and PGCRs of players in more than one of the clans once for all the clans. Each clan's reports are printed, or
+    written to `output`, as soon as they are complete.
+    """
+    recency_limit = now() - timedelta(days=recency_days)
+    # Each clan reported once, in the order given
+    clan_ids = list(dict.fromkeys(clan_ids))
+
+    with RaidClears(RaidClears.path(cache_directory)) as raid_clears:
+
+        def write_reports(reports: _ClanReports) -> None:
+            raid_counts = {player.name: raid_clears.clears(player.primary_membership.membership_id)
+                           for player in reports.clan.players}
+            if output is not None:
+                output.write_all(member_rows(reports.clan, reports.last_active))
+                output.write_all(clan_fireteam_rows(reports.clan, reports.fireteams, reports.manifest))
+                output.write_all(clan_event_rows(reports.clan.id, reports.event_fireteams, reports.manifest,
+                                                 min_event_length))
+                output.write_all(raid_clear_rows(reports.clan.id, raid_counts))
+                return
+            if len(clan_ids) > 1:
+                term.print(MessageType.SECTION, f"Reports for {reports.clan.name}")
+            print_activity_summary(reports.clan, reports.last_active)
+            print_clan_fireteams(reports.clan, reports.players_in_range, reports.fireteams, reports.last_active,
+                                 reports.manifest)
+            print_clan_events(reports.event_fireteams, reports.event_players, reports.manifest, min_event_length)
+            print_raid_clears(raid_counts, reports.raid_results)
+
+        asyncio.run(_get_reports(SharedDataRetriever(data_retriever), clan_ids, recency_limit,
+                                 min_clan_fireteam_members, cache_directory, pgcr_budget, raid_clears,
+                                 on_reports=write_reports))
+
+
+async def _get_reports(data_retriever: SharedDataRetriever,
+                       clan_ids: Sequence[int],
+                       recency_limit: datetime,
+                       min_clan_fireteam_members: int,
+                       cache_directory: Path,
+                       pgcr_budget: int,
+                       raid_clears: RaidClears,
+                       on_reports: Callable[[_ClanReports], None]) -> None:
+    """Get the reports of each clan in turn, giving each clan's to `on_reports` as soon as they are complete."""
+    async with data_retriever, asyncio.TaskGroup() as tasks:
+        # The manifest downloads while the clans and activities are retrieved
+        tasks.create_task(data_retriever.get_manifest())
+        clans = await asyncio.gather(*[data_retriever.get_clan(clan_id) for clan_id in clan_ids])
+        await _retrieve_activities(data_retriever, clans, recency_limit, cache_directory, raid_clears)
+
+        # Each report now reads what it needs from the shared retriever
+        for clan in clans:
+            on_reports(await _get_clan_reports(data_retriever, clan, recency_limit, min_clan_fireteam_members,
+                                               cache_directory, pgcr_budget, raid_clears))
+
+
+async def _get_clan_reports(data_retriever: SharedDataRetriever,
+                            clan: Clan,
+                            recency_limit: datetime,
+                            min_clan_fireteam_members: int,
+                            cache_directory: Path,
+                            pgcr_budget: int,
+                            raid_clears: RaidClears) -> _ClanReports:
+    _, last_active = await fetch_clan_data(data_retriever, clan.id)
+    _, players_in_range, fireteams, _, manifest = await get_fireteam_data(
+        data_retriever, clan.id, recency_limit, min_clan_fireteam_members, cache_directory, pgcr_budget)
+    event_fireteams, event_players, _ = await get_event_data(
+        data_retriever, clan.id, recency_limit, min_clan_fireteam_members, cache_directory, pgcr_budget)
+    _, raid_results = await count_clan_raid_clears(data_retriever, clan.id, raid_clears)
+
+    return _ClanReports(clan=clan,
+                        manifest=manifest,
+                        last_active=last_active,
+                        players_in_range=players_in_range,
+                        fireteams=fireteams,
+                        event_fireteams=event_fireteams,
+                        event_players=event_players,
+                        raid_results=raid_results)
+
+
+async def _retrieve_activities(data_retriever: SharedDataRetriever,
+                               clans: Sequence[Clan],
+                               recency_limit: datetime,
+                               cache_directory: Path,
+                               raid_clears: RaidClears) -> None:
+    """Retrieve the activities of each player, once however many of the clans they are in, from the earliest date
+    any of the reports needs them."""
+    # Keyed by name, as get_activities_for_player_list keys the start dates
+    players: Dict[str, MinimalPlayer] = dict()
+    min_start_dates: Dict[str, datetime] = dict()
+    for clan in clans:
+        with FireteamHistory(FireteamHistory.path(clan.id, cache_directory)) as history:
+            fireteam_search_start = history.search_start(recency_limit)
+
+        for player in clan.players:
+            start = raid_clears.search_start(player.primary_membership.membership_id)
+            if player.last_online is not None and player.last_online > fireteam_search_start:
+                start = min(start, fireteam_search_start)
+            players.setdefault(player.name, player)
+            min_start_dates[player.name] = min(start, min_start_dates.get(player.name, start))
+
+    await data_retriever.get_activities_for_player_list(
+        list(players.values()),
+        min_start_dates=min_start_dates,
+        on_progress=lambda done, total: term.progress(f"Retrieved activities for {done} of {total} players"))
+    term.clear_bol()
@@ -21,6 +21,7 @@ from clan_stats.clan_manager import ClanMembershipDatabase, AccountType, Member,
 from clan_stats.clan_manager.clan_membership_database import find_unknown_players
 from clan_stats.clan_manager.membership_database import MembershipDatabase
 from clan_stats.data._bungie_api.bungie_enums import GameMode
+from clan_stats.data.retrieval import Priority, request_priority
 from clan_stats.data.retrieval.data_retriever import DataRetriever
 from clan_stats.data.types.clan import Clan
 from clan_stats.data.types.individuals import GroupMinimalPlayer
@@ -587,7 +588,8 @@ def truncate_str(text: str, length: int) -> str:
 async def _fetch_clan_data(data_retriever: DataRetriever, clan_id: int, mode: GameMode = GameMode.NONE
                            ) -> Clan:
     # ) -> Tuple[Clan, Mapping[str, Optional[datetime]]]:
-    async with data_retriever:
-        clan = await data_retriever.get_clan(clan_id)
+    with request_priority(Priority.INTERACTIVE):
+        async with data_retriever:
+            clan = await data_retriever.get_clan(clan_id)
         # last_active = await get_most_recent_activity(data_retriever, clan.players, mode=mode)
     return clan
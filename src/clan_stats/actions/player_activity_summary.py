@@ -1,52 +1,90 @@
 import asyncio
+import contextlib
 import logging
-from datetime import timedelta
-from typing import Sequence, Tuple
+from typing import Sequence, Tuple, Optional
 
 from clan_stats.data.manifest import Manifest
+from clan_stats.data.retrieval import Priority, request_priority
 from clan_stats.data.retrieval.data_retriever import DataRetriever
-from clan_stats.data.types.activities import ActivityWithPost, filter_activities_by_date
+from clan_stats.data.types.activities import Activity, filter_activities_by_date
 from clan_stats.data.types.clan import Clan
 from clan_stats.data.types.individuals import Player
+from clan_stats.report_output import ReportOutput, PlayerActivityRow
 from clan_stats.terminal import term, MessageType
-from clan_stats.util.time import now, days_ago
+from clan_stats.util.async_utils import bounded_in_order
+from clan_stats.util.time import days_ago
 
 logger = logging.getLogger(__name__)
 
-def activity_summary(data_retriever: DataRetriever, player_id: int, days: int = 30):
-    player, clan, manifest, activities_with_post = asyncio.run(_get_data(data_retriever, player_id,
-                                                                         days))
+DEFAULT_MAX_CONCURRENT_POSTS = 10
 
-    clan_member_ids = _clan_member_ids_without_player(clan, player)
 
-    term.print(MessageType.SUMMARY, f"Player activity report for {player.name}")
+def activity_summary(data_retriever: DataRetriever,
+                     player_id: int,
+                     days: int = 30,
+                     max_concurrent: int = DEFAULT_MAX_CONCURRENT_POSTS,
+                     output: Optional[ReportOutput] = None):
+    asyncio.run(_print_summary(data_retriever, player_id, days, max_concurrent, output))
 
-    for activity in sorted(activities_with_post, key=lambda a: a.time_period.start):
-        teammates = list(p for p in activity.players if p.primary_membership != player.primary_membership)
-        logger.debug(activity)
-        activity_is_with_clanmates = True \
-            if len(set(p.primary_membership for p in activity.players).intersection(clan_member_ids)) > 0 \
-            else False
-        term.print_activity_summary(activity, manifest, teammates, clanmates=activity_is_with_clanmates)
 
+async def _print_summary(data_retriever: DataRetriever, player_id: int, days: int, max_concurrent: int,
+                         output: Optional[ReportOutput]) -> None:
+    # Someone is waiting on this report, so its requests go ahead of any bulk work
+    with request_priority(Priority.INTERACTIVE):
+        await _print_activities(data_retriever, player_id, days, max_concurrent, output)
 
-async def _get_data(data_retriever: DataRetriever, player_id: int, days: int) -> Tuple[
-    Player, Clan, Manifest, Sequence[ActivityWithPost]]:
+
+async def _print_activities(data_retriever: DataRetriever, player_id: int, days: int, max_concurrent: int,
+                            output: Optional[ReportOutput]) -> None:
     async with data_retriever:
+        player, clan, manifest, activities = await _get_data(data_retriever, player_id, days)
+
+        clan_member_ids = _clan_member_ids_without_player(clan, player)
+
+        if output is None:
+            term.print(MessageType.SUMMARY, f"Player activity report for {player.name}")
+
+        # Posts are printed as they arrive, in start time order, with only `max_concurrent` held at a time.
+        posts = bounded_in_order(
+            (data_retriever.get_post_for_activity(a) for a in sorted(activities, key=lambda a: a.time_period.start)),
+            max_concurrent)
+        async with contextlib.aclosing(posts):
+            async for activity in posts:
+                teammates = list(p for p in activity.players if p.primary_membership != player.primary_membership)
+                logger.debug(activity)
+                activity_is_with_clanmates = True \
+                    if len(set(p.primary_membership for p in activity.players).intersection(clan_member_ids)) > 0 \
+                    else False
+                if output is None:
+                    term.print_activity_summary(activity, manifest, teammates,
+                                                clanmates=activity_is_with_clanmates)
+                else:
+                    output.write(PlayerActivityRow(
+                        player=player.name,
+                        membership_id=player.primary_membership.membership_id,
+                        instance_id=activity.instance_id,
+                        activity=manifest.get_activity_name(activity.director_activity_hash),
+                        start=activity.time_period.start,
+                        length_seconds=activity.time_period.length.total_seconds(),
+                        players=len(activity.players),
+                        with_clanmates=activity_is_with_clanmates))
+
+
+async def _get_data(data_retriever: DataRetriever, player_id: int, days: int) -> Tuple[
+    Player, Clan, Manifest, Sequence[Activity]]:
+    async with asyncio.TaskGroup() as tasks:
+        # The manifest downloads while the player's data is retrieved
+        manifest = tasks.create_task(data_retriever.get_manifest())
         player = await data_retriever.get_player(player_id)
         logger.debug("Minimal player for given player id %s", player)
         clan = await data_retriever.get_clan_for_player(player)
-        manifest = await data_retriever.get_manifest()
         ago = days_ago(days)
         activities = await data_retriever.get_activities_for_player(
             player,
             min_start_date=ago)
 
-        logger.debug("Limiting to %s", ago)
-        activities_with_post = await asyncio.gather(*[data_retriever.get_post_for_activity(a)
-            for a in filter_activities_by_date(activities, ago)])
-
-    return player, clan, manifest, activities_with_post
+    logger.debug("Limiting to %s", ago)
+    return player, clan, manifest.result(), filter_activities_by_date(activities, ago) or []
 
 
 def _clan_member_ids_without_player(clan, player):
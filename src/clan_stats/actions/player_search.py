@@ -1,27 +1,39 @@
 import asyncio
 import logging
-from typing import Sequence
+from typing import Sequence, Optional
 
 from clan_stats.data import trials_report_api
 from clan_stats.data.retrieval.data_retriever import DataRetriever
 from clan_stats.data.types.individuals import Player
+from clan_stats.report_output import ReportOutput, PlayerRow
 from clan_stats.terminal import term, MessageType
 
 logger = logging.getLogger(__name__)
 
 
-async def trials_report_player_search(data_retriever: DataRetriever, search_string: str) -> None:
+async def trials_report_player_search(data_retriever: DataRetriever,
+                                      search_string: str,
+                                      output: Optional[ReportOutput] = None) -> None:
     players = await trials_report_api.search_players(search_string)
 
     players = await asyncio.gather(*[
         data_retriever.get_player(int(p.membershipId)) for p in players])
 
-    print_players(players, search_string)
+    if output is None:
+        print_players(players, search_string)
+    else:
+        write_players(output, players, search_string)
 
 
-def bungie_player_search(data_retriever: DataRetriever, search_string: str) -> None:
+def bungie_player_search(data_retriever: DataRetriever,
+                         search_string: str,
+                         output: Optional[ReportOutput] = None) -> None:
     players = asyncio.run(_get_data(data_retriever, search_string))
 
+    if output is not None:
+        write_players(output, players, search_string)
+        return
+
     if len(players) == 0:
         term.print(MessageType.SUMMARY, f"No players found for search '{search_string}'")
         return
@@ -41,6 +53,23 @@ def print_players(players: Sequence[Player], search_string: str) -> None:
                            + f"{membership.platform_display_name}")
 
 
+def write_players(output: ReportOutput, players: Sequence[Player], search_string: str) -> None:
+    for player in players:
+        if player.all_memberships is None:
+            output.write(PlayerRow(search=search_string,
+                                   player=player.name,
+                                   membership_id=player.primary_membership.membership_id,
+                                   platform=None,
+                                   platform_display_name=None))
+            continue
+        for platform, membership in player.all_memberships.items():
+            output.write(PlayerRow(search=search_string,
+                                   player=player.name,
+                                   membership_id=membership.membership_id,
+                                   platform=platform,
+                                   platform_display_name=membership.platform_display_name))
+
+
 async def _get_data(data_retriever: DataRetriever, search_string: str) -> Sequence[Player]:
     async with data_retriever:
         players = await data_retriever.find_players(search_string)
@@ -1,8 +1,8 @@
 import asyncio
-from collections import defaultdict
-from datetime import datetime, timezone
-from enum import StrEnum
-from typing import Tuple, Mapping, Sequence, Optional
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Tuple, Mapping, Sequence, Optional, Any, Iterator
 
 from math import log10, floor
 from textual import events
@@ -11,20 +11,56 @@ from textual.coordinate import Coordinate
 from textual.widgets import Header, DataTable, Footer
 
 from aiobungie import GameMode
+from clan_stats.data.activity_classification import Raid, ModeFamily
 from clan_stats.data.manifest import Manifest
+from clan_stats.data.raid_clears import RaidClears
 from clan_stats.data.retrieval.data_retriever import DataRetriever
-from clan_stats.data.types.activities import Activity
+from clan_stats.data.types.activities import Activity, ActivityCompletions
 from clan_stats.data.types.clan import Clan
 from clan_stats.data.types.individuals import MinimalPlayer
+from clan_stats.report_output import ReportOutput, RaidClearsRow
 from clan_stats.terminal import term
-from clan_stats.util.async_utils import collect_map
+from clan_stats.util.async_utils import Result, ResultStatus
+from clan_stats.util.time import now
+
+
+def clears(clan_id: int,
+           data_retriever: DataRetriever,
+           sort_by: str = "name",
+           interactive=False,
+           since: Optional[datetime] = None,
+           cache_directory: Path = Path("cache"),
+           aggregate_stats: bool = False,
+           output: Optional[ReportOutput] = None):
+    """Tabulate the raid clears of each clan member.
+
+    Clears are counted from the members' raid histories, or with `aggregate_stats` taken from each character's
+    aggregate activity stats: one request per character, but only of all time, so `since` can't be used with it.
+    """
+    if aggregate_stats:
+        if since is not None:
+            raise ValueError("Raid clears from aggregate stats can't be counted since a date")
+        raid_results, manifest = asyncio.run(_get_clan_raid_completions(data_retriever, clan_id))
+        raid_counts = {player_name: _raid_completions(result.value_or(None), manifest)
+                       for player_name, result in raid_results.items()}
+    else:
+        with RaidClears(RaidClears.path(cache_directory)) as raid_clears:
+            clan, raid_results = asyncio.run(count_clan_raid_clears(data_retriever, clan_id, raid_clears))
 
+            raid_counts = {player.name: raid_clears.clears(player.primary_membership.membership_id, since)
+                           for player in clan.players}
 
-def clears(clan_id: int, data_retriever: DataRetriever, sort_by: str = "name", interactive=False):
-    clan, raid_data, manifest = asyncio.run(_fetch_clan_raid_data(data_retriever, clan_id))
+    if output is None:
+        print_raid_clears(raid_counts, raid_results, sort_by, interactive)
+    else:
+        _warn_missing(raid_results)
+        output.write_all(raid_clear_rows(clan_id, raid_counts))
 
-    raid_counts = {player_name: _raid_counts(raids, manifest) for player_name, raids in raid_data.items()}
 
+def print_raid_clears(raid_counts: Mapping[str, Optional[Mapping[Raid, int]]],
+                      raid_results: Mapping[str, Result[Any]],
+                      sort_by: str = "name",
+                      interactive=False):
     if sort_by == "name":
         def sort_key(i: Tuple[str, Mapping[Raid, int]]):
             return i[0].lower()
@@ -36,87 +72,97 @@ def clears(clan_id: int, data_retriever: DataRetriever, sort_by: str = "name", i
 
     tabulated_counts = format_table_cells([
         ([p] + [counts[r] for r in Raid.current_raids()] + [sum(counts.values())]
-         if counts
+         if counts is not None
          else [p] + ["-" for r in Raid.current_raids()] + ["-"])
         for p, counts in sorted(raid_counts.items(), key=sort_key)
     ])
     headings = [""] + [r.name for r in Raid.current_raids()] + ["Total"]
 
+    _warn_missing(raid_results)
+
     if not interactive:
         term.print_table(headings, tabulated_counts)
     else:
         RaidReport(headings, tabulated_counts).run(loop=asyncio.new_event_loop())
 
 
-class Raid(StrEnum):
-    SE = "Salvation's Edge"
-    CROTA = "Crota's End"
-    ROOT = "Root of Nightmares"
-    KF = "King's Fall"
-    VOW = "Vow of the Disciple"
-    VOG = "Vault of Glass"
-    DSC = "Deep Stone Crypt"
-    GOS = "Garden of Salvation"
-    LW = "Last Wish"
-    LEV = "Leviathan"
-    PAN = "Pantheon"
-    COS = "Crown of Sorrow"
-    SOTP = "Scourge of the Past"
-    UNKNOWN = "Unknown?"
-
-    @classmethod
-    def current_raids(cls) -> Sequence['Raid']:
-        return [cls.SE, cls.CROTA, cls.ROOT, cls.KF, cls.VOW, cls.VOG, cls.DSC, cls.GOS, cls.LW]
-
-    @classmethod
-    def from_director_activity_hash(cls, dah: int, manifest: Manifest) -> 'Raid':
-        activity_name = manifest.get_activity_name(dah)
-        for raid in cls.__members__.values():
-            if raid.value in activity_name:
-                return raid
-            elif dah in (4103176774,):
-                return cls.UNKNOWN
-        raise KeyError(f"Unknown raid hash {dah} mapping to {activity_name}")
-
-
-async def _fetch_clan_raid_data(
+def raid_clear_rows(clan_id: int, raid_counts: Mapping[str, Optional[Mapping[Raid, int]]]) -> Iterator[RaidClearsRow]:
+    """Each player's clears of each current raid. Players whose clears couldn't be counted have no rows."""
+    for player_name, counts in sorted(raid_counts.items(), key=lambda i: i[0].lower()):
+        if counts is not None:
+            for raid in Raid.current_raids():
+                yield RaidClearsRow(clan_id=clan_id, player=player_name, raid=raid.name, clears=counts[raid])
+
+
+async def count_clan_raid_clears(
         data_retriever: DataRetriever,
-        clan_id: int
-) -> Tuple[Clan, Mapping[str, Optional[Sequence[Activity]]], Manifest]:
-    async with data_retriever:
+        clan_id: int,
+        raid_clears: RaidClears
+) -> Tuple[Clan, Mapping[str, Result[Sequence[Activity]]]]:
+    async with data_retriever, asyncio.TaskGroup() as tasks:
+        # The manifest downloads while the raids are retrieved
+        manifest = tasks.create_task(data_retriever.get_manifest())
         clan = await data_retriever.get_clan(clan_id)
-        raid_data = await _get_raids(data_retriever, clan.players)
-        manifest = await data_retriever.get_manifest()
+        searched = now()
+        raid_data = await _get_raids(data_retriever, clan.players, raid_clears)
 
-    return clan, raid_data, manifest
+    # Only the raids since each player's were last counted are retrieved, and added to their counts
+    for player in clan.players:
+        result = raid_data[player.name]
+        if result.status == ResultStatus.VALUE:
+            raid_clears.add(player.primary_membership.membership_id, result.value, manifest.result(), searched)
+
+    return clan, raid_data
 
 
 async def _get_raids(data_retriever: DataRetriever,
-                     players: Sequence[MinimalPlayer]
-                     ) -> Mapping[str, Optional[Sequence[Activity]]]:
-    player_raids = await collect_map(
-        {p.name: data_retriever.get_activities_for_player(
-            p, mode=GameMode.RAID, min_start_date=datetime(year=2022, month=1, day=1, tzinfo=timezone.utc))
-            for p in players})
+                     players: Sequence[MinimalPlayer],
+                     raid_clears: RaidClears
+                     ) -> Mapping[str, Result[Sequence[Activity]]]:
+    player_raids = await data_retriever.get_activities_for_player_list(
+        players,
+        mode=GameMode.RAID,
+        min_start_dates={p.name: raid_clears.search_start(p.primary_membership.membership_id) for p in players},
+        on_progress=lambda done, total: term.progress(f"Retrieved raids for {done} of {total} players"))
+    term.clear_bol()
     return player_raids
 
 
-def _raid_counts(raids: Optional[Sequence[Activity]],
-                 manifest: Optional[Manifest] = None
-                 ) -> Optional[Mapping[Raid, int]]:
-    result = defaultdict(lambda: 0)
+async def _get_clan_raid_completions(
+        data_retriever: DataRetriever,
+        clan_id: int
+) -> Tuple[Mapping[str, Result[ActivityCompletions]], Manifest]:
+    async with data_retriever, asyncio.TaskGroup() as tasks:
+        manifest = tasks.create_task(data_retriever.get_manifest())
+        clan = await data_retriever.get_clan(clan_id)
+        completions = await data_retriever.get_activity_completions_for_player_list(
+            clan.players,
+            on_progress=lambda done, total: term.progress(f"Retrieved raid stats for {done} of {total} players"))
+        term.clear_bol()
 
-    if raids is None:
-        return None
+    return completions, manifest.result()
 
-    for activity in raids:
-        raid = Raid.from_director_activity_hash(activity.director_activity_hash, manifest)
-        if activity.completed is True:
-            result[raid] += 1
 
+def _raid_completions(completions: Optional[ActivityCompletions], manifest: Manifest) -> Optional[Mapping[Raid, int]]:
+    if completions is None:
+        return None
+
+    result: Counter = Counter()
+    for activity_hash, count in completions.completions.items():
+        activity_class = manifest.get_activity_class(activity_hash)
+        if activity_class.family == ModeFamily.RAID:
+            result[activity_class.raid if activity_class.raid is not None else Raid.UNKNOWN] += count
     return result
 
 
+def _warn_missing(raid_results: Mapping[str, Result[Any]]) -> None:
+    for player_name, result in sorted(raid_results.items()):
+        if result.status == ResultStatus.PRIVATE:
+            term.warning(f"Raids of {player_name} are private")
+        elif result.status == ResultStatus.ERROR:
+            term.warning(f"Could not retrieve raids of {player_name}: {result.error}")
+
+
 class RaidReport(App):
     BINDINGS = [
         ("q", "quit", "Quit"),
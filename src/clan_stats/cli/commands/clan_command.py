@@ -1,11 +1,14 @@
 import argparse
 from argparse import ArgumentParser
+from datetime import datetime, date, time, timezone
 
-from clan_stats.actions import activity_check, clan_fireteams, clan_events, raid_report, interactive_clan_list
+from clan_stats.actions import activity_check, clan_fireteams, clan_events, raid_report, interactive_clan_list, \
+    clan_report
 from clan_stats.config import ClanStatsConfig
 from clan_stats.data._bungie_api.bungie_enums import GameMode
 from clan_stats.data.retrieval import get_data_retriever, DataRetrieverType
-from .command import Command
+from clan_stats.report_output import OutputFormat
+from .command import Command, report_output
 
 
 def _discord_file_argument(parser: ArgumentParser, config: ClanStatsConfig) -> None:
@@ -24,12 +27,14 @@ class MemberActivitiesCommand(Command):
                             help="Filter by activity type")
 
     def execute(self, args: argparse.Namespace, config: ClanStatsConfig) -> None:
-        activity_check.activity_summary(args.clan_id,
-                                        get_data_retriever(DataRetrieverType(args.backend), config),
-                                        sort_by=args.sort_by,
-                                        activity_mode=(GameMode.RAID
-                                                       if args.activity_type == "raid"
-                                                       else GameMode.NONE))
+        with report_output(args) as output:
+            activity_check.activity_summary(args.clan_id,
+                                            get_data_retriever(DataRetrieverType(args.backend), config),
+                                            sort_by=args.sort_by,
+                                            activity_mode=(GameMode.RAID
+                                                           if args.activity_type == "raid"
+                                                           else GameMode.NONE),
+                                            output=output)
 
 
 class InteractiveEditCommand(Command):
@@ -53,10 +58,14 @@ class ClanEventsCommand(Command):
         add_fireteam_finder_arguments(parser)
 
     def execute(self, args: argparse.Namespace, config: ClanStatsConfig) -> None:
-        clan_events.recent_clan_events(args.clan_id,
-                                       get_data_retriever(DataRetrieverType(args.backend), config),
-                                       recency_days=args.past_days,
-                                       min_clan_fireteam_members=args.min_clanmates)
+        with report_output(args) as output:
+            clan_events.recent_clan_events(args.clan_id,
+                                           get_data_retriever(DataRetrieverType(args.backend), config),
+                                           recency_days=args.past_days,
+                                           min_clan_fireteam_members=args.min_clanmates,
+                                           history_directory=config.cache_directory,
+                                           pgcr_budget=args.pgcr_budget,
+                                           output=output)
 
 
 class RaidSummaryCommand(Command):
@@ -70,12 +79,29 @@ class RaidSummaryCommand(Command):
                             action='store_true',
                             dest="interactive",
                             help="Display the table interactively")
+        parser.add_argument("--since",
+                            type=_utc_date,
+                            default=None,
+                            help="Only count raids started on or after this date (YYYY-MM-DD).")
+        parser.add_argument("--aggregate-stats",
+                            action="store_true",
+                            help="Count all time clears from each character's aggregate activity stats, with one "
+                                 "request per character rather than paging through raid histories.")
 
     def execute(self, args: argparse.Namespace, config: ClanStatsConfig) -> None:
-        raid_report.clears(args.clan_id,
-                           get_data_retriever(DataRetrieverType(args.backend), config),
-                           args.sort_by,
-                           args.interactive)
+        if args.aggregate_stats and args.since is not None:
+            args.parser.error("--since can't be used with --aggregate-stats")
+        if args.interactive and OutputFormat(args.format) is not OutputFormat.TEXT:
+            args.parser.error("--interactive can't be used with --format " + args.format)
+        with report_output(args) as output:
+            raid_report.clears(args.clan_id,
+                               get_data_retriever(DataRetrieverType(args.backend), config),
+                               args.sort_by,
+                               args.interactive,
+                               since=args.since,
+                               cache_directory=config.cache_directory,
+                               aggregate_stats=args.aggregate_stats,
+                               output=output)
 
 
 class ClanFireteamsCommand(Command):
@@ -86,10 +112,41 @@ class ClanFireteamsCommand(Command):
         add_fireteam_finder_arguments(parser)
 
     def execute(self, args: argparse.Namespace, config: ClanStatsConfig) -> None:
-        clan_fireteams.recent_clan_fireteams_summary(get_data_retriever(DataRetrieverType(args.backend), config),
-                                                     args.clan_id,
-                                                     recency_days=args.past_days,
-                                                     min_clan_fireteam_members=args.min_clanmates)
+        with report_output(args) as output:
+            clan_fireteams.recent_clan_fireteams_summary(
+                get_data_retriever(DataRetrieverType(args.backend), config),
+                args.clan_id,
+                recency_days=args.past_days,
+                min_clan_fireteam_members=args.min_clanmates,
+                history_directory=config.cache_directory,
+                pgcr_budget=args.pgcr_budget,
+                output=output)
+
+
+class ReportAllCommand(Command):
+    name = "report-all"
+    help = "Member activities, clan fireteams, clan events and raid clears together, retrieving the data once"
+
+    def configure_arg_parser(self, parser: ArgumentParser, config: ClanStatsConfig) -> None:
+        add_fireteam_finder_arguments(parser)
+        parser.add_argument("--clan-ids",
+                            nargs="+",
+                            type=int,
+                            help="Report on each of these clans, rather than the one clan, retrieving players "
+                                 "in more than one of them once.")
+
+    def execute(self, args: argparse.Namespace, config: ClanStatsConfig) -> None:
+        if OutputFormat(args.format) is OutputFormat.CSV and args.output is None:
+            args.parser.error("--format csv writes a file for each report, so needs --output")
+        clan_ids = args.clan_ids if args.clan_ids is not None else [args.clan_id]
+        with report_output(args) as output:
+            clan_report.report_all(clan_ids,
+                                   get_data_retriever(DataRetrieverType(args.backend), config),
+                                   recency_days=args.past_days,
+                                   min_clan_fireteam_members=args.min_clanmates,
+                                   cache_directory=config.cache_directory,
+                                   pgcr_budget=args.pgcr_budget,
+                                   output=output)
 
 
 class ClanCommand(Command):
@@ -100,6 +157,7 @@ class ClanCommand(Command):
         ClanFireteamsCommand(),
         ClanEventsCommand(),
         RaidSummaryCommand(),
+        ReportAllCommand(),
         InteractiveEditCommand(),
     ]
 
@@ -116,3 +174,12 @@ def add_fireteam_finder_arguments(parser: ArgumentParser) -> None:
                         default=30,
                         type=int,
                         help="How many days of activity history to search.")
+    parser.add_argument("--pgcr-budget",
+                        default=0,
+                        type=int,
+                        help="Most post game reports to retrieve to check fireteams the activity histories leave "
+                             "ambiguous: solo activities and matchmade ones.")
+
+
+def _utc_date(value: str) -> datetime:
+    return datetime.combine(date.fromisoformat(value), time.min, timezone.utc)
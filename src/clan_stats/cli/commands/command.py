@@ -1,9 +1,12 @@
+import argparse
+import contextlib
 import sys
 from abc import ABC, abstractmethod
 from argparse import ArgumentParser
-from typing import List
+from typing import List, ContextManager, Optional
 
 from clan_stats.config import ClanStatsConfig
+from clan_stats.report_output import ReportOutput, OutputFormat
 
 
 class Command(ABC):
@@ -46,3 +49,11 @@ class Command(ABC):
         parser.add_argument("--debug",
                             action="store_true",
                             help="Enable debug logging to the console.")
+
+
+def report_output(args: argparse.Namespace) -> ContextManager[Optional[ReportOutput]]:
+    """Where a command writes its report's rows, or None for the report to be printed for people."""
+    output_format = OutputFormat(args.format)
+    if output_format is OutputFormat.TEXT:
+        return contextlib.nullcontext()
+    return ReportOutput(output_format, args.output)
@@ -5,7 +5,7 @@ from typing import final
 from clan_stats.actions import player_activity_summary, player_search
 from clan_stats.config import ClanStatsConfig
 from clan_stats.data.retrieval import get_data_retriever, DataRetrieverType
-from .command import Command
+from .command import Command, report_output
 
 
 @final
@@ -18,11 +18,18 @@ class PlayerActivityReportCommand(Command):
                             default=30,
                             type=int,
                             help="How many days of activity history to search.")
+        parser.add_argument("--max-concurrent",
+                            default=player_activity_summary.DEFAULT_MAX_CONCURRENT_POSTS,
+                            type=int,
+                            help="How many post game carnage reports to retrieve at once.")
 
     def execute(self, args, config: ClanStatsConfig):
-        player_activity_summary.activity_summary(get_data_retriever(DataRetrieverType(args.backend), config),
-                                                 args.player_id,
-                                                 days=args.past_days)
+        with report_output(args) as output:
+            player_activity_summary.activity_summary(get_data_retriever(DataRetrieverType(args.backend), config),
+                                                     args.player_id,
+                                                     days=args.past_days,
+                                                     max_concurrent=args.max_concurrent,
+                                                     output=output)
 
 
 @final
@@ -34,10 +41,12 @@ class FindPlayerCommand(Command):
         parser.add_argument("identifier", help="Player id or search string")
 
     def execute(self, args, config: ClanStatsConfig) -> None:
-        asyncio.run(
-            player_search.trials_report_player_search(
-                get_data_retriever(DataRetrieverType(args.backend), config),
-                args.identifier))
+        with report_output(args) as output:
+            asyncio.run(
+                player_search.trials_report_player_search(
+                    get_data_retriever(DataRetrieverType(args.backend), config),
+                    args.identifier,
+                    output=output))
 
 
 class PlayerCommand(Command):
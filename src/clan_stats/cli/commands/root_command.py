@@ -1,5 +1,6 @@
 import sys
 from argparse import ArgumentParser
+from pathlib import Path
 
 from . import version
 from .clan_command import ClanCommand
@@ -9,6 +10,7 @@ from .test_command import TestCommand
 from .version import VersionCommand
 from ...config import ClanStatsConfig
 from ...data.retrieval.default_data_retriever import DataRetrieverType
+from ...report_output import OutputFormat
 from ...util.itertools import first
 
 
@@ -26,7 +28,18 @@ class RootCommand(Command):
         parser.add_argument('--backend',
                             choices=list(DataRetrieverType),
                             default=first(DataRetrieverType),
-                            help="Which python library to use to access the Bungie API")
+                            help="Which client to use to access the Bungie API")
+
+        parser.add_argument("--format",
+                            choices=list(OutputFormat),
+                            default=OutputFormat.TEXT,
+                            help="Print reports for people, or write their rows for other programs as they are "
+                                 "computed.")
+        parser.add_argument("--output",
+                            type=Path,
+                            default=None,
+                            help="File to write JSON Lines to, or directory to write a CSV or Parquet file of each "
+                                 "report to, rather than standard output.")
 
     def execute(self, args, config):
         if args.version:
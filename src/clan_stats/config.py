@@ -16,6 +16,18 @@ class ClanStatsConfig(BaseModel):
 
     discord_destiny_mapping_file: Path = Field(default=Path("clan_list.csv"))
 
+    # Activities per page of activity history; Bungie allows at most 250.
+    activity_page_size: int = Field(default=50, ge=1, le=250)
+
+    # Bungie API requests in flight at once, shared between interactive, normal and background work.
+    max_concurrent_requests: int = Field(default=20, ge=1)
+
+    # Where data retrieved from Bungie, and results derived from it, are kept between runs.
+    cache_directory: Path = Field(default=Path("cache"))
+
+    # Where the Destiny manifest is kept, along with the version last seen on Bungie.
+    manifest_directory: Path = Field(default=Path("manifest"))
+
 
 def read_config(config_file: Path = DEFAULT_CONFIG_FILE):
     directory = Path.cwd().resolve()
@@ -1,27 +1,35 @@
-from datetime import datetime
+from pathlib import Path
 from types import TracebackType
-from typing import Sequence, Mapping, Type
+from typing import Sequence, Mapping, Type, Optional, Awaitable, TypeVar
 from logging import getLogger
 
 import aiobungie
-from clan_stats.data._bungie_api.api_helpers import activity_history_to
+import aiohttp
+from clan_stats.data._bungie_api.api_helpers import check_activity_page_size
 from clan_stats.data._bungie_api.bungie_exceptions import PrivacyError
 from clan_stats.data._bungie_api.bungie_types import UserMembershipData, GroupMember, DestinyPostGameCarnageReportData, \
     GroupMembership, DestinyCharacterComponent, DestinyProfileResponse, \
-    GetGroupsForMemberResponse, DestinyActivityHistoryResults, SearchResultOfGroupMember, \
-    DestinyHistoricalStatsPeriodGroup, GroupResponse, UserSearchResponse, UserSearchResponseDetail
+    GetGroupsForMemberResponse, ActivityHistoryPage, SearchResultOfGroupMember, \
+    ActivityHistoryEntry, GroupResponse, UserSearchResponse, UserSearchResponseDetail, DestinyManifest, \
+    DestinyAggregateActivityStats, DestinyAggregateActivityResults
+from clan_stats.data._bungie_api.bungie_net import bungie_net_url
+from clan_stats.data._bungie_api.manifest_download import download_manifest
+from clan_stats.data._bungie_api.request_scheduler import RequestScheduler
 from clan_stats.data._bungie_api.typed_wrapper import BungieRestApiTypedWrapper
-from clan_stats.util.async_utils import retrieve_paged
 
 log = getLogger(__name__)
 
 PAGE_SIZE = 50
 
+_T = TypeVar("_T")
+
 
 class AioBungieTypedWrapper(BungieRestApiTypedWrapper):
 
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, page_size: int = PAGE_SIZE, scheduler: Optional[RequestScheduler] = None):
         self._client = aiobungie.RESTClient(api_key)
+        self.page_size = check_activity_page_size(page_size)
+        self._scheduler = scheduler if scheduler is not None else RequestScheduler()
 
     async def __aenter__(self):
         await self._client.__aenter__()
@@ -33,73 +41,108 @@ class AioBungieTypedWrapper(BungieRestApiTypedWrapper):
         return await self._client.__aexit__(exc_tb, exc_val, exc_tb)
 
     async def get_membership_data_by_id(self, player_id: int) -> UserMembershipData:
-        raw_user = await self._client.fetch_membership_from_id(player_id)
+        raw_user = await self._scheduled(self._client.fetch_membership_from_id(player_id))
         return UserMembershipData(**raw_user)
 
     async def get_profile_characters(self, membership_id: int, membership_type: int) -> Mapping[
         int, DestinyCharacterComponent]:
-        raw_profile = await self._client.fetch_profile(membership_id,
-                                                       membership_type,
-                                                       [aiobungie.ComponentType.CHARACTERS])
+        raw_profile = await self._scheduled(self._client.fetch_profile(membership_id,
+                                                                       membership_type,
+                                                                       [aiobungie.ComponentType.CHARACTERS]))
         profile = DestinyProfileResponse(**raw_profile)
         if profile.characters is None:
             raise ValueError("profile response without characters")
         return profile.characters.data
 
+    async def get_profile_and_characters(self, membership_id: int, membership_type: int) -> DestinyProfileResponse:
+        raw_profile = await self._scheduled(self._client.fetch_profile(membership_id,
+                                                                       membership_type,
+                                                                       [aiobungie.ComponentType.PROFILE,
+                                                                        aiobungie.ComponentType.CHARACTERS]))
+        return DestinyProfileResponse(**raw_profile)
+
     async def get_group(self, group_id: int) -> GroupResponse:
-        response = await self._client.fetch_clan_from_id(group_id)
+        response = await self._scheduled(self._client.fetch_clan_from_id(group_id))
         typed_response = GroupResponse(**response)
         return typed_response
 
     async def get_groups_for_member(self, membership_id: int, membership_type: int) -> Sequence[GroupMembership]:
-        response = await self._client.fetch_groups_for_member(membership_id, membership_type)
+        response = await self._scheduled(self._client.fetch_groups_for_member(membership_id, membership_type))
         typed_response = GetGroupsForMemberResponse(**response)
         return typed_response.results
 
     async def search_users(self, search_string: str) -> Sequence[UserSearchResponseDetail]:
-        response = await self._client.search_users(search_string)
+        response = await self._scheduled(self._client.search_users(search_string))
         typed_response = UserSearchResponse(**response)
         log.debug(typed_response)
         return typed_response.searchResults
 
 
-    async def get_activity_history(self,
-                                   membership_id: int,
-                                   membership_type: int,
-                                   character_id: int,
-                                   min_start_date: datetime = None,
-                                   mode: int = 0
-                                   ) -> Sequence[DestinyHistoricalStatsPeriodGroup]:
-        async def _get_page(page_num: int) -> Sequence[DestinyHistoricalStatsPeriodGroup]:
-            try:
-                response = await self._client.fetch_activities(membership_id, character_id,
-                                                               mode=mode,
-                                                               membership_type=membership_type,
-                                                               page=page_num,
-                                                               limit=PAGE_SIZE)
-            except aiobungie.error.InternalServerError as err:
-                if err.message.startswith("The user has chosen for this data to be private"):
-                    raise PrivacyError(
-                        message=err.message,
-                        membership_id=membership_id,
-                        membership_type=membership_type,
-                        original_exception=err)
-
-            if "activities" not in response:
-                return []
-
-            typed_response = DestinyActivityHistoryResults(**response)
-            return typed_response.activities
-
-        return await retrieve_paged(_get_page, enough=activity_history_to(min_start_date))
+    async def get_activity_history_page(self,
+                                        membership_id: int,
+                                        membership_type: int,
+                                        character_id: int,
+                                        page: int,
+                                        mode: int = 0
+                                        ) -> Sequence[ActivityHistoryEntry]:
+        try:
+            response = await self._scheduled(self._client.fetch_activities(membership_id, character_id,
+                                                                           mode=mode,
+                                                                           membership_type=membership_type,
+                                                                           page=page,
+                                                                           limit=self.page_size))
+        except aiobungie.error.InternalServerError as err:
+            if err.message.startswith("The user has chosen for this data to be private"):
+                raise PrivacyError(
+                    message=err.message,
+                    membership_id=membership_id,
+                    membership_type=membership_type,
+                    original_exception=err)
+            raise
+
+        if "activities" not in response:
+            return []
+
+        typed_response = ActivityHistoryPage.model_validate(response)
+        return typed_response.activities
+
+    async def get_aggregate_activity_stats(self,
+                                           membership_id: int,
+                                           membership_type: int,
+                                           character_id: int
+                                           ) -> Sequence[DestinyAggregateActivityStats]:
+        try:
+            response = await self._scheduled(self._client.fetch_aggregated_activity_stats(character_id,
+                                                                                          membership_id,
+                                                                                          membership_type))
+        except aiobungie.error.InternalServerError as err:
+            if err.message.startswith("The user has chosen for this data to be private"):
+                raise PrivacyError(
+                    message=err.message,
+                    membership_id=membership_id,
+                    membership_type=membership_type,
+                    original_exception=err)
+            raise
+        return DestinyAggregateActivityResults.model_validate(response).activities
 
     async def get_post_game_carnage_report(self, activity_id: int) -> DestinyPostGameCarnageReportData:
-        response = await self._client.fetch_post_activity(activity_id)
+        response = await self._scheduled(self._client.fetch_post_activity(activity_id))
         return DestinyPostGameCarnageReportData(**response)
 
     async def get_members_of_group(self, group_id: int) -> Sequence[GroupMember]:
-        response = await self._client.fetch_clan_members(group_id)
+        response = await self._scheduled(self._client.fetch_clan_members(group_id))
         typed_response = SearchResultOfGroupMember(**response)
         return typed_response.results
 
+    async def get_manifest(self) -> DestinyManifest:
+        response = await self._scheduled(self._client.fetch_manifest_path())
+        return DestinyManifest.model_validate(response)
+
+    async def download_manifest(self, path: str, target: Path) -> None:
+        # aiobungie's own download reads the whole file into memory, so download it ourselves
+        async with aiohttp.ClientSession() as session:
+            await download_manifest(session, bungie_net_url() + path, target, scheduler=self._scheduler)
 
+    async def _scheduled(self, request: Awaitable[_T]) -> _T:
+        async with self._scheduler.slot():
+            return await request
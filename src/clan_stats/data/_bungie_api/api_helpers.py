@@ -1,23 +1,32 @@
 from datetime import datetime
 from typing import Optional, Callable, Sequence
 
-from clan_stats.data._bungie_api.bungie_types import DestinyHistoricalStatsPeriodGroup
+from clan_stats.data._bungie_api.bungie_types import ActivityHistoryEntry
 from clan_stats.util.itertools import first
 
+# The largest `count` Bungie accepts for a page of activity history.
+MAX_ACTIVITY_PAGE_SIZE = 250
+
+
+def check_activity_page_size(page_size: int) -> int:
+    if not 1 <= page_size <= MAX_ACTIVITY_PAGE_SIZE:
+        raise ValueError(f"Activity page size must be between 1 and {MAX_ACTIVITY_PAGE_SIZE}, not {page_size}")
+    return page_size
+
 
 def activity_history_to(start_date: Optional[datetime]) -> Optional[Callable[[list], bool]]:
     if start_date is None:
         return None
 
-    def enough(activities: Sequence[DestinyHistoricalStatsPeriodGroup]) -> bool:
+    def enough(activities: Sequence[ActivityHistoryEntry]) -> bool:
         return _time_of_oldest_activity(activities) < start_date
 
     return enough
 
 
-def _time_of_oldest_activity(activities: Sequence[DestinyHistoricalStatsPeriodGroup]) -> datetime:
+def _time_of_oldest_activity(activities: Sequence[ActivityHistoryEntry]) -> datetime:
     return first(sorted(activities, key=_activity_time)).period
 
 
-def _activity_time(activity: DestinyHistoricalStatsPeriodGroup) -> datetime:
+def _activity_time(activity: ActivityHistoryEntry) -> datetime:
     return activity.period
@@ -16,3 +16,10 @@ class PrivacyError(RuntimeError):
         self.original_exception = original_exception
 
 
+class BungieApiError(RuntimeError):
+
+    def __init__(self, message: str, error_code: int, error_status: str):
+        super().__init__(f"{error_status} ({error_code}): {message}")
+        self.message = message
+        self.error_code = error_code
+        self.error_status = error_status
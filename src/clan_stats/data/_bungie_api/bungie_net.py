@@ -0,0 +1,34 @@
+import os
+
+import aiobungie.url
+import bungio.http.route
+
+DEFAULT_BUNGIE_NET_URL = "https://www.bungie.net"
+
+BUNGIE_NET_URL = (os.environ["DESTINY_BUNGIE_NET_URL"].rstrip("/")
+                  if "DESTINY_BUNGIE_NET_URL" in os.environ
+                  else DEFAULT_BUNGIE_NET_URL)
+
+
+def bungie_net_url() -> str:
+    return BUNGIE_NET_URL
+
+
+def platform_url() -> str:
+    return BUNGIE_NET_URL + "/Platform"
+
+
+def use_bungie_net_url(url: str) -> None:
+    """Point all Bungie API clients at `url` instead of bungie.net, e.g. a local replay server.
+
+    Both aiobungie and bungio read their base URL from module globals when a request is made, so this
+    takes effect for clients that already exist.
+    """
+    global BUNGIE_NET_URL
+    BUNGIE_NET_URL = url.rstrip("/")
+    aiobungie.url.BASE = BUNGIE_NET_URL  # pyright: ignore [reportConstantRedefinition]
+    bungio.http.route.BASE_ROUTE = platform_url()
+
+
+if BUNGIE_NET_URL != DEFAULT_BUNGIE_NET_URL:
+    use_bungie_net_url(BUNGIE_NET_URL)
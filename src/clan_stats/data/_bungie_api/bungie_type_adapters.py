@@ -1,11 +1,12 @@
+from collections import defaultdict
 from datetime import timedelta, datetime, timezone
-from typing import Callable, Optional, Sequence, Mapping
+from typing import Callable, Optional, Sequence, Mapping, Iterable, Dict
 
 from clan_stats.data._bungie_api.bungie_enums import MembershipType
 from clan_stats.data._bungie_api.bungie_types import UserMembershipData, UserInfoCard, GroupMember, \
-    DestinyHistoricalStatsPeriodGroup, DestinyPlayer, DestinyPostGameCarnageReportData, DestinyHistoricalStatsValue, \
-    GeneralUser, GroupUserInfoCard
-from clan_stats.data.types.activities import Activity, ActivityWithPost
+    ActivityHistoryEntry, DestinyPlayer, DestinyPostGameCarnageReportData, ActivityHistoryStat, \
+    GeneralUser, GroupUserInfoCard, DestinyAggregateActivityStats
+from clan_stats.data.types.activities import Activity, ActivityWithPost, ActivityCompletions
 from clan_stats.data.types.individuals import Player, Membership, MinimalPlayerWithClan, \
     GroupMinimalPlayer, DetailedMembership, CrossSaveStatus
 from clan_stats.util.itertools import only, first
@@ -143,19 +144,19 @@ def player_from_destiny_player(destiny_player: DestinyPlayer) -> MinimalPlayerWi
         clan_name=destiny_player.clanName)
 
 
-def activity_from_destiny_activity(group: DestinyHistoricalStatsPeriodGroup) -> Activity:
+def activity_from_destiny_activity(group: ActivityHistoryEntry) -> Activity:
     return Activity(
         instance_id=group.activityDetails.instanceId,
         director_activity_hash=group.activityDetails.directorActivityHash,
         time_period=TimePeriod(start=group.period,
-                               length=timedelta(seconds=group.values["timePlayedSeconds"].basic.value)),
+                               length=timedelta(seconds=group.values.timePlayedSeconds.basic.value)),
         primary_mode=group.activityDetails.mode,
         modes=group.activityDetails.modes,
-        completed=_is_completed(group.values.get("completed"))
+        completed=_is_completed(group.values.completed)
     )
 
 
-def _is_completed(value: Optional[DestinyHistoricalStatsValue]) -> Optional[bool]:
+def _is_completed(value: Optional[ActivityHistoryStat]) -> Optional[bool]:
     if value is None:
         return None
     return value.basic.value > 0
@@ -171,9 +172,20 @@ def activity_with_post(activity: Activity,
         primary_mode=activity.primary_mode,
         modes=activity.modes,
         players=[player_from_destiny_player(p.player) for p in post.entries],
+        fireteam_ids={p.player.destinyUserInfo.membershipId: int(p.values["fireteamId"].basic.value)
+                      for p in post.entries if "fireteamId" in p.values},
     )
 
 
+def completions_from_aggregate_stats(stats: Iterable[DestinyAggregateActivityStats]) -> ActivityCompletions:
+    """The completions of each activity in the aggregate activity stats of any number of characters."""
+    completions: Dict[int, int] = defaultdict(int)
+    for activity in stats:
+        if "activityCompletions" in activity.values:
+            completions[activity.activityHash] += int(activity.values["activityCompletions"].basic.value)
+    return ActivityCompletions(completions=completions)
+
+
 def _get_all_platform_names(data: GeneralUser) -> Mapping[str, str]:
     platform_names = {}
     for platform in SUPPORTED_PLATFORMS:
@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Optional, Sequence, Mapping, Any, Annotated
+from typing import Optional, Sequence, Mapping, Any, Annotated, Generic, TypeVar
 
 import bungio
 import bungio.models
@@ -131,10 +131,32 @@ class DictionaryComponentResponseOfint64AndDestinyCharacterComponent(BungieTypeB
     data: Mapping[int, DestinyCharacterComponent]
 
 
+class DestinyProfileComponent(BungieTypeBase):
+    model_config = ALLOW_EXTRA
+
+    dateLastPlayed: datetime
+
+
+class SingleComponentResponseOfDestinyProfileComponent(BungieTypeBase):
+    model_config = ALLOW_EXTRA
+
+    data: Optional[DestinyProfileComponent] = Field(default=None)
+
+
 class DestinyProfileResponse(BungieTypeBase):
     model_config = ALLOW_EXTRA
 
-    characters: Optional[DictionaryComponentResponseOfint64AndDestinyCharacterComponent]
+    profile: Optional[SingleComponentResponseOfDestinyProfileComponent] = Field(default=None)
+    characters: Optional[DictionaryComponentResponseOfint64AndDestinyCharacterComponent] = Field(default=None)
+
+    def last_played(self) -> Optional[datetime]:
+        """The latest `dateLastPlayed` of the profile and its characters, of whichever components were returned."""
+        dates = []
+        if self.profile is not None and self.profile.data is not None:
+            dates.append(self.profile.data.dateLastPlayed)
+        if self.characters is not None:
+            dates.extend(c.dateLastPlayed for c in self.characters.data.values())
+        return max(dates, default=None)
 
 
 class DestinyManifest(BungieTypeBase):
@@ -228,17 +250,136 @@ class DestinyHistoricalStatsPeriodGroup(BungieTypeBase):
     values: Mapping[str, DestinyHistoricalStatsValue]
 
 
+class DestinyAggregateActivityStats(BungieTypeBase):
+    model_config = ALLOW_EXTRA
+
+    activityHash: int
+    values: Mapping[str, DestinyHistoricalStatsValue]
+
+
+class DestinyAggregateActivityResults(BungieTypeBase):
+    model_config = ALLOW_EXTRA
+
+    activities: Sequence[DestinyAggregateActivityStats] = Field(default_factory=list)
+
+
 class DestinyActivityHistoryResults(BungieTypeBase):
     model_config = ConfigDict(from_attributes=True, alias_generator=validation_aliases)
 
     activities: Optional[Sequence[DestinyHistoricalStatsPeriodGroup]] = Field(default_factory=list)
 
 
+# Projections of the activity history types above, holding only what an `Activity` is built from. Fields not
+# declared here are skipped while validating, so none of the other stats of each activity are built. These are
+# plain models rather than `BungieTypeBase`: its per-field validator costs more than the rest of the validation.
+PROJECTION = ConfigDict(extra="ignore", from_attributes=True, alias_generator=validation_aliases)
+
+
+class ActivityHistoryStatValue(BaseModel):
+    model_config = PROJECTION
+
+    value: float
+
+
+class ActivityHistoryStat(BaseModel):
+    model_config = PROJECTION
+
+    basic: ActivityHistoryStatValue
+
+
+class ActivityHistoryValues(BaseModel):
+    model_config = PROJECTION
+
+    timePlayedSeconds: ActivityHistoryStat
+    completed: Optional[ActivityHistoryStat] = None
+
+
+class ActivityHistoryDetails(BaseModel):
+    model_config = PROJECTION
+
+    directorActivityHash: int
+    instanceId: int
+    mode: GameMode
+    modes: Sequence[GameMode]
+
+
+class ActivityHistoryEntry(BaseModel):
+    """Projection of `DestinyHistoricalStatsPeriodGroup`."""
+    model_config = PROJECTION
+
+    period: datetime
+    activityDetails: ActivityHistoryDetails
+    values: ActivityHistoryValues
+
+
+class ActivityHistoryPage(BungieTypeBase):
+    """Projection of `DestinyActivityHistoryResults`.
+
+    Unlike the entries, this does need `BungieTypeBase`: bungio gives an empty page's activities as MISSING.
+    """
+    model_config = PROJECTION
+
+    activities: Optional[Sequence[ActivityHistoryEntry]] = Field(default_factory=list)
+
+
+class DestinyDisplayPropertiesDefinition(BaseModel):
+    model_config = PROJECTION
+
+    name: str = ""
+    description: str = ""
+
+
+class DestinyActivityDefinition(BaseModel):
+    # https://bungie-net.github.io/#/components/schemas/Destiny.Definitions.DestinyActivityDefinition
+    model_config = PROJECTION
+
+    hash: int
+    displayProperties: DestinyDisplayPropertiesDefinition = Field(default_factory=DestinyDisplayPropertiesDefinition)
+    activityTypeHash: Optional[int] = None
+    placeHash: Optional[int] = None
+    destinationHash: Optional[int] = None
+    tier: Optional[int] = None
+    directActivityModeHash: Optional[int] = None
+    directActivityModeType: Optional[int] = None
+    activityModeHashes: Sequence[int] = ()
+    activityModeTypes: Sequence[int] = ()
+    isPvP: bool = False
+
+
+class DestinyActivityModeDefinition(BaseModel):
+    # https://bungie-net.github.io/#/components/schemas/Destiny.Definitions.DestinyActivityModeDefinition
+    model_config = PROJECTION
+
+    hash: int
+    displayProperties: DestinyDisplayPropertiesDefinition = Field(default_factory=DestinyDisplayPropertiesDefinition)
+    modeType: Optional[int] = None
+    activityModeCategory: Optional[int] = None
+    isTeamBased: bool = False
+    friendlyName: Optional[str] = None
+
+
+class DestinyActivityTypeDefinition(BaseModel):
+    # https://bungie-net.github.io/#/components/schemas/Destiny.Definitions.DestinyActivityTypeDefinition
+    model_config = PROJECTION
+
+    hash: int
+    displayProperties: DestinyDisplayPropertiesDefinition = Field(default_factory=DestinyDisplayPropertiesDefinition)
+
+
+class DestinyPlaceDefinition(BaseModel):
+    # https://bungie-net.github.io/#/components/schemas/Destiny.Definitions.DestinyPlaceDefinition
+    model_config = PROJECTION
+
+    hash: int
+    displayProperties: DestinyDisplayPropertiesDefinition = Field(default_factory=DestinyDisplayPropertiesDefinition)
+
+
 class DestinyPostGameCarnageReportEntry(BungieTypeBase):
     model_config = ALLOW_EXTRA
 
     player: DestinyPlayer
     characterId: int
+    values: Mapping[str, DestinyHistoricalStatsValue] = Field(default_factory=dict)
 
 
 class DestinyPostGameCarnageReportData(BungieTypeBase):
@@ -268,3 +409,15 @@ class UserSearchResponse(BungieTypeBase):
     searchResults: Sequence[UserSearchResponseDetail]
     page: int
     hasMore: bool
+
+
+ResponseT = TypeVar("ResponseT")
+
+
+class BungieResponse(BaseModel, Generic[ResponseT]):
+    """The envelope Bungie wraps around every API response."""
+    Response: Optional[ResponseT] = None
+    ErrorCode: int
+    ThrottleSeconds: int = 0
+    ErrorStatus: str
+    Message: str
@@ -0,0 +1,92 @@
+"""Download and unzip the Destiny manifest without blocking the event loop.
+
+The zipped manifest is streamed to a partial file next to the target, so an interrupted download resumes from
+where it stopped with a `Range` request. It is then decompressed in a worker thread a chunk at a time, and only
+moved to the target path once the whole archive has been read and its checksum verified.
+"""
+import asyncio
+import logging
+import os
+import zipfile
+from pathlib import Path
+from typing import Optional
+
+import aiohttp
+
+from clan_stats.data._bungie_api.request_scheduler import RequestScheduler
+from clan_stats.util.itertools import only
+
+log = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1 << 20
+
+MAX_ATTEMPTS = 4
+
+
+async def download_manifest(session: aiohttp.ClientSession,
+                            url: str,
+                            target: Path,
+                            scheduler: Optional[RequestScheduler] = None,
+                            max_attempts: int = MAX_ATTEMPTS) -> Path:
+    """Download the zipped manifest at `url` and unzip it to `target`."""
+    zipped = target.with_name(target.name + ".zip.partial")
+    await _download_resumable(session, url, zipped, scheduler, max_attempts)
+    try:
+        await asyncio.to_thread(_unzip, zipped, target)
+    except zipfile.BadZipFile:
+        # Don't resume onto a broken archive next time
+        zipped.unlink(missing_ok=True)
+        raise
+    zipped.unlink()
+    return target
+
+
+async def _download_resumable(session: aiohttp.ClientSession,
+                              url: str,
+                              partial: Path,
+                              scheduler: Optional[RequestScheduler],
+                              max_attempts: int) -> None:
+    for attempt in range(1, max_attempts + 1):
+        try:
+            if scheduler is None:
+                await _download_to(session, url, partial)
+            else:
+                async with scheduler.slot():
+                    await _download_to(session, url, partial)
+            return
+        except (aiohttp.ClientPayloadError, aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+            if attempt == max_attempts:
+                raise
+            log.info("Manifest download interrupted (%s), resuming from %s bytes", e, _size(partial))
+
+
+async def _download_to(session: aiohttp.ClientSession, url: str, partial: Path) -> None:
+    resume_from = _size(partial)
+    headers = {"Range": f"bytes={resume_from}-"} if resume_from > 0 else {}
+    async with session.get(url, headers=headers) as response:
+        if response.status == 416:
+            # Nothing left after what we have: the previous attempt got everything.
+            return
+        response.raise_for_status()
+        # A server that ignores the range sends the whole file again
+        mode = "ab" if response.status == 206 else "wb"
+        with open(partial, mode) as f:
+            async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                f.write(chunk)
+
+
+def _unzip(zipped: Path, target: Path) -> None:
+    unzipping = target.with_name(target.name + ".partial")
+    try:
+        with zipfile.ZipFile(zipped, 'r') as archive, open(unzipping, 'wb') as output_file:
+            # Reading to the end of the member checks its CRC, raising BadZipFile if it doesn't match
+            with archive.open(only(archive.namelist())) as content:
+                while chunk := content.read(CHUNK_SIZE):
+                    output_file.write(chunk)
+        os.replace(unzipping, target)
+    finally:
+        unzipping.unlink(missing_ok=True)
+
+
+def _size(path: Path) -> int:
+    return path.stat().st_size if path.exists() else 0
@@ -0,0 +1,213 @@
+import asyncio
+import itertools
+from logging import getLogger
+from pathlib import Path
+from types import TracebackType
+from typing import Sequence, Mapping, Type, Optional, Any, TypeVar
+
+import aiohttp
+from pydantic import TypeAdapter, ValidationError
+
+from clan_stats.data._bungie_api.api_helpers import check_activity_page_size
+from clan_stats.data._bungie_api.bungie_exceptions import PrivacyError, BungieApiError
+from clan_stats.data._bungie_api.bungie_net import platform_url, bungie_net_url
+from clan_stats.data._bungie_api.bungie_types import UserMembershipData, GroupMember, \
+    DestinyPostGameCarnageReportData, GroupMembership, DestinyCharacterComponent, DestinyProfileResponse, \
+    GetGroupsForMemberResponse, ActivityHistoryPage, SearchResultOfGroupMember, \
+    ActivityHistoryEntry, GroupResponse, UserSearchResponse, UserSearchResponseDetail, \
+    BungieResponse, DestinyManifest, DestinyAggregateActivityStats, DestinyAggregateActivityResults
+from clan_stats.data._bungie_api.manifest_download import download_manifest
+from clan_stats.data._bungie_api.request_scheduler import RequestScheduler
+from clan_stats.data._bungie_api.typed_wrapper import BungieRestApiTypedWrapper
+
+log = getLogger(__name__)
+
+PAGE_SIZE = 50
+
+MAX_RETRIES = 4
+RETRY_DELAY_SECONDS = 0.5
+
+# https://bungie-net.github.io/#/components/schemas/Exceptions.PlatformErrorCodes
+_SUCCESS = 1
+_DESTINY_PRIVACY_RESTRICTION = 1665
+
+ResponseT = TypeVar("ResponseT")
+
+# Adapters are built once: building the validator is far more expensive than using it.
+_ERROR_RESPONSE = TypeAdapter(BungieResponse[Any])
+_USER_MEMBERSHIP_DATA = TypeAdapter(BungieResponse[UserMembershipData])
+_PROFILE = TypeAdapter(BungieResponse[DestinyProfileResponse])
+_GROUP = TypeAdapter(BungieResponse[GroupResponse])
+_GROUPS_FOR_MEMBER = TypeAdapter(BungieResponse[GetGroupsForMemberResponse])
+_USER_SEARCH = TypeAdapter(BungieResponse[UserSearchResponse])
+_ACTIVITY_HISTORY = TypeAdapter(BungieResponse[ActivityHistoryPage])
+_AGGREGATE_ACTIVITY_STATS = TypeAdapter(BungieResponse[DestinyAggregateActivityResults])
+_POST_GAME_CARNAGE_REPORT = TypeAdapter(BungieResponse[DestinyPostGameCarnageReportData])
+_GROUP_MEMBERS = TypeAdapter(BungieResponse[SearchResultOfGroupMember])
+_MANIFEST = TypeAdapter(BungieResponse[DestinyManifest])
+
+
+class NativeTypedWrapper(BungieRestApiTypedWrapper):
+    """Calls the Bungie REST API directly, validating the raw response bytes into the typed models.
+
+    The third party clients parse each response into dicts which we then validate again; here pydantic parses
+    the JSON itself, so each response is only parsed once.
+    """
+
+    def __init__(self,
+                 api_key: str,
+                 max_retries: int = MAX_RETRIES,
+                 page_size: int = PAGE_SIZE,
+                 scheduler: Optional[RequestScheduler] = None):
+        self._api_key = api_key
+        self._max_retries = max_retries
+        self.page_size = check_activity_page_size(page_size)
+        self._scheduler = scheduler if scheduler is not None else RequestScheduler()
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def __aenter__(self):
+        self._get_session()
+
+    async def __aexit__(self,
+                        exc_type: Type[BaseException] | None,
+                        exc_val: BaseException | None,
+                        exc_tb: TracebackType | None) -> bool | None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+        return None
+
+    async def get_membership_data_by_id(self, player_id: int) -> UserMembershipData:
+        return await self._get(_USER_MEMBERSHIP_DATA, f"/User/GetMembershipsById/{player_id}/0/")
+
+    async def get_profile_characters(self, membership_id: int, membership_type: int) -> Mapping[
+        int, DestinyCharacterComponent]:
+        profile = await self._get(_PROFILE,
+                                  f"/Destiny2/{membership_type}/Profile/{membership_id}/",
+                                  params={"components": "200"})
+        if profile.characters is None:
+            raise ValueError("profile response without characters")
+        return profile.characters.data
+
+    async def get_profile_and_characters(self, membership_id: int, membership_type: int) -> DestinyProfileResponse:
+        return await self._get(_PROFILE,
+                               f"/Destiny2/{membership_type}/Profile/{membership_id}/",
+                               params={"components": "100,200"})
+
+    async def get_group(self, group_id: int) -> GroupResponse:
+        return await self._get(_GROUP, f"/GroupV2/{group_id}/")
+
+    async def get_groups_for_member(self, membership_id: int, membership_type: int) -> Sequence[GroupMembership]:
+        response = await self._get(_GROUPS_FOR_MEMBER, f"/GroupV2/User/{membership_type}/{membership_id}/0/1/")
+        return response.results
+
+    async def search_users(self, search_string: str) -> Sequence[UserSearchResponseDetail]:
+        response = await self._request(_USER_SEARCH, "POST", "/User/Search/GlobalName/0/",
+                                       json={"displayNamePrefix": search_string})
+        return response.searchResults
+
+    async def get_activity_history_page(self,
+                                        membership_id: int,
+                                        membership_type: int,
+                                        character_id: int,
+                                        page: int,
+                                        mode: int = 0
+                                        ) -> Sequence[ActivityHistoryEntry]:
+        try:
+            response = await self._get(
+                _ACTIVITY_HISTORY,
+                f"/Destiny2/{membership_type}/Account/{membership_id}/Character/{character_id}/Stats/Activities/",
+                params={"count": str(self.page_size), "mode": str(int(mode)), "page": str(page)})
+        except PrivacyError as err:
+            raise PrivacyError(
+                message=err.message,
+                membership_id=membership_id,
+                membership_type=membership_type,
+                original_exception=err)
+        return response.activities or []
+
+    async def get_aggregate_activity_stats(self,
+                                           membership_id: int,
+                                           membership_type: int,
+                                           character_id: int
+                                           ) -> Sequence[DestinyAggregateActivityStats]:
+        try:
+            response = await self._get(
+                _AGGREGATE_ACTIVITY_STATS,
+                f"/Destiny2/{membership_type}/Account/{membership_id}/Character/{character_id}"
+                f"/Stats/AggregateActivityStats/")
+        except PrivacyError as err:
+            raise PrivacyError(
+                message=err.message,
+                membership_id=membership_id,
+                membership_type=membership_type,
+                original_exception=err)
+        return response.activities
+
+    async def get_post_game_carnage_report(self, activity_id: int) -> DestinyPostGameCarnageReportData:
+        return await self._get(_POST_GAME_CARNAGE_REPORT, f"/Destiny2/Stats/PostGameCarnageReport/{activity_id}/")
+
+    async def get_members_of_group(self, group_id: int) -> Sequence[GroupMember]:
+        response = await self._get(_GROUP_MEMBERS, f"/GroupV2/{group_id}/Members/")
+        return response.results
+
+    async def get_manifest(self) -> DestinyManifest:
+        return await self._get(_MANIFEST, "/Destiny2/Manifest/")
+
+    async def download_manifest(self, path: str, target: Path) -> None:
+        """Download the zipped manifest at `path` on bungie.net and unzip it to `target`."""
+        await download_manifest(self._get_session(), bungie_net_url() + path, target, scheduler=self._scheduler)
+
+    async def _get(self,
+                   adapter: TypeAdapter[BungieResponse[ResponseT]],
+                   path: str,
+                   params: Optional[Mapping[str, str]] = None) -> ResponseT:
+        return await self._request(adapter, "GET", path, params=params)
+
+    async def _request(self,
+                       adapter: TypeAdapter[BungieResponse[ResponseT]],
+                       method: str,
+                       path: str,
+                       params: Optional[Mapping[str, str]] = None,
+                       json: Any = None) -> ResponseT:
+        session = self._get_session()
+        for attempt in itertools.count():
+            # Each attempt takes its own slot, so none is held while waiting to retry
+            async with (self._scheduler.slot(),
+                        session.request(method, platform_url() + path, params=params, json=json) as response):
+                status = response.status
+                body = await response.read()
+
+            if status == 200:
+                try:
+                    envelope = adapter.validate_json(body)
+                except ValidationError as e:
+                    # Successful, but not the response expected, e.g. truncated or from a changed API.
+                    raise BungieApiError(f"Invalid response to {method} {path}: {e.error_count()} errors",
+                                         error_code=0,
+                                         error_status=f"HTTP {status}") from e
+                if envelope.ErrorCode == _SUCCESS and envelope.Response is not None:
+                    return envelope.Response
+            else:
+                try:
+                    envelope = _ERROR_RESPONSE.validate_json(body)
+                except ValidationError:
+                    # Not a Bungie response at all, e.g. an error page from a proxy.
+                    envelope = BungieResponse[Any](ErrorCode=0,
+                                                   ErrorStatus=f"HTTP {status}",
+                                                   Message=body[:200].decode(errors="replace"))
+
+            if envelope.ErrorCode == _DESTINY_PRIVACY_RESTRICTION:
+                raise PrivacyError(message=envelope.Message)
+            if status >= 500 and attempt < self._max_retries:
+                delay = max(envelope.ThrottleSeconds, RETRY_DELAY_SECONDS * 2 ** attempt)
+                log.debug("%s from %s %s, retrying in %ss", envelope.ErrorStatus, method, path, delay)
+                await asyncio.sleep(delay)
+                continue
+            raise BungieApiError(envelope.Message, error_code=envelope.ErrorCode, error_status=envelope.ErrorStatus)
+        raise AssertionError("unreachable")
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None:
+            self._session = aiohttp.ClientSession(headers={"X-API-Key": self._api_key})
+        return self._session
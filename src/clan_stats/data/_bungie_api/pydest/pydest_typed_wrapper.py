@@ -33,6 +33,11 @@ class PydestTypedWrapper(BungieRestApiTypedWrapper):
             raise ValueError("profile response without characters")
         return profile.characters.data
 
+    async def get_profile_and_characters(self, membership_id: int, membership_type: int) -> DestinyProfileResponse:
+        response = await _response_for(self.pydestapi.get_profile(
+            membership_type, membership_id, ["Profiles", "Characters"]))
+        return DestinyProfileResponse(**response)
+
     async def get_group(self, group_id: int) -> GroupResponse:
         url = pydest.api.GROUP_URL + '{}/'
         url = url.format(group_id)
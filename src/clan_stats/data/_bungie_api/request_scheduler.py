@@ -0,0 +1,117 @@
+"""Orders Bungie API requests by priority, so interactive work isn't stuck behind bulk background requests.
+
+Each request is made inside `RequestScheduler.slot()`, at the priority of the current context: set it with
+`request_priority` around the code making the requests. Tasks started within that block inherit the priority.
+"""
+import asyncio
+from collections import deque
+from contextlib import contextmanager, asynccontextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import Mapping, Optional, Deque, Dict, Iterator, AsyncIterator
+
+
+class Priority(IntEnum):
+    # Lower values are served first
+    INTERACTIVE = 0
+    NORMAL = 1
+    BACKGROUND = 2
+
+
+DEFAULT_MAX_CONCURRENT_REQUESTS = 20
+
+# The fraction of the concurrent requests each priority may use. Normal work leaves some room for interactive
+# requests, and background work leaves half.
+DEFAULT_SHARES: Mapping[Priority, float] = {
+    Priority.INTERACTIVE: 1.0,
+    Priority.NORMAL: 0.8,
+    Priority.BACKGROUND: 0.5,
+}
+
+_current_priority: ContextVar[Priority] = ContextVar("request_priority", default=Priority.NORMAL)
+
+
+def current_priority() -> Priority:
+    return _current_priority.get()
+
+
+@contextmanager
+def request_priority(priority: Priority) -> Iterator[None]:
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+class RequestScheduler:
+    """Limits the number of requests in flight, starting waiting requests in priority order.
+
+    A request that can't start waits in the queue for its priority. When a slot frees, waiting requests are
+    started highest priority first, so queued background requests are passed over as long as more important
+    requests are waiting to start. Each priority is also limited to its share of the slots, so a burst of background
+    work can't take every slot and leave an interactive request waiting on it. A request held back only by its
+    priority's share doesn't hold back requests of lower priorities.
+    """
+
+    def __init__(self,
+                 max_concurrent: int = DEFAULT_MAX_CONCURRENT_REQUESTS,
+                 shares: Mapping[Priority, float] = DEFAULT_SHARES):
+        if max_concurrent < 1:
+            raise ValueError(f"max_concurrent must be at least 1, not {max_concurrent}")
+        self._max_concurrent = max_concurrent
+        self._limits: Dict[Priority, int] = {p: max(1, int(max_concurrent * shares.get(p, 1.0))) for p in Priority}
+        self._running: Dict[Priority, int] = {p: 0 for p in Priority}
+        self._waiting: Dict[Priority, Deque[asyncio.Future[None]]] = {p: deque() for p in Priority}
+
+    @asynccontextmanager
+    async def slot(self, priority: Optional[Priority] = None) -> AsyncIterator[None]:
+        """Wait for a request slot, held for the duration of the block."""
+        priority = current_priority() if priority is None else priority
+        await self._acquire(priority)
+        try:
+            yield
+        finally:
+            self._release(priority)
+
+    def running(self, priority: Priority) -> int:
+        return self._running[priority]
+
+    def waiting(self, priority: Priority) -> int:
+        return len(self._waiting[priority])
+
+    async def _acquire(self, priority: Priority) -> None:
+        # Only waiters that could start now go first: one held back by its own share doesn't hold back others
+        if self._can_start(priority) and not any(self._waiting[p] and self._can_start(p)
+                                                 for p in Priority if p <= priority):
+            self._running[priority] += 1
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiting[priority].append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Started just as it was cancelled
+                self._release(priority)
+            else:
+                self._waiting[priority].remove(waiter)
+            raise
+
+    def _release(self, priority: Priority) -> None:
+        self._running[priority] -= 1
+        self._start_waiting()
+
+    def _can_start(self, priority: Priority) -> bool:
+        return (sum(self._running.values()) < self._max_concurrent
+                and self._running[priority] < self._limits[priority])
+
+    def _start_waiting(self) -> None:
+        for priority in Priority:
+            waiting = self._waiting[priority]
+            while waiting and self._can_start(priority):
+                waiter = waiting.popleft()
+                if not waiter.done():
+                    self._running[priority] += 1
+                    waiter.set_result(None)
@@ -1,15 +1,23 @@
 from abc import ABCMeta, abstractmethod
 from datetime import datetime
+from functools import partial
+from pathlib import Path
 from types import TracebackType
-from typing import Mapping, Sequence, AsyncContextManager, Type, List, Optional
+from typing import Mapping, Sequence, AsyncContextManager, Type, List, Optional, AsyncIterator
+
+from clan_stats.data._bungie_api.api_helpers import activity_history_to
 
 from clan_stats.data._bungie_api.bungie_types import UserMembershipData, DestinyCharacterComponent, GroupMembership, \
-    DestinyHistoricalStatsActivity, DestinyPostGameCarnageReportData, GroupMember, DestinyHistoricalStatsPeriodGroup, \
-    GroupResponse
+    DestinyHistoricalStatsActivity, DestinyPostGameCarnageReportData, GroupMember, ActivityHistoryEntry, \
+    GroupResponse, UserSearchResponseDetail, DestinyManifest, DestinyProfileResponse, DestinyAggregateActivityStats
+from clan_stats.util.async_utils import retrieve_paged, iter_paged
 
 
 class BungieRestApiTypedWrapper(AsyncContextManager, metaclass=ABCMeta):
 
+    # Activities per page of activity history
+    page_size: int
+
 
     async def __aexit__(self,
                         exception_type: Type[BaseException] | None,
@@ -28,6 +36,11 @@ class BungieRestApiTypedWrapper(AsyncContextManager, metaclass=ABCMeta):
                                      ) -> Mapping[int, DestinyCharacterComponent]:
         pass
 
+    @abstractmethod
+    async def get_profile_and_characters(self, membership_id: int, membership_type: int) -> DestinyProfileResponse:
+        """The profile with its profile and character components, which both say when it was last played."""
+        pass
+
     @abstractmethod
     async def get_group(self, group_id: int) -> GroupResponse:
         pass
@@ -40,13 +53,58 @@ class BungieRestApiTypedWrapper(AsyncContextManager, metaclass=ABCMeta):
         pass
 
     @abstractmethod
+    async def search_users(self, search_string: str) -> Sequence[UserSearchResponseDetail]:
+        pass
+
+    @abstractmethod
+    async def get_activity_history_page(self,
+                                        membership_id: int,
+                                        membership_type: int,
+                                        character_id: int,
+                                        page: int,
+                                        mode: int = 0
+                                        ) -> Sequence[ActivityHistoryEntry]:
+        pass
+
     async def get_activity_history(self,
                                    membership_id: int,
                                    membership_type: int,
                                    character_id: int,
                                    min_start_date: Optional[datetime] = None,
                                    mode: int = 0
-                                   ) -> Sequence[DestinyHistoricalStatsPeriodGroup]:
+                                   ) -> Sequence[ActivityHistoryEntry]:
+        return await retrieve_paged(
+            partial(self._get_activity_history_page, membership_id, membership_type, character_id, mode),
+            enough=activity_history_to(min_start_date),
+            page_size=self.page_size)
+
+    async def iter_activity_history(self,
+                                    membership_id: int,
+                                    membership_type: int,
+                                    character_id: int,
+                                    min_start_date: Optional[datetime] = None,
+                                    mode: int = 0
+                                    ) -> AsyncIterator[Sequence[ActivityHistoryEntry]]:
+        async for page in iter_paged(
+                partial(self._get_activity_history_page, membership_id, membership_type, character_id, mode),
+                enough=activity_history_to(min_start_date),
+                page_size=self.page_size):
+            yield page
+
+    async def _get_activity_history_page(self,
+                                         membership_id: int,
+                                         membership_type: int,
+                                         character_id: int,
+                                         mode: int,
+                                         page: int) -> Sequence[ActivityHistoryEntry]:
+        return await self.get_activity_history_page(membership_id, membership_type, character_id, page, mode=mode)
+
+    @abstractmethod
+    async def get_aggregate_activity_stats(self,
+                                           membership_id: int,
+                                           membership_type: int,
+                                           character_id: int
+                                           ) -> Sequence[DestinyAggregateActivityStats]:
         pass
 
     @abstractmethod
@@ -59,6 +117,14 @@ class BungieRestApiTypedWrapper(AsyncContextManager, metaclass=ABCMeta):
     async def get_members_of_group(self, group_id: int) -> Sequence[GroupMember]:
         pass
 
+    @abstractmethod
+    async def get_manifest(self) -> DestinyManifest:
+        pass
+
+    @abstractmethod
+    async def download_manifest(self, path: str, target: Path) -> None:
+        pass
+
 
 def find_clan_group(groups: Sequence[GroupMembership]) -> Optional[GroupMembership]:
     clan_type_groups: List[GroupMembership] = []
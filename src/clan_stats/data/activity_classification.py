@@ -0,0 +1,141 @@
+"""Classifies activities as raids, dungeons and broad mode families from their manifest definitions.
+
+Classifying needs the activity's name, so it is done once per manifest, when its index is built (see
+`SqliteManifest`), and analytics look the result up by director activity hash.
+"""
+from enum import StrEnum
+from typing import NamedTuple, Optional, Sequence, TypeVar, Type
+
+from clan_stats.data._bungie_api.bungie_enums import GameMode
+
+
+class Raid(StrEnum):
+    SE = "Salvation's Edge"
+    CROTA = "Crota's End"
+    ROOT = "Root of Nightmares"
+    KF = "King's Fall"
+    VOW = "Vow of the Disciple"
+    VOG = "Vault of Glass"
+    DSC = "Deep Stone Crypt"
+    GOS = "Garden of Salvation"
+    LW = "Last Wish"
+    LEV = "Leviathan"
+    PAN = "Pantheon"
+    COS = "Crown of Sorrow"
+    SOTP = "Scourge of the Past"
+    UNKNOWN = "Unknown?"
+
+    @classmethod
+    def current_raids(cls) -> Sequence['Raid']:
+        return [cls.SE, cls.CROTA, cls.ROOT, cls.KF, cls.VOW, cls.VOG, cls.DSC, cls.GOS, cls.LW]
+
+
+class Dungeon(StrEnum):
+    SUNDERED = "Sundered Doctrine"
+    VESPER = "Vesper's Host"
+    WARLORD = "Warlord's Ruin"
+    GHOSTS = "Ghosts of the Deep"
+    SPIRE = "Spire of the Watcher"
+    DUALITY = "Duality"
+    GRASP = "Grasp of Avarice"
+    PROPHECY = "Prophecy"
+    PIT = "Pit of Heresy"
+    THRONE = "The Shattered Throne"
+
+
+class ModeFamily(StrEnum):
+    RAID = "raid"
+    DUNGEON = "dungeon"
+    STRIKE = "strike"
+    CRUCIBLE = "crucible"
+    GAMBIT = "gambit"
+    STORY = "story"
+    PATROL = "patrol"
+    OTHER = "other"
+
+
+class Difficulty(StrEnum):
+    NORMAL = "Normal"
+    GUIDED = "Guided Games"
+    PRESTIGE = "Prestige"
+    LEGEND = "Legend"
+    MASTER = "Master"
+    CONTEST = "Contest"
+
+
+class ActivityClass(NamedTuple):
+    family: ModeFamily
+    raid: Optional[Raid] = None
+    dungeon: Optional[Dungeon] = None
+    difficulty: Optional[Difficulty] = None
+
+
+UNCLASSIFIED = ActivityClass(ModeFamily.OTHER)
+
+# Activities that are raids but whose names don't say which one.
+_UNNAMED_RAIDS = {4103176774}
+
+_FAMILY_MODES = {
+    ModeFamily.RAID: {GameMode.RAID},
+    ModeFamily.DUNGEON: {GameMode.DUNGEON},
+    ModeFamily.STRIKE: {GameMode.STRIKE, GameMode.NIGHTFALL, GameMode.HEROICNIGHTFALL, GameMode.ALLSTRIKES,
+                        GameMode.SCOREDNIGHTFALL, GameMode.SCOREDHEROICNIGHTFALL},
+    ModeFamily.CRUCIBLE: {GameMode.ALLPVP, GameMode.CONTROL, GameMode.CLASH, GameMode.CRIMSONDOUBLES,
+                          GameMode.IRONBANNER, GameMode.ALLMAYHEM, GameMode.SUPREMACY, GameMode.PRIVATEMATCHESALL,
+                          GameMode.SURVIVAL, GameMode.COUNTDOWN, GameMode.TRIALSOFTHENINE,
+                          GameMode.TRIALSCOUNTDOWN, GameMode.TRIALSSURVIVAL, GameMode.IRONBANNERCONTROL,
+                          GameMode.IRONBANNERCLASH, GameMode.IRONBANNERSUPREMACY, GameMode.RUMBLE,
+                          GameMode.ALLDOUBLES, GameMode.DOUBLES, GameMode.SHOWDOWN, GameMode.LOCKDOWN,
+                          GameMode.SCORCHED, GameMode.SCORCHEDTEAM, GameMode.BREAKTHROUGH, GameMode.SALVAGE,
+                          GameMode.IRONBANNERSALVAGE, GameMode.PVPCOMPETITIVE, GameMode.PVPQUICKPLAY,
+                          GameMode.CLASHQUICKPLAY, GameMode.CLASHCOMPETITIVE, GameMode.CONTROLQUICKPLAY,
+                          GameMode.CONTROLCOMPETITIVE, GameMode.ELIMINATION, GameMode.MOMENTUM,
+                          GameMode.TRIALS_OF_OSIRIS, GameMode.RIFT, GameMode.ZONECONTROL, GameMode.IRONBANNERRIFT,
+                          GameMode.IronBannerZoneControl},
+    ModeFamily.GAMBIT: {GameMode.GAMBIT, GameMode.GAMBITPRIME, GameMode.RECKONING},
+    ModeFamily.STORY: {GameMode.STORY},
+    ModeFamily.PATROL: {GameMode.PATROL},
+}
+
+_MODE_FAMILIES = {int(mode): family for family, modes in _FAMILY_MODES.items() for mode in modes}
+
+_E = TypeVar("_E", bound=StrEnum)
+
+
+def classify(activity_hash: int, name: str, mode: Optional[int]) -> ActivityClass:
+    """Classify an activity from its definition's name and `directActivityModeType`."""
+    raid = _named(Raid, name)
+    if raid is None and activity_hash in _UNNAMED_RAIDS:
+        raid = Raid.UNKNOWN
+    dungeon = _named(Dungeon, name) if raid is None else None
+
+    if raid is not None:
+        family = ModeFamily.RAID
+    elif dungeon is not None:
+        family = ModeFamily.DUNGEON
+    else:
+        family = mode_family(mode)
+
+    return ActivityClass(family=family, raid=raid, dungeon=dungeon, difficulty=_difficulty(name))
+
+
+def mode_family(mode: Optional[int]) -> ModeFamily:
+    return _MODE_FAMILIES.get(mode, ModeFamily.OTHER)
+
+
+def _named(kind: Type[_E], name: str) -> Optional[_E]:
+    for member in kind:
+        if member.value in name:
+            return member
+    return None
+
+
+def _difficulty(name: str) -> Optional[Difficulty]:
+    # e.g. "Vow of the Disciple: Master"
+    _, separator, qualifier = name.rpartition(": ")
+    if not separator:
+        return None
+    try:
+        return Difficulty(qualifier)
+    except ValueError:
+        return None
@@ -1,10 +1,103 @@
 import abc
+import logging
+import os
 import sqlite3
 import json
-from functools import cache
+import tempfile
+from collections import OrderedDict
+from contextlib import closing
+from enum import Enum
+from functools import lru_cache
 
 from pathlib import Path
-from typing import Mapping
+from typing import Optional, NamedTuple, Iterator, Tuple, Any, Dict, Set, Generic, TypeVar, Type, Callable, Iterable, \
+    Mapping, Sequence
+
+from pydantic import BaseModel
+
+from clan_stats.data._bungie_api.bungie_types import DestinyActivityDefinition, DestinyActivityModeDefinition, \
+    DestinyActivityTypeDefinition, DestinyPlaceDefinition
+from clan_stats.data.activity_classification import ActivityClass, UNCLASSIFIED, classify, Raid, Dungeon, \
+    ModeFamily, Difficulty
+
+logger = logging.getLogger(__name__)
+
+# Bump when the index tables change, so indexes built by older versions are rebuilt.
+INDEX_FORMAT_VERSION = 2
+
+# Activity definitions kept in memory after being looked up.
+ACTIVITY_CACHE_SIZE = 4096
+
+# Decoded definitions kept in memory by each `DefinitionTable`.
+DEFINITION_CACHE_SIZE = 1024
+
+# Hashes looked up in one query by `DefinitionTable.get_many`, well below SQLite's limit on parameters.
+_BATCH_SIZE = 500
+
+_D = TypeVar("_D", bound=BaseModel)
+
+
+class ActivityDefinition(NamedTuple):
+    hash: int
+    name: str
+    mode: Optional[int]  # DestinyActivityModeType of the activity itself
+    tier: Optional[int]
+    activity_type_hash: Optional[int]
+
+
+class DefinitionTable(Generic[_D]):
+    """Definitions from one table of the manifest, decoded when first looked up.
+
+    Look up the definitions needed for a whole report with `get_many`, which fetches those not already cached a
+    batch at a time. The most recently used definitions are kept, up to `cache_size`, including hashes that turned
+    out not to be in the table.
+    """
+
+    def __init__(self,
+                 connection: Callable[[], sqlite3.Connection],
+                 table: str,
+                 definition_type: Type[_D],
+                 cache_size: int = DEFINITION_CACHE_SIZE):
+        self._connection = connection
+        self._table = table
+        self._definition_type = definition_type
+        self._cache_size = cache_size
+        self._cache: OrderedDict[int, Optional[_D]] = OrderedDict()
+
+    def get(self, definition_hash: int) -> Optional[_D]:
+        return self.get_many([definition_hash]).get(definition_hash)
+
+    def get_many(self, definition_hashes: Iterable[int]) -> Mapping[int, _D]:
+        hashes = list(dict.fromkeys(definition_hashes))
+        missing = [h for h in hashes if h not in self._cache]
+        for start in range(0, len(missing), _BATCH_SIZE):
+            self._fetch(missing[start:start + _BATCH_SIZE])
+
+        found = {}
+        for definition_hash in hashes:
+            self._cache.move_to_end(definition_hash)
+            definition = self._cache[definition_hash]
+            if definition is not None:
+                found[definition_hash] = definition
+        self._evict()
+        return found
+
+    def _fetch(self, definition_hashes: Sequence[int]) -> None:
+        placeholders = ", ".join("?" * len(definition_hashes))
+        rows = self._connection().execute(
+            f"SELECT id, json FROM {self._table} WHERE id IN ({placeholders})",
+            [_convert_hash(h) for h in definition_hashes])
+        for definition_hash in definition_hashes:
+            self._cache[definition_hash] = None
+        for definition_id, raw in rows:
+            definition = json.loads(raw)
+            # The row id is the hash, which older manifests don't repeat in the definition
+            definition.setdefault("hash", _unconvert_hash(definition_id))
+            self._cache[_unconvert_hash(definition_id)] = self._definition_type.model_validate(definition)
+
+    def _evict(self) -> None:
+        while len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
 
 
 class Manifest(abc.ABC):
@@ -12,38 +105,214 @@ class Manifest(abc.ABC):
     def get_activity_name(self, activity_hash: int) -> str:
         raise NotImplementedError()
 
+    @property
+    def activities(self) -> DefinitionTable[DestinyActivityDefinition]:
+        raise NotImplementedError()
+
+    @property
+    def activity_modes(self) -> DefinitionTable[DestinyActivityModeDefinition]:
+        raise NotImplementedError()
+
+    @property
+    def activity_types(self) -> DefinitionTable[DestinyActivityTypeDefinition]:
+        raise NotImplementedError()
+
+    @property
+    def places(self) -> DefinitionTable[DestinyPlaceDefinition]:
+        raise NotImplementedError()
+
+    def get_activity(self, activity_hash: int) -> Optional[ActivityDefinition]:
+        raise NotImplementedError()
+
+    def get_activity_class(self, activity_hash: int) -> ActivityClass:
+        activity = self.get_activity(activity_hash)
+        if activity is None:
+            return UNCLASSIFIED
+        return classify(activity_hash, activity.name, activity.mode)
+
 
 class SqliteManifest(Manifest):
+    """The Destiny manifest SQLite database, with lookups answered from a small index derived from it.
+
+    The manifest stores each definition as a JSON document. The index holds just the fields we look up, one row
+    per activity keyed by hash, and is built the first time a manifest is opened and kept next to it as
+    `<manifest>.index.sqlite3`. Lookups are point queries on the index, with recent results kept in an LRU cache.
+
+    Each activity is also classified (see `activity_classification`) as the index is built. The classes of all
+    the activities are read into memory on first use, as analytics classify many activities at a time.
+
+    Other fields are read from the full definitions in the manifest itself, through the `DefinitionTable`s.
+    """
 
-    def __init__(self, manifest_path: Path):
+    def __init__(self, manifest_path: Path, cache_size: int = ACTIVITY_CACHE_SIZE):
         self.manifest_path = manifest_path
-        self.dbconnection = None
+        self.index_path = index_path_for(manifest_path)
+        self.dbconnection: Optional[sqlite3.Connection] = None
+        self._cached_activity = lru_cache(maxsize=cache_size)(self._query_activity)
+        self._activity_classes: Optional[Dict[int, ActivityClass]] = None
+        self._reported_unknown: Set[int] = set()
+        self._manifest_connection: Optional[sqlite3.Connection] = None
+        self._activities = DefinitionTable(
+            self._connect_manifest, "DestinyActivityDefinition", DestinyActivityDefinition)
+        self._activity_modes = DefinitionTable(
+            self._connect_manifest, "DestinyActivityModeDefinition", DestinyActivityModeDefinition)
+        self._activity_types = DefinitionTable(
+            self._connect_manifest, "DestinyActivityTypeDefinition", DestinyActivityTypeDefinition)
+        self._places = DefinitionTable(self._connect_manifest, "DestinyPlaceDefinition", DestinyPlaceDefinition)
+
+    def get_activity_name(self, activity_hash: int) -> str:
+        activity = self.get_activity(activity_hash)
+        if activity is None:
+            return f"Unknown: {activity_hash}"
+        return activity.name
+
+    def get_activity(self, activity_hash: int) -> Optional[ActivityDefinition]:
+        return self._cached_activity(activity_hash)
+
+    @property
+    def activities(self) -> DefinitionTable[DestinyActivityDefinition]:
+        return self._activities
 
-    def get_activity_name(self, activity_hash: int):
+    @property
+    def activity_modes(self) -> DefinitionTable[DestinyActivityModeDefinition]:
+        return self._activity_modes
 
-        activity_names = self._get_activity_name_data()
-        activity_name_structure = activity_names.get(self._convert_hash(activity_hash),
-                                                     {"displayProperties": {"name": f"Unknown: {activity_hash}"}})
-        return activity_name_structure["displayProperties"]["name"]
+    @property
+    def activity_types(self) -> DefinitionTable[DestinyActivityTypeDefinition]:
+        return self._activity_types
+
+    @property
+    def places(self) -> DefinitionTable[DestinyPlaceDefinition]:
+        return self._places
+
+    def get_activity_class(self, activity_hash: int) -> ActivityClass:
+        if self._activity_classes is None:
+            self._activity_classes = self._query_activity_classes()
+        activity_class = self._activity_classes.get(activity_hash)
+        if activity_class is None:
+            if activity_hash not in self._reported_unknown:
+                self._reported_unknown.add(activity_hash)
+                logger.warning("Activity %s is not in manifest %s", activity_hash, self.manifest_path.name)
+            return UNCLASSIFIED
+        return activity_class
+
+    def _query_activity_classes(self) -> Dict[int, ActivityClass]:
+        self._check_loaded()
+        return {
+            _unconvert_hash(activity_id): ActivityClass(
+                family=ModeFamily(family),
+                raid=Raid(raid) if raid is not None else None,
+                dungeon=Dungeon(dungeon) if dungeon is not None else None,
+                difficulty=Difficulty(difficulty) if difficulty is not None else None)
+            for activity_id, family, raid, dungeon, difficulty in self.dbconnection.execute(
+                "SELECT id, family, raid, dungeon, difficulty FROM activity")}
+
+    def _query_activity(self, activity_hash: int) -> Optional[ActivityDefinition]:
+        self._check_loaded()
+        row = self.dbconnection.execute(
+            "SELECT name, mode, tier, activity_type_hash FROM activity WHERE id = ?",
+            (_convert_hash(activity_hash),)).fetchone()
+        if row is None:
+            return None
+        return ActivityDefinition(activity_hash, *row)
 
     def _open_manifest(self):
-        self.dbconnection = sqlite3.connect(self.manifest_path)
+        if not self._index_is_current():
+            self._build_index()
+        self.dbconnection = _connect_read_only(self.index_path)
+
+    def _connect_manifest(self) -> sqlite3.Connection:
+        if self._manifest_connection is None:
+            self._manifest_connection = _connect_read_only(self.manifest_path)
+        return self._manifest_connection
 
     def _check_loaded(self):
         if self.dbconnection is None:
             self._open_manifest()
         assert self.dbconnection is not None
 
-    @cache
-    def _get_activity_name_data(self) -> Mapping[str, str]:
-        self._check_loaded()
-        return {k: json.loads(v) for k, v in
-                self.dbconnection.cursor().execute("SELECT * FROM DestinyActivityDefinition").fetchall()}
+    def _index_is_current(self) -> bool:
+        if not self.index_path.exists():
+            return False
+        try:
+            with closing(_connect_read_only(self.index_path)) as index:
+                stored = dict(index.execute("SELECT key, value FROM meta").fetchall())
+        except sqlite3.DatabaseError:
+            return False
+        return stored == self._index_meta()
+
+    def _index_meta(self) -> dict[str, str]:
+        # Identifies the manifest the index was built from: a new manifest downloaded to the same path differs.
+        stat = self.manifest_path.stat()
+        return {"format": str(INDEX_FORMAT_VERSION), "size": str(stat.st_size), "mtime": str(stat.st_mtime_ns)}
+
+    def _build_index(self) -> None:
+        logger.info("Indexing manifest %s", self.manifest_path)
+        # A file of its own, so runs indexing the same manifest at once don't write over each other's
+        fd, building_name = tempfile.mkstemp(dir=self.index_path.parent, prefix=self.index_path.name + ".",
+                                             suffix=".partial")
+        os.close(fd)
+        building_path = Path(building_name)
+        try:
+            self._write_index(building_path)
+            os.replace(building_path, self.index_path)
+        finally:
+            building_path.unlink(missing_ok=True)
+
+    def _write_index(self, building_path: Path) -> None:
+        with (closing(_connect_read_only(self.manifest_path)) as manifest,
+              closing(sqlite3.connect(building_path)) as index):
+            index.execute("CREATE TABLE activity (id INTEGER PRIMARY KEY, name TEXT NOT NULL, "
+                          "mode INTEGER, tier INTEGER, activity_type_hash INTEGER, "
+                          "family TEXT NOT NULL, raid TEXT, dungeon TEXT, difficulty TEXT)")
+            index.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+            # Rows are streamed from the manifest, so only one definition is decoded at a time.
+            index.executemany("INSERT INTO activity VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                              _activity_rows(manifest.execute("SELECT id, json FROM DestinyActivityDefinition")))
+            index.executemany("INSERT INTO meta VALUES (?, ?)", self._index_meta().items())
+            index.commit()
+
+
+def _connect_read_only(path: Path) -> sqlite3.Connection:
+    # Read only, so a manifest removed by another run fails to open rather than being recreated empty
+    try:
+        return sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    except sqlite3.OperationalError as e:
+        raise sqlite3.OperationalError(f"Can't open manifest database {path}: {e}") from e
+
+
+def index_path_for(manifest_path: Path) -> Path:
+    return manifest_path.with_suffix(".index" + manifest_path.suffix)
+
+
+def _convert_hash(definition_hash: int) -> int:
+    # see https://github.com/vpzed/Destiny2-API-Info/wiki/API-Introduction-Part-3-Manifest#converting-hashes-for-the-sqlite-db
+    if (definition_hash & (1 << (32 - 1))) != 0:
+        return definition_hash - (1 << 32)
+    else:
+        return definition_hash
+
+
+def _unconvert_hash(definition_id: int) -> int:
+    return definition_id + (1 << 32) if definition_id < 0 else definition_id
+
+
+def _activity_rows(definitions: Iterator[Tuple[int, Any]]) -> Iterator[Tuple[Any, ...]]:
+    for activity_id, raw in definitions:
+        definition = json.loads(raw)
+        name = definition.get("displayProperties", {}).get("name", "")
+        mode = definition.get("directActivityModeType")
+        activity_class = classify(_unconvert_hash(activity_id), name, mode)
+        yield (activity_id,
+               name,
+               mode,
+               definition.get("tier"),
+               definition.get("activityTypeHash"),
+               activity_class.family.value,
+               _value(activity_class.raid),
+               _value(activity_class.dungeon),
+               _value(activity_class.difficulty))
 
-    def _convert_hash(self, activity_hash):
-        # see https://github.com/vpzed/Destiny2-API-Info/wiki/API-Introduction-Part-3-Manifest#converting-hashes-for-the-sqlite-db
-        if (activity_hash & (1 << (32 - 1))) != 0:
-            return activity_hash - (1 << 32)
-        else:
-            return activity_hash
 
+def _value(member: Optional[Enum]) -> Optional[str]:
+    return member.value if member is not None else None
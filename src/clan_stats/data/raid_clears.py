@@ -0,0 +1,108 @@
+import sqlite3
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from logging import getLogger
+from pathlib import Path
+from types import TracebackType
+from typing import Optional, Iterable, ContextManager, Type, Self, Mapping
+
+from clan_stats.data.activity_classification import Raid
+from clan_stats.data.manifest import Manifest
+from clan_stats.data.types.activities import Activity
+
+log = getLogger(__name__)
+
+# Raids are counted from here the first time a player's clears are counted.
+COUNTED_FROM = datetime(year=2022, month=1, day=1, tzinfo=timezone.utc)
+
+# Activities appear in a player's history once they are over, but are dated from when they started. Searching again
+# from a little before the last search finds the raids still being played at the time.
+SEARCH_OVERLAP = timedelta(hours=6)
+
+
+class RaidClears(ContextManager):
+    """Each player's raid clears, kept between runs so each run only counts the raids played since the last.
+
+    Clears are counted by player, raid and the day the raid started, so the clears since any day are a sum of the
+    counts rather than a search of the raids. With each player is stored the start of the latest raid counted and
+    when their raids were last searched: raids are counted once, as a player only plays one activity at a time.
+    """
+
+    @classmethod
+    def path(cls, base_path: Path = Path("cache")) -> Path:
+        return base_path.joinpath("raid_clears.sqlite")
+
+    def __init__(self, db_path: Path):
+        self._db_path = db_path
+        self._connection: Optional[sqlite3.Connection] = None
+
+    def __enter__(self) -> Self:
+        self._db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(self._db_path)
+        self._connection.execute("CREATE TABLE IF NOT EXISTS clears ("
+                                 "membership_id INTEGER NOT NULL, raid TEXT NOT NULL, day TEXT NOT NULL, "
+                                 "count INTEGER NOT NULL, PRIMARY KEY (membership_id, raid, day))")
+        self._connection.execute("CREATE TABLE IF NOT EXISTS counted (membership_id INTEGER PRIMARY KEY, "
+                                 "latest REAL NOT NULL, searched REAL NOT NULL)")
+        return self
+
+    def __exit__(self,
+                 exception_type: Type[BaseException] | None,
+                 exception: BaseException | None,
+                 traceback: TracebackType | None) -> bool | None:
+        self._connection.close()
+        self._connection = None
+        return False
+
+    def search_start(self, membership_id: int) -> datetime:
+        """Where to start retrieving the player's raids to count the ones not yet counted."""
+        row = self._connection.execute("SELECT latest, searched FROM counted WHERE membership_id = ?",
+                                       (membership_id,)).fetchone()
+        if row is None:
+            return COUNTED_FROM
+        latest, searched = row
+        return max(_from_timestamp(latest), _from_timestamp(searched) - SEARCH_OVERLAP)
+
+    def add(self, membership_id: int, raids: Iterable[Activity], manifest: Manifest, searched: datetime) -> None:
+        """Count the player's clears in `raids`, retrieved from `search_start` at time `searched`.
+
+        Raids that started before `search_start` have been counted already and are skipped.
+        """
+        start = self.search_start(membership_id)
+        latest = start
+        counts: Counter = Counter()
+        for activity in raids:
+            activity_start = activity.time_period.start
+            if activity_start <= start:
+                continue
+            latest = max(latest, activity_start)
+            if activity.completed is True:
+                raid = manifest.get_activity_class(activity.director_activity_hash).raid
+                counts[(raid if raid is not None else Raid.UNKNOWN, activity_start.date())] += 1
+
+        with self._connection:
+            self._connection.executemany(
+                "INSERT INTO clears VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (membership_id, raid, day) DO UPDATE SET count = count + excluded.count",
+                [(membership_id, raid.name, day.isoformat(), count) for (raid, day), count in counts.items()])
+            self._connection.execute("INSERT OR REPLACE INTO counted VALUES (?, ?, ?)",
+                                     (membership_id, latest.timestamp(), searched.timestamp()))
+        log.debug("Counted %s new raid clears for %s", sum(counts.values()), membership_id)
+
+    def clears(self, membership_id: int, since: Optional[datetime] = None) -> Optional[Mapping[Raid, int]]:
+        """The player's clears of each raid, of raids started on or after the day of `since`.
+
+        None if the player's clears have never been counted.
+        """
+        if self._connection.execute("SELECT 1 FROM counted WHERE membership_id = ?",
+                                    (membership_id,)).fetchone() is None:
+            return None
+        day = since.astimezone(timezone.utc).date().isoformat() if since is not None else ""
+        return Counter({Raid[raid]: count
+                        for raid, count in self._connection.execute(
+                            "SELECT raid, SUM(count) FROM clears WHERE membership_id = ? AND day >= ? GROUP BY raid",
+                            (membership_id, day))})
+
+
+def _from_timestamp(timestamp: float) -> datetime:
+    return datetime.fromtimestamp(timestamp, timezone.utc)
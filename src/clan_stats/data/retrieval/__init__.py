@@ -1 +1,2 @@
-from .default_data_retriever import get_default_data_retriever, get_data_retriever, DataRetrieverType
\ No newline at end of file
+from .default_data_retriever import get_default_data_retriever, get_data_retriever, DataRetrieverType
+from .._bungie_api.request_scheduler import Priority, request_priority
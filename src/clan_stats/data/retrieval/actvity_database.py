@@ -4,6 +4,7 @@ from pathlib import Path
 from typing import ContextManager, MutableMapping, Optional, Sequence, Iterator, Iterable
 
 from clan_stats.data.types.activities import Activity
+from clan_stats.data.types.activity_table import ActivityTable
 from clan_stats.data.types.individuals import Membership
 
 
@@ -36,6 +37,13 @@ class ActivityDatabase:
         key = str(int(activity.time_period.start.timestamp()))
         self.db[key] = json.dumps(activity.model_dump(mode="json"))
 
+    def table(self, min_start_date: Optional[datetime] = None) -> ActivityTable:
+        """The stored activities that started after `min_start_date`, in order, decoded straight into a table."""
+        keys = sorted(int(key) for key in self.db)
+        if min_start_date is not None:
+            keys = [k for k in keys if k > min_start_date.timestamp()]
+        return ActivityTable.from_json(self.db[str(k)] for k in keys)
+
     def keys(self) -> Iterator[datetime]:
         for key in self.db:
             yield datetime.fromtimestamp(int(key), timezone.utc)
\ No newline at end of file
@@ -1,61 +1,83 @@
 import asyncio
 import logging
-import os
-import shutil
-import tempfile
-import urllib.request
-import zipfile
 from datetime import datetime
+from functools import partial
 from pathlib import Path
-from typing import Union, Sequence, Optional
+from types import TracebackType
+from typing import Union, Sequence, Optional, AsyncIterator, Awaitable, TypeVar, Type
 
+import aiohttp
 from bungio import Client
+from bungio.error import BungieException
 from bungio.models import DestinyComponentType, BungieMembershipType, \
     GroupsForMemberFilter, GroupType
 
-from clan_stats.data._bungie_api.api_helpers import activity_history_to
+from clan_stats.data._bungie_api.api_helpers import activity_history_to, check_activity_page_size
 from clan_stats.data._bungie_api.bungie_enums import GameMode
+from clan_stats.data._bungie_api.bungie_exceptions import PrivacyError
+from clan_stats.data._bungie_api.bungie_net import bungie_net_url
 from clan_stats.data._bungie_api.bungie_type_adapters import player_from_group_member, player_from_user_membership_data, \
-    activity_from_destiny_activity, activity_with_post
+    activity_from_destiny_activity, activity_with_post, completions_from_aggregate_stats
 from clan_stats.data._bungie_api.bungie_types import GroupResponse, SearchResultOfGroupMember, DestinyProfileResponse, \
-    UserMembershipData, GetGroupsForMemberResponse, DestinyActivityHistoryResults, DestinyHistoricalStatsPeriodGroup, \
-    DestinyPostGameCarnageReportData, DestinyManifest
+    UserMembershipData, GetGroupsForMemberResponse, ActivityHistoryPage, ActivityHistoryEntry, \
+    DestinyPostGameCarnageReportData, DestinyManifest, DestinyAggregateActivityResults
+from clan_stats.data._bungie_api.manifest_download import download_manifest
+from clan_stats.data._bungie_api.request_scheduler import RequestScheduler
 from clan_stats.data._bungie_api.typed_wrapper import find_clan_group
-from clan_stats.data.manifest import Manifest, SqliteManifest
+from clan_stats.data.manifest import Manifest
 from clan_stats.data.retrieval.data_retriever import DataRetriever
-from clan_stats.data.types.activities import Activity, ActivityWithPost
+from clan_stats.data.retrieval.manifest_manager import ManifestManager, DEFAULT_MANIFEST_DIRECTORY
+from clan_stats.data.types.activities import Activity, ActivityWithPost, ActivityCompletions
 from clan_stats.data.types.clan import Clan
 from clan_stats.data.types.individuals import Player, MinimalPlayer, Character, Membership
-from clan_stats.util.async_utils import retrieve_paged
-from clan_stats.util.itertools import flatten, only
-from clan_stats.util.stopwatch import Stopwatch
+from clan_stats.util.async_utils import retrieve_paged, iter_paged
+from clan_stats.util.itertools import flatten
 from clan_stats.util.time import require_tz_aware_datetime
 
 logger = logging.getLogger(__name__)
 
 _PAGE_SIZE = 50
 
+# Bungie's error code for data a player has chosen to keep private
+_DESTINY_PRIVACY_RESTRICTION = 1665
+
+_T = TypeVar("_T")
+
 
 class BungioDataRetriever(DataRetriever):
 
-    def __init__(self, api_key: str):
+    def __init__(self,
+                 api_key: str,
+                 page_size: int = _PAGE_SIZE,
+                 scheduler: Optional[RequestScheduler] = None,
+                 manifest_directory: Path = DEFAULT_MANIFEST_DIRECTORY):
+        self._page_size = check_activity_page_size(page_size)
+        self._scheduler = scheduler if scheduler is not None else RequestScheduler()
         self._client = Client(
             bungie_client_id="",
             bungie_client_secret="",
             bungie_token=api_key,
         )
+        self._manifests = ManifestManager(manifest_directory,
+                                          fetch_content_path=self._manifest_content_path,
+                                          download=self._download_manifest)
+
+    async def __aexit__(self, exception_type: Type[BaseException] | None, exception: BaseException | None,
+                        traceback: TracebackType | None) -> bool | None:
+        await self._manifests.close()
+        return None
 
     async def get_player(self, player_id: int) -> Player:
-        raw_data = await self._client.api.get_membership_data_by_id(player_id, BungieMembershipType.NONE)
+        raw_data = await self._scheduled(self._client.api.get_membership_data_by_id(player_id, BungieMembershipType.NONE))
         return player_from_user_membership_data(
             UserMembershipData.model_validate(
                 raw_data))
 
     async def get_characters_for_player(self, minimal_player: MinimalPlayer) -> Sequence[Character]:
-        characters = DestinyProfileResponse.model_validate(await self._client.api.get_profile(
+        characters = DestinyProfileResponse.model_validate(await self._scheduled(self._client.api.get_profile(
             minimal_player.primary_membership.membership_id,
             minimal_player.primary_membership.membership_type,
-            components=[DestinyComponentType.CHARACTERS]))
+            components=[DestinyComponentType.CHARACTERS])))
         return [
             Character(
                 membership=Membership(membership_id=character.membershipId,
@@ -66,11 +88,18 @@ class BungioDataRetriever(DataRetriever):
                 player=minimal_player)
             for character in characters.characters.data.values()]
 
+    async def get_last_played(self, player: MinimalPlayer) -> Optional[datetime]:
+        profile = DestinyProfileResponse.model_validate(await self._scheduled(self._client.api.get_profile(
+            player.primary_membership.membership_id,
+            player.primary_membership.membership_type,
+            components=[DestinyComponentType.PROFILES, DestinyComponentType.CHARACTERS])))
+        return profile.last_played()
+
     async def get_clan(self, clan_id: int) -> Clan:
         logging.info("Getting clan %s", clan_id)
-        clan_group = GroupResponse.model_validate(await self._client.api.get_group(clan_id))
+        clan_group = GroupResponse.model_validate(await self._scheduled(self._client.api.get_group(clan_id)))
         members = SearchResultOfGroupMember.model_validate(
-            await self._client.api.get_members_of_group(group_id=clan_id, currentpage=1))
+            await self._scheduled(self._client.api.get_members_of_group(group_id=clan_id, currentpage=1)))
 
         players = [player_from_group_member(m) for m in members.results]
         logging.debug("Clan %s (%s) has %s players", clan_id, clan_group.detail.name, len(players))
@@ -82,11 +111,11 @@ class BungioDataRetriever(DataRetriever):
 
     async def get_clan_for_player(self, player: Player) -> Optional[Clan]:
         groups = GetGroupsForMemberResponse.model_validate(
-            await self._client.api.get_groups_for_member(
+            await self._scheduled(self._client.api.get_groups_for_member(
                 filter=GroupsForMemberFilter.ALL,
                 group_type=GroupType.CLAN,
                 membership_id=player.primary_membership.membership_id,
-                membership_type=player.primary_membership.membership_type))
+                membership_type=player.primary_membership.membership_type)))
 
         clan_group = find_clan_group(groups.results)
 
@@ -107,16 +136,45 @@ class BungioDataRetriever(DataRetriever):
                 player.primary_membership.membership_type,
                 c.character_id,
                 mode=int(mode),
+                min_start_date=min_start_date,
             )
             for c in characters]))
 
         return [activity_from_destiny_activity(a) for a in raw_activities]
 
+    async def iter_activities_for_player(self, player: MinimalPlayer, min_start_date: Optional[datetime] = None,
+                                         mode: GameMode = GameMode.NONE) -> AsyncIterator[Sequence[Activity]]:
+        if min_start_date is not None:
+            require_tz_aware_datetime(min_start_date)
+        characters = await self.get_characters_for_player(player)
+
+        for c in characters:
+            async for page in iter_paged(
+                    partial(self._get_activity_history_page,
+                            player.primary_membership.membership_id,
+                            player.primary_membership.membership_type,
+                            c.character_id,
+                            int(mode)),
+                    enough=activity_history_to(min_start_date),
+                    page_size=self._page_size):
+                yield [activity_from_destiny_activity(a) for a in page]
+
+    async def get_activity_completions(self, player: MinimalPlayer) -> ActivityCompletions:
+        characters = await self.get_characters_for_player(player)
+        character_stats = await asyncio.gather(*[
+            self._scheduled(self._client.api.get_destiny_aggregate_activity_stats(
+                character_id=character.character_id,
+                destiny_membership_id=player.primary_membership.membership_id,
+                membership_type=player.primary_membership.membership_type))
+            for character in characters])
+        return completions_from_aggregate_stats(
+            flatten([DestinyAggregateActivityResults.model_validate(s).activities for s in character_stats]))
+
     async def get_post_for_activity(self, activity: Activity) -> ActivityWithPost:
         return activity_with_post(
             activity=activity,
             post=DestinyPostGameCarnageReportData.model_validate(
-                await self._client.api.get_post_game_carnage_report(activity.instance_id)))
+                await self._scheduled(self._client.api.get_post_game_carnage_report(activity.instance_id))))
 
     async def find_players(self, identifier: Union[int, str]) -> Sequence[Player]:
         raise NotImplementedError
@@ -125,38 +183,7 @@ class BungioDataRetriever(DataRetriever):
         #     await self._client.api.search_by_global_name_post())
 
     async def get_manifest(self) -> Manifest:
-
-        logger.debug("Retrieving Destiny Manifest")
-        stopwatch = Stopwatch.started()
-        target_dir = Path.cwd()
-        target_filebase = "manifest"
-        target_extension = "sqlite3"
-
-        manifest_url_base = "https://www.bungie.net/"
-
-        manifest = DestinyManifest.model_validate(await self._client.api.get_destiny_manifest())
-        download_path = manifest.mobileWorldContentPaths['en']
-
-        output_download_path = download_path.replace("/", "_")
-        manifest_path = target_dir.joinpath(f"{target_filebase}_{output_download_path}.{target_extension}")
-
-        if not manifest_path.exists():
-            logger.debug("Downloading new manifest from %s", download_path)
-            self._remove_old_manifests(target_dir, target_filebase, target_extension)
-            with (
-                urllib.request.urlopen(manifest_url_base + download_path) as response,
-                tempfile.TemporaryFile() as tmpfile,
-                open(manifest_path, 'wb') as output_file
-            ):
-                shutil.copyfileobj(response, tmpfile)
-                with zipfile.ZipFile(tmpfile, 'r') as zipped:
-                    file = only(zipped.namelist())
-                    bytes = zipped.read(file)
-                    output_file.write(bytes)
-            logger.info("Downloaded and unzipped manifest to %s", manifest_path)
-
-        logger.debug("Retrieved manifest to %s in %s", manifest_path, stopwatch.elapsed())
-        return SqliteManifest(manifest_path)
+        return await self._manifests.get_manifest()
 
     async def _get_activity_history(
             self,
@@ -164,22 +191,42 @@ class BungioDataRetriever(DataRetriever):
             membership_type,
             character_id: int,
             mode: int = 0,
-            min_start_date: Optional[datetime] = None) -> Sequence[DestinyHistoricalStatsPeriodGroup]:
-        async def _get_page(page_num: int) -> Sequence[DestinyHistoricalStatsPeriodGroup]:
-            response = DestinyActivityHistoryResults.model_validate(
-                await self._client.api.get_activity_history(
-                    destiny_membership_id=membership_id,
-                    membership_type=membership_type,
-                    character_id=character_id,
-                    mode=mode,
-                    count=_PAGE_SIZE,
-                    page=page_num,
-                ))
-            return response.activities
-
-        return await retrieve_paged(_get_page, enough=activity_history_to(min_start_date))
-
-    def _remove_old_manifests(self, manifest_dir: Path, target_base: str,  target_extension: str) -> None:
-        for path in manifest_dir.glob(f"{target_base}_*.{target_extension}"):
-            logger.debug("Removing old manifest %s", path)
-            os.unlink(path)
+            min_start_date: Optional[datetime] = None) -> Sequence[ActivityHistoryEntry]:
+        return await retrieve_paged(partial(self._get_activity_history_page,
+                                            membership_id, membership_type, character_id, mode),
+                                    enough=activity_history_to(min_start_date),
+                                    page_size=self._page_size)
+
+    async def _get_activity_history_page(self,
+                                         membership_id: int,
+                                         membership_type,
+                                         character_id: int,
+                                         mode: int,
+                                         page_num: int) -> Sequence[ActivityHistoryEntry]:
+        response = ActivityHistoryPage.model_validate(
+            await self._scheduled(self._client.api.get_activity_history(
+                destiny_membership_id=membership_id,
+                membership_type=membership_type,
+                character_id=character_id,
+                mode=mode,
+                count=self._page_size,
+                page=page_num,
+            )))
+        return response.activities
+
+    async def _scheduled(self, request: Awaitable[_T]) -> _T:
+        async with self._scheduler.slot():
+            try:
+                return await request
+            except BungieException as err:
+                if err.code == _DESTINY_PRIVACY_RESTRICTION:
+                    raise PrivacyError(message=err.message, original_exception=err) from err
+                raise
+
+    async def _manifest_content_path(self) -> str:
+        manifest = DestinyManifest.model_validate(await self._scheduled(self._client.api.get_destiny_manifest()))
+        return manifest.mobileWorldContentPaths['en']
+
+    async def _download_manifest(self, path: str, target: Path) -> None:
+        async with aiohttp.ClientSession() as session:
+            await download_manifest(session, bungie_net_url() + path, target, scheduler=self._scheduler)
@@ -6,7 +6,7 @@ from functools import partial
 from pathlib import Path
 from types import TracebackType
 from typing import Union, Sequence, Optional, Iterator, MutableMapping, NamedTuple, Generic, \
-    TypeVar, Callable, Awaitable, Type, Mapping, Any
+    TypeVar, Callable, Awaitable, Type, Mapping, Any, ContextManager, AsyncIterator
 from logging import getLogger
 
 from pydantic import BaseModel
@@ -17,7 +17,8 @@ from clan_stats.data.manifest import Manifest
 from clan_stats.data.retrieval.actvity_database import ActivityDatabase
 from clan_stats.data.retrieval.data_retriever import DataRetriever
 from clan_stats.data.retrieval.databases import KeyValueDatabase
-from clan_stats.data.types.activities import Activity, ActivityWithPost
+from clan_stats.data.types.activities import Activity, ActivityWithPost, ActivityCompletions
+from clan_stats.data.types.activity_table import ActivityTable
 from clan_stats.data.types.clan import Clan
 from clan_stats.data.types.individuals import Player, MinimalPlayer, Character, Membership
 from clan_stats.util import time
@@ -67,28 +68,37 @@ class CachedDataRetriever(DataRetriever):
             yield ActivityDatabase(db)
 
     async def get_player(self, player_id: int) -> Player:
-        with self.database("players") as db:
-            return await _get_with_cache(db, player_id, PLAYER_CACHE_LIFETIME,
-                                         Player,
-                                         partial(self._delegate.get_player, player_id))
+        return await _get_with_cache(partial(self.database, "players"), player_id, PLAYER_CACHE_LIFETIME,
+                                     Player,
+                                     partial(self._delegate.get_player, player_id))
 
     async def get_characters_for_player(self, minimal_player: MinimalPlayer) -> Sequence[Character]:
-        with self.database("player_characters") as db:
-            return await _get_with_cache(
-                db,
-                minimal_player.primary_membership.membership_id,
-                PLAYER_CACHE_LIFETIME,
-                Character,
-                partial(self._delegate.get_characters_for_player, minimal_player))
+        return await _get_with_cache(
+            partial(self.database, "player_characters"),
+            minimal_player.primary_membership.membership_id,
+            PLAYER_CACHE_LIFETIME,
+            Character,
+            partial(self._delegate.get_characters_for_player, minimal_player))
+
+    async def get_last_played(self, player: MinimalPlayer) -> Optional[datetime]:
+        async def get_from_delegate() -> _LastPlayed:
+            return _LastPlayed(date=await self._delegate.get_last_played(player))
+
+        last_played = await _get_with_cache(
+            partial(self.database, "player_last_played"),
+            player.primary_membership.membership_id,
+            PLAYER_CACHE_LIFETIME,
+            _LastPlayed,
+            get_from_delegate)
+        return last_played.date
 
     async def get_clan_for_player(self, player: Player) -> Optional[Clan]:
-        with self.database("player_clan") as db:
-            return await _get_with_cache(
-                db,
-                player.primary_membership.membership_id,
-                PLAYER_CACHE_LIFETIME,
-                Clan,
-                partial(self._delegate.get_clan_for_player, player))
+        return await _get_with_cache(
+            partial(self.database, "player_clan"),
+            player.primary_membership.membership_id,
+            PLAYER_CACHE_LIFETIME,
+            Clan,
+            partial(self._delegate.get_clan_for_player, player))
 
     async def get_activities_for_player(
             self,
@@ -100,51 +110,10 @@ class CachedDataRetriever(DataRetriever):
             # Caching only set up for all activities
             return await self._delegate.get_activities_for_player(player, min_start_date, mode)
 
-        with (self.activity_database(player.primary_membership) as db):
-            cache_status = self._activity_cache_dates_db
-            try:
-                cache_date: TimeStampedData = cache_status[player.primary_membership.membership_id]
-            except KeyError:
-                logger.info("No cached activities for player %s", player.name)
-                cache_date = TimeStampedData(
-                    timestamp=datetime.fromtimestamp(0, timezone.utc),
-                    data=datetime.fromtimestamp(0, timezone.utc))
-
-            activity_dates = list(db.keys())
-
-            if (self._need_recent_data(cache_date, activity_dates, min_start_date)
-                    or self._need_older_data(cache_date, activity_dates, min_start_date)):
-                if not self._need_older_data(cache_date, activity_dates, min_start_date):
-                    logger.info("Stale cache, getting recent activities for player %s", player.name)
-                    new_data = await self._delegate.get_activities_for_player(
-                        player,
-                        min_start_date=cache_date.timestamp)
-                    db.update(new_data)
-                    if len(new_data) == 0:
-                        cache_start_date = now().timestamp()
-                    else:
-                        cache_start_date = min(
-                            (a.time_period.start.timestamp() for a in new_data))
-                    cache_status[player.primary_membership.membership_id] = cache_start_date
-                else:
-                    logger.info("Stale chache, getting full activities for player %s", player.name)
-                    # Need whole data set
-                    try:
-                        new_data = await self._delegate.get_activities_for_player(
-                            player,
-                            min_start_date=min_start_date)
-                    except PrivacyError:
-                        cache_status[player.primary_membership.membership_id] = None
-                        return []
-
-                    db.update(new_data)
-                    if len(new_data) == 0:
-                        cache_start_date = now().timestamp()
-                    else:
-                        cache_start_date = min(
-                            (a.time_period.start.timestamp() for a in new_data))
-                    cache_status[player.primary_membership.membership_id] = cache_start_date
-                    return new_data
+        with self.activity_database(player.primary_membership) as db:
+            fetched = await self._update_activity_cache(db, player, min_start_date)
+            if fetched is not None:
+                return fetched
 
             if min_start_date is None:
                 return [db.get(k) for k in sorted(db.keys())]
@@ -153,6 +122,129 @@ class CachedDataRetriever(DataRetriever):
                         for k in
                         filter(lambda d: d > min_start_date, sorted(db.keys()))]
 
+    async def get_activity_table_for_player(self,
+                                            player: MinimalPlayer,
+                                            min_start_date: Optional[datetime] = None
+                                            ) -> ActivityTable:
+        with self.activity_database(player.primary_membership) as db:
+            fetched = await self._update_activity_cache(db, player, min_start_date)
+            if fetched is not None:
+                return ActivityTable.from_activities(fetched)
+            return db.table(min_start_date)
+
+    async def _update_activity_cache(self,
+                                     db: ActivityDatabase,
+                                     player: MinimalPlayer,
+                                     min_start_date: Optional[datetime]) -> Optional[Sequence[Activity]]:
+        """Bring the player's cached activities up to date.
+
+        Returns the activities when the whole history had to be retrieved, or None when the cache has them.
+        """
+        cache_status = self._activity_cache_dates_db
+        cache_date = self._activity_cache_date(player)
+
+        activity_dates = list(db.keys())
+
+        if (self._need_recent_data(cache_date, activity_dates, min_start_date)
+                or self._need_older_data(cache_date, activity_dates, min_start_date)):
+            if not self._need_older_data(cache_date, activity_dates, min_start_date):
+                logger.info("Stale cache, getting recent activities for player %s", player.name)
+                new_data = await self._delegate.get_activities_for_player(
+                    player,
+                    min_start_date=cache_date.timestamp)
+                db.update(new_data)
+                if len(new_data) == 0:
+                    cache_start_date = now().timestamp()
+                else:
+                    cache_start_date = min(
+                        (a.time_period.start.timestamp() for a in new_data))
+                cache_status[player.primary_membership.membership_id] = cache_start_date
+            else:
+                logger.info("Stale chache, getting full activities for player %s", player.name)
+                # Need whole data set
+                try:
+                    new_data = await self._delegate.get_activities_for_player(
+                        player,
+                        min_start_date=min_start_date)
+                except PrivacyError:
+                    cache_status[player.primary_membership.membership_id] = None
+                    return []
+
+                db.update(new_data)
+                if len(new_data) == 0:
+                    cache_start_date = now().timestamp()
+                else:
+                    cache_start_date = min(
+                        (a.time_period.start.timestamp() for a in new_data))
+                cache_status[player.primary_membership.membership_id] = cache_start_date
+                return new_data
+
+        return None
+
+    async def iter_activities_for_player(
+            self,
+            player: MinimalPlayer,
+            min_start_date: Optional[datetime] = None,
+            mode: GameMode = GameMode.NONE
+    ) -> AsyncIterator[Sequence[Activity]]:
+        if mode != GameMode.NONE:
+            # Caching only set up for all activities
+            async for activities in self._delegate.iter_activities_for_player(player, min_start_date, mode):
+                yield activities
+            return
+
+        with (self.activity_database(player.primary_membership) as db):
+            cache_status = self._activity_cache_dates_db
+            cache_date = self._activity_cache_date(player)
+
+            activity_dates = list(db.keys())
+
+            if self._need_older_data(cache_date, activity_dates, min_start_date):
+                logger.info("Stale cache, streaming full activities for player %s", player.name)
+                # Need whole data set, which is passed on as it arrives rather than read back from the cache
+                oldest_start: Optional[datetime] = None
+                try:
+                    async for new_data in self._delegate.iter_activities_for_player(
+                            player,
+                            min_start_date=min_start_date):
+                        db.update(new_data)
+                        batch_start = min(a.time_period.start for a in new_data)
+                        oldest_start = batch_start if oldest_start is None else min(oldest_start, batch_start)
+                        yield new_data
+                except PrivacyError:
+                    cache_status[player.primary_membership.membership_id] = None
+                    raise
+                cache_status[player.primary_membership.membership_id] = (
+                    now() if oldest_start is None else oldest_start).timestamp()
+                return
+
+            if self._need_recent_data(cache_date, activity_dates, min_start_date):
+                logger.info("Stale cache, streaming recent activities for player %s", player.name)
+                oldest_start = None
+                async for new_data in self._delegate.iter_activities_for_player(
+                        player,
+                        min_start_date=cache_date.timestamp):
+                    db.update(new_data)
+                    batch_start = min(a.time_period.start for a in new_data)
+                    oldest_start = batch_start if oldest_start is None else min(oldest_start, batch_start)
+                cache_status[player.primary_membership.membership_id] = (
+                    now() if oldest_start is None else oldest_start).timestamp()
+
+            cached = [db.get(k)
+                      for k in sorted(db.keys())
+                      if min_start_date is None or k > min_start_date]
+            if len(cached) > 0:
+                yield cached
+
+    def _activity_cache_date(self, player: MinimalPlayer) -> 'TimeStampedData':
+        try:
+            return self._activity_cache_dates_db[player.primary_membership.membership_id]
+        except KeyError:
+            logger.info("No cached activities for player %s", player.name)
+            return TimeStampedData(
+                timestamp=datetime.fromtimestamp(0, timezone.utc),
+                data=datetime.fromtimestamp(0, timezone.utc))
+
     def _need_recent_data(self,
                           cache_date: 'TimeStampedData',
                           activity_dates: Sequence[datetime],
@@ -170,14 +262,21 @@ class CachedDataRetriever(DataRetriever):
                 and (len(activity_dates) == 0
                      or (min_start_date is not None and min(activity_dates) > min_start_date)))
 
+    async def get_activity_completions(self, player: MinimalPlayer) -> ActivityCompletions:
+        return await _get_with_cache(
+            partial(self.database, "player_activity_completions"),
+            player.primary_membership.membership_id,
+            PLAYER_CACHE_LIFETIME,
+            ActivityCompletions,
+            partial(self._delegate.get_activity_completions, player))
+
     async def get_post_for_activity(self, activity: Activity) -> ActivityWithPost:
-        with self.database("post_activities") as db:
-            return await _get_with_cache(
-                db,
-                activity.instance_id,
-                ACTIVITY_CACHE_LIFETIME,
-                ActivityWithPost,
-                partial(self._delegate.get_post_for_activity, activity))
+        return await _get_with_cache(
+            partial(self.database, "post_activities"),
+            activity.instance_id,
+            ACTIVITY_CACHE_LIFETIME,
+            ActivityWithPost,
+            partial(self._delegate.get_post_for_activity, activity))
 
     async def find_players(self, identifier: Union[int, str]) -> Sequence[Player]:
         return await self._delegate.find_players(identifier)
@@ -186,13 +285,12 @@ class CachedDataRetriever(DataRetriever):
         return await self._delegate.get_manifest()
 
     async def get_clan(self, clan_id: int) -> Clan:
-        with self.database("clans") as db:
-            return await _get_with_cache(
-                db,
-                clan_id,
-                PLAYER_CACHE_LIFETIME,
-                Clan,
-                partial(self._delegate.get_clan, clan_id))
+        return await _get_with_cache(
+            partial(self.database, "clans"),
+            clan_id,
+            PLAYER_CACHE_LIFETIME,
+            Clan,
+            partial(self._delegate.get_clan, clan_id))
 
 
 _T = TypeVar('_T')
@@ -201,6 +299,11 @@ _V = TypeVar('_V')
 _K_str_int = TypeVar('_K_str_int', str, int)
 
 
+class _LastPlayed(BaseModel):
+    # `_get_with_cache` stores pydantic models, so the date is wrapped in one
+    date: Optional[datetime]
+
+
 class TimeStampedData(NamedTuple, Generic[_T]):
     timestamp: datetime
     data: _T
@@ -277,25 +380,29 @@ def _expired(timestamp: datetime, lifetime: timedelta):
     return time.now() - timestamp > lifetime
 
 
-async def _get_with_cache(cache: TimeStampedDataMappingWrapper[_T],
+async def _get_with_cache(open_cache: Callable[[], ContextManager[TimeStampedDataMappingWrapper[_T]]],
                           key: _K_str_int,
                           lifetime: timedelta,
                           pydantic_type: Type[_BaseModelT],
                           supplier: Callable[[], Awaitable[_BaseModelT]]):
-    try:
-        data = cache[key]
-    except KeyError:
-        logger.debug("No cache value for %s", key)
-        value = await supplier()
-        cache[key] = _pydantic_to_python(value)
-        return value
-
-    if _expired(data.timestamp, lifetime):
+    # The cache is only open while it is read or written, not while waiting for `supplier`, so that concurrent
+    # requests can use the same cache: a database file can only be open once at a time.
+    with open_cache() as cache:
+        try:
+            data = cache[key]
+        except KeyError:
+            logger.debug("No cache value for %s", key)
+            data = None
+
+    if data is not None and not _expired(data.timestamp, lifetime):
+        return _python_to_pydantic(data.data, pydantic_type)
+
+    if data is not None:
         logger.debug("Expired cache value for %s", key)
-        value = await supplier()
+    value = await supplier()
+    with open_cache() as cache:
         cache[key] = _pydantic_to_python(value)
-        return value
-    return _python_to_pydantic(data.data, pydantic_type)
+    return value
 
 
 def _pydantic_to_python(pydantic_object: BaseModel | Sequence[BaseModel]
@@ -1,13 +1,24 @@
 import abc
-from datetime import datetime
+from collections import defaultdict
+from datetime import datetime, timezone
 from types import TracebackType
-from typing import List, Sequence, Mapping, Dict, Union, Optional, AsyncContextManager, Type
+from typing import Sequence, Mapping, Union, Optional, AsyncContextManager, Type, AsyncIterator, Tuple, Iterable, \
+    Dict
 
 from .._bungie_api.bungie_enums import GameMode
+from .._bungie_api.bungie_exceptions import PrivacyError
 from ..manifest import Manifest
-from ..types.activities import ActivityWithPost, Activity
+from ..types.activities import ActivityWithPost, Activity, ActivityCompletions
+from ..types.activity_table import ActivityTable
 from ..types.clan import Clan
 from ..types.individuals import Player, Character, MinimalPlayer
+from ...util.async_utils import merge_async_iterators, collect_settled, Result, ProgressCallback
+
+# Players whose activities are retrieved at once by `iter_clan_activities`.
+DEFAULT_MAX_CONCURRENT_PLAYERS = 10
+
+# Before Destiny 2's first activity, so activities since then are a player's whole history.
+_HISTORY_START = datetime(2017, 9, 1, tzinfo=timezone.utc)
 
 
 class DataRetriever(AsyncContextManager, abc.ABC):
@@ -27,6 +38,37 @@ class DataRetriever(AsyncContextManager, abc.ABC):
     async def get_characters_for_player(self, minimal_player: MinimalPlayer) -> Sequence[Character]:
         raise NotImplementedError()
 
+    async def get_last_played(self, player: MinimalPlayer) -> Optional[datetime]:
+        """When the player last played, or None if that isn't known.
+
+        This default takes the start of the player's latest activity. History is newest first, so only the newest
+        page of each character's history is retrieved. Retrievers that can read the date the profile keeps instead
+        override it.
+        """
+        last_played: Optional[datetime] = None
+        async for activities in self.iter_activities_for_player(player):
+            latest = max(a.time_period.start for a in activities)
+            if last_played is None or latest > last_played:
+                last_played = latest
+        return last_played
+
+    async def get_last_played_for_player_list(self,
+                                              players: Iterable[MinimalPlayer],
+                                              max_concurrent: int = DEFAULT_MAX_CONCURRENT_PLAYERS,
+                                              on_progress: Optional[ProgressCallback] = None
+                                              ) -> Mapping[str, Result[Optional[datetime]]]:
+        """When each player last played, keyed by player name, with up to `max_concurrent` players at once.
+
+        As with `get_activities_for_player_list`, a player whose date can't be retrieved doesn't stop the others.
+        """
+        players_by_name = {p.name: p for p in players}
+
+        async def get_last_played(name: str) -> Optional[datetime]:
+            return await self.get_last_played(players_by_name[name])
+
+        return await collect_settled(players_by_name.keys(), get_last_played, max_concurrent,
+                                     on_progress=on_progress, private_errors=(PrivacyError,))
+
     @abc.abstractmethod
     async def get_clan(self, clan_id: int) -> Clan:
         raise NotImplementedError()
@@ -43,13 +85,108 @@ class DataRetriever(AsyncContextManager, abc.ABC):
                                         ) -> Sequence[Activity]:
         raise NotImplementedError()
 
+    async def iter_activities_for_player(self,
+                                         player: MinimalPlayer,
+                                         min_start_date: Optional[datetime] = None,
+                                         mode: GameMode = GameMode.NONE
+                                         ) -> AsyncIterator[Sequence[Activity]]:
+        """Yield a player's activities in batches as they are retrieved, rather than all at once.
+
+        Retrievers that page through the activity history yield each page as it arrives. This default yields
+        everything from `get_activities_for_player` as a single batch.
+        """
+        activities = await self.get_activities_for_player(player, min_start_date, mode)
+        if activities:
+            yield activities
+
+    async def get_activity_table_for_player(self,
+                                            player: MinimalPlayer,
+                                            min_start_date: Optional[datetime] = None
+                                            ) -> ActivityTable:
+        """A player's activities as an `ActivityTable`.
+
+        This default converts the activities from `get_activities_for_player`. Retrievers that store activities can
+        load the table directly.
+        """
+        return ActivityTable.from_activities(await self.get_activities_for_player(player, min_start_date))
+
+    async def iter_clan_activities(self,
+                                   clan: Clan,
+                                   min_start_date: Optional[datetime] = None,
+                                   mode: GameMode = GameMode.NONE,
+                                   max_concurrent: int = DEFAULT_MAX_CONCURRENT_PLAYERS
+                                   ) -> AsyncIterator[Tuple[MinimalPlayer, Sequence[Activity]]]:
+        """Yield batches of activities for every player in the clan, each with its player, in the order they arrive.
+
+        The activities of up to `max_concurrent` players are retrieved at once.
+        """
+        async for player, activities in merge_async_iterators(
+                ((p, self.iter_activities_for_player(p, min_start_date, mode)) for p in clan.players),
+                max_concurrent):
+            yield player, activities
+
     async def get_activities_for_player_list(self,
-                                             players: List[Player],
-                                             mode: GameMode = GameMode.NONE) -> Mapping[Player, Sequence[Activity]]:
-        result: Dict[Player, Sequence[Activity]] = dict()
-        for player in players:
-            result[player] = await self.get_activities_for_player(player, mode=mode)
-        return result
+                                             players: Iterable[MinimalPlayer],
+                                             min_start_date: Optional[datetime] = None,
+                                             mode: GameMode = GameMode.NONE,
+                                             max_concurrent: int = DEFAULT_MAX_CONCURRENT_PLAYERS,
+                                             on_progress: Optional[ProgressCallback] = None,
+                                             min_start_dates: Optional[Mapping[str, datetime]] = None
+                                             ) -> Mapping[str, Result[Sequence[Activity]]]:
+        """Get the activities of each player, keyed by player name, with up to `max_concurrent` players at once.
+
+        `min_start_dates` gives players, by name, their own start date instead of `min_start_date`. A player whose
+        activities can't be retrieved doesn't stop the others: their `Result` is private or holds the error
+        instead.
+        """
+        players_by_name = {p.name: p for p in players}
+        min_start_dates = min_start_dates if min_start_dates is not None else {}
+
+        async def get_activities(name: str) -> Sequence[Activity]:
+            player = players_by_name[name]
+            activities = await self.get_activities_for_player(player,
+                                                              min_start_date=min_start_dates.get(name, min_start_date),
+                                                              mode=mode)
+            if activities is None:
+                # Some retrievers report private activities as missing rather than raising
+                raise PrivacyError(f"Activities of {name} are private",
+                                   membership_id=player.primary_membership.membership_id,
+                                   membership_type=player.primary_membership.membership_type)
+            return activities
+
+        return await collect_settled(players_by_name.keys(), get_activities, max_concurrent,
+                                     on_progress=on_progress, private_errors=(PrivacyError,))
+
+    async def get_activity_completions_for_player_list(self,
+                                                       players: Iterable[MinimalPlayer],
+                                                       max_concurrent: int = DEFAULT_MAX_CONCURRENT_PLAYERS,
+                                                       on_progress: Optional[ProgressCallback] = None
+                                                       ) -> Mapping[str, Result[ActivityCompletions]]:
+        """The activity completions of each player, keyed by player name, with up to `max_concurrent` at once.
+
+        As with `get_activities_for_player_list`, a player whose completions can't be retrieved doesn't stop the
+        others.
+        """
+        players_by_name = {p.name: p for p in players}
+
+        async def get_completions(name: str) -> ActivityCompletions:
+            return await self.get_activity_completions(players_by_name[name])
+
+        return await collect_settled(players_by_name.keys(), get_completions, max_concurrent,
+                                     on_progress=on_progress, private_errors=(PrivacyError,))
+
+    async def get_activity_completions(self, player: MinimalPlayer) -> ActivityCompletions:
+        """How many times the player has completed each activity, by director activity hash.
+
+        This default counts the completed activities in the player's whole history. Retrievers that can ask for
+        each character's aggregate activity stats override it, which takes one request per character.
+        """
+        completions: Dict[int, int] = defaultdict(int)
+        async for activities in self.iter_activities_for_player(player, _HISTORY_START):
+            for activity in activities:
+                if activity.completed is True:
+                    completions[activity.director_activity_hash] += 1
+        return ActivityCompletions(completions=completions)
 
     @abc.abstractmethod
     async def get_post_for_activity(self, activity: Activity) -> ActivityWithPost:
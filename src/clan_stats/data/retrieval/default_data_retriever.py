@@ -1,12 +1,13 @@
 import os
 from enum import StrEnum
-from pathlib import Path
 
 from clan_stats.config import ClanStatsConfig
+from clan_stats.data._bungie_api.request_scheduler import RequestScheduler
 from .aiobungie_rest_data_retriever import AioBungieRestDataRetriever
 from .bungio_data_retriever import BungioDataRetriever
 from .cached_data_retriever import CachedDataRetriever
 from .data_retriever import DataRetriever
+from .native_data_retriever import NativeDataRetriever
 
 
 def get_default_data_retriever(config: ClanStatsConfig) -> DataRetriever:
@@ -20,12 +21,27 @@ def get_default_data_retriever(config: ClanStatsConfig) -> DataRetriever:
 class DataRetrieverType(StrEnum):
     BUNGIO = "bungio"
     AIOBUNGIE_REST = "aiobungie_rest"
+    NATIVE = "native"
 
 
 def get_data_retriever(retriever: DataRetrieverType, config: ClanStatsConfig) -> DataRetriever:
+    scheduler = RequestScheduler(config.max_concurrent_requests)
     if retriever is DataRetrieverType.BUNGIO:
-        return BungioDataRetriever(config.bungie_api_key)
+        return BungioDataRetriever(config.bungie_api_key,
+                                   page_size=config.activity_page_size,
+                                   scheduler=scheduler,
+                                   manifest_directory=config.manifest_directory)
     if retriever is DataRetrieverType.AIOBUNGIE_REST:
         return CachedDataRetriever(
-            delegate=AioBungieRestDataRetriever(config.bungie_api_key),
-            database_directory=Path(".").joinpath("cache"))
+            delegate=AioBungieRestDataRetriever(config.bungie_api_key,
+                                                page_size=config.activity_page_size,
+                                                scheduler=scheduler,
+                                                manifest_directory=config.manifest_directory),
+            database_directory=config.cache_directory)
+    if retriever is DataRetrieverType.NATIVE:
+        return CachedDataRetriever(
+            delegate=NativeDataRetriever(config.bungie_api_key,
+                                         page_size=config.activity_page_size,
+                                         scheduler=scheduler,
+                                         manifest_directory=config.manifest_directory),
+            database_directory=config.cache_directory)
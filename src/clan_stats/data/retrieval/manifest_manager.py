@@ -0,0 +1,121 @@
+import asyncio
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, Awaitable, Optional, NamedTuple
+
+from clan_stats.data._bungie_api.request_scheduler import request_priority, Priority
+from clan_stats.data.manifest import Manifest, SqliteManifest, index_path_for
+from clan_stats.util import time
+from clan_stats.util.stopwatch import Stopwatch
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MANIFEST_DIRECTORY = Path("manifest")
+
+# How long the manifest version is trusted before checking Bungie for a newer one.
+MANIFEST_VERSION_LIFETIME = time.TP_1h
+
+_VERSION_FILE = "manifest_version.json"
+_MANIFEST_PREFIX = "manifest_"
+
+
+class _ManifestVersion(NamedTuple):
+    content_path: str  # the manifest's path on bungie.net, which changes with each version
+    checked: datetime
+
+
+class ManifestManager:
+    """Keeps the current Destiny manifest in a directory, shared by all the data retrievers.
+
+    The manifest version (its content path on bungie.net) is remembered between runs, so while it is recent
+    the manifest is used without asking Bungie. Once it is older than `version_lifetime` the manifest on disk is
+    still returned, and Bungie is checked in the background: a new version is downloaded beside the old one and
+    used from then on. Only when there is no manifest at all does the caller wait for the download.
+    """
+
+    def __init__(self,
+                 directory: Path,
+                 fetch_content_path: Callable[[], Awaitable[str]],
+                 download: Callable[[str, Path], Awaitable[None]],
+                 version_lifetime: timedelta = MANIFEST_VERSION_LIFETIME):
+        self._directory = directory
+        self._fetch_content_path = fetch_content_path
+        self._download = download
+        self._version_lifetime = version_lifetime
+        self._update_lock = asyncio.Lock()
+        self._background_check: Optional[asyncio.Task[Path]] = None
+
+    async def get_manifest(self) -> Manifest:
+        stopwatch = Stopwatch.started()
+        version = self._read_version()
+        if version is not None and self.manifest_path(version.content_path).exists():
+            self._remove_old_manifests(keep=self.manifest_path(version.content_path))
+            if time.now() - version.checked > self._version_lifetime:
+                self._start_background_check()
+            manifest_path = self.manifest_path(version.content_path)
+        else:
+            manifest_path = await self._update()
+        logger.debug("Retrieved manifest %s in %s", manifest_path, stopwatch.elapsed())
+        return SqliteManifest(manifest_path)
+
+    async def close(self) -> None:
+        """Stop any background check. An interrupted download is resumed by the next check."""
+        if self._background_check is not None:
+            self._background_check.cancel()
+            await asyncio.gather(self._background_check, return_exceptions=True)
+            self._background_check = None
+
+    def manifest_path(self, content_path: str) -> Path:
+        return self._directory.joinpath(_MANIFEST_PREFIX + content_path.replace("/", "_") + ".sqlite3")
+
+    def _start_background_check(self) -> None:
+        if self._background_check is not None and not self._background_check.done():
+            return
+        logger.debug("Checking for a new manifest in the background")
+        with request_priority(Priority.BACKGROUND):
+            self._background_check = asyncio.create_task(self._update())
+        self._background_check.add_done_callback(_log_failure)
+
+    async def _update(self) -> Path:
+        async with self._update_lock:
+            content_path = await self._fetch_content_path()
+            manifest_path = self.manifest_path(content_path)
+            if not manifest_path.exists():
+                logger.info("Downloading new manifest from %s", content_path)
+                self._directory.mkdir(parents=True, exist_ok=True)
+                await self._download(content_path, manifest_path)
+                logger.info("Downloaded and unzipped manifest to %s", manifest_path)
+            self._write_version(_ManifestVersion(content_path, time.now()))
+            return manifest_path
+
+    def _read_version(self) -> Optional[_ManifestVersion]:
+        try:
+            with open(self._directory.joinpath(_VERSION_FILE), "r") as f:
+                stored = json.load(f)
+            return _ManifestVersion(stored["content_path"],
+                                    datetime.fromtimestamp(stored["checked"], timezone.utc))
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _write_version(self, version: _ManifestVersion) -> None:
+        with open(self._directory.joinpath(_VERSION_FILE), "w") as f:
+            json.dump({"content_path": version.content_path, "checked": version.checked.timestamp()}, f)
+
+    def _remove_old_manifests(self, keep: Path) -> None:
+        # Another run that started before `keep` was downloaded may still be reading a manifest it replaced, so the
+        # old manifests are only removed once `keep` has been current for longer than the version lifetime.
+        replaced = datetime.fromtimestamp(keep.stat().st_mtime, timezone.utc)
+        if time.now() - replaced <= self._version_lifetime:
+            return
+        keep_files = {keep.name, index_path_for(keep).name}
+        for path in self._directory.glob(_MANIFEST_PREFIX + "*.sqlite3"):
+            if path.name not in keep_files:
+                logger.debug("Removing old manifest %s", path)
+                path.unlink(missing_ok=True)
+
+
+def _log_failure(task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning("Background manifest check failed: %s", task.exception())
@@ -0,0 +1,26 @@
+import logging
+from pathlib import Path
+from typing import Optional
+
+from clan_stats.data._bungie_api.bungie_exceptions import BungieApiError
+from clan_stats.data._bungie_api.native.native_typed_wrapper import NativeTypedWrapper, PAGE_SIZE
+from clan_stats.data._bungie_api.request_scheduler import RequestScheduler
+from clan_stats.data.retrieval.manifest_manager import DEFAULT_MANIFEST_DIRECTORY
+from clan_stats.data.retrieval.typed_wrapper_data_retriever import TypedWrapperDataRetriever
+
+logger = logging.getLogger(__name__)
+
+
+class NativeDataRetriever(TypedWrapperDataRetriever):
+    """Retrieves data with our own thin REST client rather than a third party Bungie library."""
+
+    _character_retrieval_errors = (BungieApiError,)
+
+    def __init__(self,
+                 api_key: str,
+                 page_size: int = PAGE_SIZE,
+                 scheduler: Optional[RequestScheduler] = None,
+                 manifest_directory: Path = DEFAULT_MANIFEST_DIRECTORY) -> None:
+        self._wrapper: NativeTypedWrapper
+        super().__init__(NativeTypedWrapper(api_key, page_size=page_size, scheduler=scheduler),
+                         manifest_directory=manifest_directory)
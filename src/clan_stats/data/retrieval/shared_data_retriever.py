@@ -0,0 +1,130 @@
+import asyncio
+from datetime import datetime
+from functools import partial
+from types import TracebackType
+from typing import Union, Sequence, Optional, Type, Dict, Tuple, TypeVar, Callable, Awaitable
+from logging import getLogger
+
+from clan_stats.data._bungie_api.bungie_enums import GameMode
+from clan_stats.data.manifest import Manifest
+from clan_stats.data.retrieval.data_retriever import DataRetriever
+from clan_stats.data.types.activities import Activity, ActivityWithPost, ActivityCompletions
+from clan_stats.data.types.clan import Clan
+from clan_stats.data.types.individuals import Player, MinimalPlayer, Character
+from clan_stats.util.time import require_tz_aware_datetime
+
+logger = getLogger(__name__)
+
+_K = TypeVar("_K")
+_T = TypeVar("_T")
+
+
+class SharedDataRetriever(DataRetriever):
+    """Keeps what it retrieves in memory, so several reports in one run share a single retrieval of the data.
+
+    A player's activities are kept with the date they were retrieved from, and later requests for activities since
+    then, in any mode, are answered from them. Retrieving the activities of the players from the earliest date any
+    report needs first means the reports retrieve no activities themselves.
+
+    Entering it while it is already open doesn't enter the delegate again, so reports that open their retriever
+    can be run inside one opened for all of them.
+    """
+
+    def __init__(self, delegate: DataRetriever):
+        self._delegate = delegate
+        self._depth = 0
+        # Retrievals are shared from when they start, so concurrent requests for the same data make one retrieval
+        self._clans: Dict[int, asyncio.Task[Clan]] = dict()
+        self._manifest: Dict[None, asyncio.Task[Manifest]] = dict()
+        self._characters: Dict[int, asyncio.Task[Sequence[Character]]] = dict()
+        self._last_played: Dict[int, asyncio.Task[Optional[datetime]]] = dict()
+        self._completions: Dict[int, asyncio.Task[ActivityCompletions]] = dict()
+        self._posts: Dict[int, asyncio.Task[ActivityWithPost]] = dict()
+        # Each player's activities, by membership id, with the start date they were retrieved from
+        self._activities: Dict[int, Tuple[Optional[datetime], asyncio.Task[Optional[Sequence[Activity]]]]] = dict()
+
+    async def __aenter__(self):
+        self._depth += 1
+        if self._depth == 1:
+            await self._delegate.__aenter__()
+        return self
+
+    async def __aexit__(self, exception_type: Type[BaseException] | None, exception: BaseException | None,
+                        traceback: TracebackType | None) -> bool | None:
+        self._depth -= 1
+        if self._depth == 0:
+            return await self._delegate.__aexit__(exception_type, exception, traceback)
+        return None
+
+    async def get_player(self, player_id: int) -> Player:
+        return await self._delegate.get_player(player_id)
+
+    async def get_characters_for_player(self, minimal_player: MinimalPlayer) -> Sequence[Character]:
+        return await _shared(self._characters,
+                             minimal_player.primary_membership.membership_id,
+                             partial(self._delegate.get_characters_for_player, minimal_player))
+
+    async def get_clan(self, clan_id: int) -> Clan:
+        return await _shared(self._clans, clan_id, partial(self._delegate.get_clan, clan_id))
+
+    async def get_clan_for_player(self, player: Player) -> Optional[Clan]:
+        return await self._delegate.get_clan_for_player(player)
+
+    async def get_last_played(self, player: MinimalPlayer) -> Optional[datetime]:
+        return await _shared(self._last_played,
+                             player.primary_membership.membership_id,
+                             partial(self._delegate.get_last_played, player))
+
+    async def get_activity_completions(self, player: MinimalPlayer) -> ActivityCompletions:
+        return await _shared(self._completions,
+                             player.primary_membership.membership_id,
+                             partial(self._delegate.get_activity_completions, player))
+
+    async def get_activities_for_player(self,
+                                        player: MinimalPlayer,
+                                        min_start_date: Optional[datetime] = None,
+                                        mode: GameMode = GameMode.NONE
+                                        ) -> Optional[Sequence[Activity]]:
+        if min_start_date is not None:
+            require_tz_aware_datetime(min_start_date)
+        membership_id = player.primary_membership.membership_id
+
+        if not self._retrieved_since(membership_id, min_start_date):
+            if mode != GameMode.NONE:
+                # Activities of one mode can't answer later requests for others
+                return await self._delegate.get_activities_for_player(player, min_start_date, mode)
+            logger.debug("Retrieving activities of %s since %s", player.name, min_start_date)
+            self._activities[membership_id] = (
+                min_start_date,
+                asyncio.ensure_future(self._delegate.get_activities_for_player(player, min_start_date)))
+
+        _, retrieval = self._activities[membership_id]
+        activities = await retrieval
+        if activities is None:
+            # Private
+            return None
+        return [a for a in activities
+                if (min_start_date is None or a.time_period.start > min_start_date)
+                and (mode == GameMode.NONE or mode in a.modes)]
+
+    def _retrieved_since(self, membership_id: int, min_start_date: Optional[datetime]) -> bool:
+        if membership_id not in self._activities:
+            return False
+        retrieved_from, _ = self._activities[membership_id]
+        return retrieved_from is None or (min_start_date is not None and retrieved_from <= min_start_date)
+
+    async def get_post_for_activity(self, activity: Activity) -> ActivityWithPost:
+        return await _shared(self._posts, activity.instance_id,
+                             partial(self._delegate.get_post_for_activity, activity))
+
+    async def find_players(self, identifier: Union[int, str]) -> Sequence[Player]:
+        return await self._delegate.find_players(identifier)
+
+    async def get_manifest(self) -> Manifest:
+        return await _shared(self._manifest, None, self._delegate.get_manifest)
+
+
+async def _shared(retrievals: Dict[_K, 'asyncio.Task[_T]'], key: _K, retrieve: Callable[[], Awaitable[_T]]) -> _T:
+    if key not in retrievals:
+        retrievals[key] = asyncio.ensure_future(retrieve())
+    return await retrievals[key]
@@ -1,7 +1,7 @@
 import logging
 from pydantic import Field
 from datetime import datetime, timedelta
-from typing import Sequence, Iterable, TypeVar, Optional
+from typing import Sequence, Iterable, TypeVar, Optional, Mapping
 
 from pydantic import BaseModel, ConfigDict
 
@@ -36,6 +36,14 @@ class Activity(BaseModel):
 
 class ActivityWithPost(Activity):
     players: Sequence[MinimalPlayerWithClan]
+    # The fireteam of each player, by membership id, where the report gives it
+    fireteam_ids: Mapping[int, int] = Field(default_factory=dict)
+
+
+class ActivityCompletions(BaseModel):
+    """How many times a player has completed each activity, by director activity hash, over all their characters."""
+    model_config = ConfigDict(frozen=True)
+    completions: Mapping[int, int]
 
 
 _T_Activity = TypeVar('_T_Activity', bound=Activity)
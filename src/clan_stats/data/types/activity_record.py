@@ -0,0 +1,111 @@
+"""Compact, unvalidated records of activities for the fireteam and event pipelines.
+
+`Activity` and `TimePeriod` are validated pydantic models, which is what the API and cache boundaries need, but
+costly to build and hold in bulk. Inside the pipelines activities are `ActivityRecord`s instead: slotted objects
+with times as whole epoch seconds, the resolution the API gives them in. They convert to and from the models
+where they cross a boundary.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Sequence, Optional
+
+from clan_stats.data._bungie_api.bungie_enums import GameMode
+from clan_stats.data.types.activities import Activity
+from clan_stats.util.time import TimePeriod
+
+
+class PeriodRecord:
+    __slots__ = ("start", "length")
+
+    def __init__(self, start: int, length: int):
+        self.start = start
+        self.length = length
+
+    @classmethod
+    def from_time_period(cls, time_period: TimePeriod) -> 'PeriodRecord':
+        return cls(int(time_period.start.timestamp()), int(time_period.length.total_seconds()))
+
+    @property
+    def end(self) -> int:
+        return self.start + self.length
+
+    def extend(self, other: 'PeriodRecord') -> None:
+        """Extend this period to cover `other` as well."""
+        end = max(self.end, other.end)
+        self.start = min(self.start, other.start)
+        self.length = end - self.start
+
+    def to_time_period(self) -> TimePeriod:
+        return TimePeriod(start=datetime.fromtimestamp(self.start, timezone.utc), length=timedelta(seconds=self.length))
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, PeriodRecord):
+            return NotImplemented
+        return self.start == other.start and self.length == other.length
+
+    def __repr__(self) -> str:
+        return f"PeriodRecord(start={self.start}, length={self.length})"
+
+
+class ActivityRecord:
+    __slots__ = ("instance_id", "director_activity_hash", "start", "length", "primary_mode", "modes", "completed")
+
+    def __init__(self,
+                 instance_id: int,
+                 director_activity_hash: int,
+                 start: int,
+                 length: int,
+                 primary_mode: GameMode,
+                 modes: Sequence[GameMode],
+                 completed: Optional[bool] = None):
+        self.instance_id = instance_id
+        self.director_activity_hash = director_activity_hash
+        self.start = start
+        self.length = length
+        self.primary_mode = primary_mode
+        self.modes = modes
+        self.completed = completed
+
+    @classmethod
+    def from_activity(cls, activity: Activity) -> 'ActivityRecord':
+        time_period = activity.time_period
+        return cls(activity.instance_id,
+                   activity.director_activity_hash,
+                   int(time_period.start.timestamp()),
+                   int(time_period.length.total_seconds()),
+                   activity.primary_mode,
+                   activity.modes,
+                   activity.completed)
+
+    @property
+    def end(self) -> int:
+        return self.start + self.length
+
+    @property
+    def period(self) -> PeriodRecord:
+        return PeriodRecord(self.start, self.length)
+
+    def combine(self, activity: Activity) -> None:
+        """Extend this record to cover another player's record of the same activity instance."""
+        if (activity.instance_id != self.instance_id
+                or activity.director_activity_hash != self.director_activity_hash
+                or activity.primary_mode != self.primary_mode
+                or activity.modes != self.modes):
+            raise ValueError("Cannot combine non-matching activities")
+        start = int(activity.time_period.start.timestamp())
+        end = max(self.end, start + int(activity.time_period.length.total_seconds()))
+        self.start = min(self.start, start)
+        self.length = end - self.start
+        if activity.completed != self.completed:
+            # Players who left early didn't complete an activity the others did
+            self.completed = None
+
+    def to_activity(self) -> Activity:
+        return Activity(instance_id=self.instance_id,
+                        director_activity_hash=self.director_activity_hash,
+                        time_period=self.period.to_time_period(),
+                        primary_mode=self.primary_mode,
+                        modes=self.modes,
+                        completed=self.completed)
+
+    def __repr__(self) -> str:
+        return f"ActivityRecord(instance_id={self.instance_id}, start={self.start}, length={self.length})"
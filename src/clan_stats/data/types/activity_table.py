@@ -0,0 +1,174 @@
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Sequence, Mapping, Dict, Optional, Self, NotRequired
+
+import numpy as np
+from pydantic import TypeAdapter
+from typing_extensions import TypedDict  # pydantic needs it before Python 3.12
+
+from clan_stats.data._bungie_api.bungie_enums import GameMode
+from clan_stats.data.types.activities import Activity
+from clan_stats.util.time import TimePeriod, require_tz_aware_datetime
+
+# Modes are numbered up to 92, so each activity's modes take two 64 bit words of the bitmask.
+_MODE_WORDS = 2
+
+# `completed` is stored as 1 or 0, or this where it is unknown.
+_COMPLETED_UNKNOWN = -1
+
+COLUMNS = ("instance_id", "director_activity_hash", "start", "duration", "primary_mode", "completed", "modes")
+
+
+class ActivityTable:
+    """Activities held column by column in NumPy arrays, for analytics over long activity histories.
+
+    `start` is seconds since the epoch and `duration` is seconds. `modes` is a bitmask with a row of
+    `_MODE_WORDS` words per activity: test it with `has_mode`. Filtering, sorting and grouping return new tables
+    that share no state with this one.
+
+    Activities converted back with `to_activities` have their modes in ascending order, whatever order they came
+    in.
+    """
+
+    def __init__(self,
+                 instance_id: np.ndarray,
+                 director_activity_hash: np.ndarray,
+                 start: np.ndarray,
+                 duration: np.ndarray,
+                 primary_mode: np.ndarray,
+                 completed: np.ndarray,
+                 modes: np.ndarray):
+        self.instance_id = instance_id.astype(np.int64, copy=False)
+        self.director_activity_hash = director_activity_hash.astype(np.uint32, copy=False)
+        self.start = start.astype(np.float64, copy=False)
+        self.duration = duration.astype(np.float64, copy=False)
+        self.primary_mode = primary_mode.astype(np.int16, copy=False)
+        self.completed = completed.astype(np.int8, copy=False)
+        self.modes = modes.astype(np.uint64, copy=False).reshape(-1, _MODE_WORDS)
+        if any(len(getattr(self, c)) != len(self.instance_id) for c in COLUMNS):
+            raise ValueError("Columns of an ActivityTable must have the same length")
+
+    @classmethod
+    def empty(cls) -> Self:
+        return cls.from_activities([])
+
+    @classmethod
+    def from_activities(cls, activities: Iterable[Activity]) -> Self:
+        activities = list(activities)
+        return cls(
+            instance_id=np.fromiter((a.instance_id for a in activities), np.int64, len(activities)),
+            director_activity_hash=np.fromiter((a.director_activity_hash for a in activities), np.uint32,
+                                               len(activities)),
+            start=np.fromiter((a.time_period.start.timestamp() for a in activities), np.float64, len(activities)),
+            duration=np.fromiter((a.time_period.length.total_seconds() for a in activities), np.float64,
+                                 len(activities)),
+            primary_mode=np.fromiter((a.primary_mode for a in activities), np.int16, len(activities)),
+            completed=np.fromiter((_completed(a.completed) for a in activities), np.int8, len(activities)),
+            modes=_modes_bitmask([a.modes for a in activities]))
+
+    @classmethod
+    def from_json(cls, raw_activities: Iterable[str | bytes]) -> Self:
+        """A table of activities stored as JSON by `Activity.model_dump_json`, without making `Activity`s."""
+        records = [_RECORD.validate_json(raw) for raw in raw_activities]
+        return cls(
+            instance_id=np.fromiter((r["instance_id"] for r in records), np.int64, len(records)),
+            director_activity_hash=np.fromiter((r["director_activity_hash"] for r in records), np.uint32,
+                                               len(records)),
+            start=np.fromiter((r["time_period"]["start"].timestamp() for r in records), np.float64, len(records)),
+            duration=np.fromiter((r["time_period"]["length"].total_seconds() for r in records), np.float64,
+                                 len(records)),
+            primary_mode=np.fromiter((r["primary_mode"] for r in records), np.int16, len(records)),
+            completed=np.fromiter((_completed(r.get("completed")) for r in records), np.int8, len(records)),
+            modes=_modes_bitmask([r["modes"] for r in records]))
+
+    @classmethod
+    def concatenate(cls, tables: Sequence['ActivityTable']) -> Self:
+        if len(tables) == 0:
+            return cls.empty()
+        return cls(**{c: np.concatenate([getattr(t, c) for t in tables]) for c in COLUMNS})
+
+    def __len__(self) -> int:
+        return len(self.instance_id)
+
+    def to_activities(self) -> Sequence[Activity]:
+        return [
+            Activity(
+                instance_id=int(self.instance_id[i]),
+                director_activity_hash=int(self.director_activity_hash[i]),
+                time_period=TimePeriod(start=datetime.fromtimestamp(self.start[i], timezone.utc),
+                                       length=timedelta(seconds=float(self.duration[i]))),
+                primary_mode=GameMode(int(self.primary_mode[i])),
+                modes=[GameMode(m) for m in _modes_in(self.modes[i])],
+                completed=None if self.completed[i] == _COMPLETED_UNKNOWN else bool(self.completed[i]))
+            for i in range(len(self))]
+
+    @property
+    def end(self) -> np.ndarray:
+        return self.start + self.duration
+
+    def has_mode(self, mode: GameMode) -> np.ndarray:
+        """Which activities have `mode` among their modes."""
+        word, bit = divmod(int(mode), 64)
+        return (self.modes[:, word] & np.uint64(1 << bit)) != 0
+
+    def filter(self, mask: np.ndarray) -> Self:
+        """The activities where `mask` is true, e.g. `table.filter(table.has_mode(GameMode.RAID))`."""
+        return self._take(mask)
+
+    def started_after(self, start: datetime) -> Self:
+        require_tz_aware_datetime(start)
+        return self.filter(self.start > start.timestamp())
+
+    def sort(self, by: str = "start", descending: bool = False) -> Self:
+        """The activities sorted by column `by`, keeping the order of activities that sort equal."""
+        order = np.argsort(getattr(self, by), kind="stable")
+        return self._take(order[::-1] if descending else order)
+
+    def group_by(self, by: str) -> Mapping[int, Self]:
+        """The activities split into a table for each value of column `by`, each keeping this table's order."""
+        keys = getattr(self, by)
+        order = np.argsort(keys, kind="stable")
+        values, first_rows = np.unique(keys[order], return_index=True)
+        groups: Dict[int, Self] = dict()
+        for value, rows in zip(values, np.split(order, first_rows[1:])):
+            groups[int(value)] = self._take(rows)
+        return groups
+
+    def _take(self, index: np.ndarray) -> Self:
+        return type(self)(**{c: getattr(self, c)[index] for c in COLUMNS})
+
+
+class _TimePeriodRecord(TypedDict):
+    start: datetime
+    length: timedelta
+
+
+class _ActivityRecord(TypedDict):
+    instance_id: int
+    director_activity_hash: int
+    time_period: _TimePeriodRecord
+    primary_mode: int
+    modes: Sequence[int]
+    completed: NotRequired[Optional[bool]]
+
+
+_RECORD = TypeAdapter(_ActivityRecord)
+
+
+def _completed(completed: Optional[bool]) -> int:
+    return _COMPLETED_UNKNOWN if completed is None else int(completed)
+
+
+def _modes_bitmask(modes_by_activity: Sequence[Iterable[int]]) -> np.ndarray:
+    bitmask = np.zeros((len(modes_by_activity), _MODE_WORDS), np.uint64)
+    for row, modes in enumerate(modes_by_activity):
+        for mode in modes:
+            word, bit = divmod(int(mode), 64)
+            bitmask[row, word] |= np.uint64(1 << bit)
+    return bitmask
+
+
+def _modes_in(bitmask: np.ndarray) -> Sequence[int]:
+    return [word * 64 + bit
+            for word in range(_MODE_WORDS)
+            for bit in range(64)
+            if int(bitmask[word]) >> bit & 1]
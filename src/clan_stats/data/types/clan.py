@@ -1,29 +1,87 @@
-from typing import List, Sequence
+from collections import defaultdict
+from typing import List, Sequence, Dict, Optional, Any
 
-from pydantic import BaseModel
+from pydantic import BaseModel, PrivateAttr, ConfigDict, field_validator
 
-from .individuals import Player, Character, GroupMinimalPlayer
-from ...util.itertools import first
+from .individuals import Character, GroupMinimalPlayer
 
 
 class Clan(BaseModel):
+    # Players and characters are kept as tuples, also when assigned, so the index can't miss a change to them
+    model_config = ConfigDict(validate_assignment=True)
+
     id: int
     name: str
     players: Sequence[GroupMinimalPlayer]
     characters: Sequence[Character]
 
-    def find_player_with_id(self, member_id) -> Player:
-        return first(filter(lambda p: p.member_id == member_id, self.players))
+    _index: Optional['_ClanIndex'] = PrivateAttr(default=None)
+
+    @field_validator("players", "characters")
+    @classmethod
+    def _immutable(cls, value: Sequence[Any]) -> Sequence[Any]:
+        return tuple(value)
+
+    def __eq__(self, other: Any) -> bool:
+        # Compares the fields only: whether the index has been built yet doesn't make clans differ
+        if not isinstance(other, Clan):
+            return NotImplemented
+        return type(self) is type(other) and self.__dict__ == other.__dict__
 
-    def player_by_name(self, name) -> Player:
-        return first(filter(lambda p: p.name == name, self.players))
+    def find_player_with_id(self, member_id: int) -> GroupMinimalPlayer:
+        """The player whose primary membership has id `member_id`."""
+        try:
+            return self._indexed().players_by_id[member_id]
+        except KeyError:
+            raise ValueError(f"No player with id {member_id} in clan {self.name}")
 
-    def characters_for_player(self, member_id) -> List[Character]:
-        return list(filter(lambda c: c.member_id == member_id, self.characters))
+    def player_by_name(self, name: str) -> GroupMinimalPlayer:
+        try:
+            return self._indexed().players_by_name[name]
+        except KeyError:
+            raise ValueError(f"No player named {name} in clan {self.name}")
 
-    def find_player_for_character(self, character_id) -> Player:
+    def is_member(self, member_id: int) -> bool:
+        return member_id in self._indexed().players_by_id
+
+    def characters_for_player(self, member_id: int) -> List[Character]:
+        return list(self._indexed().characters_by_player_id.get(member_id, []))
+
+    def find_player_for_character(self, character_id: int) -> GroupMinimalPlayer:
         character = self.character_from_id(character_id)
-        return self.find_player_with_id(character.member_id)
+        return self.find_player_with_id(character.player.primary_membership.membership_id)
+
+    def character_from_id(self, character_id: int) -> Character:
+        try:
+            return self._indexed().characters_by_id[character_id]
+        except KeyError:
+            raise ValueError(f"No character with id {character_id} in clan {self.name}")
+
+    def _indexed(self) -> '_ClanIndex':
+        # Rebuilt if the players or characters have been replaced since it was built
+        if self._index is None or not self._index.is_for(self):
+            self._index = _ClanIndex(self)
+        return self._index
+
+
+class _ClanIndex:
+    """Lookups of a clan's players and characters by id, built on first use rather than scanning for each one."""
+
+    def __init__(self, clan: Clan):
+        self._players = clan.players
+        self._characters = clan.characters
+
+        # The first of any duplicates is found, as it was by scanning
+        self.players_by_id: Dict[int, GroupMinimalPlayer] = dict()
+        self.players_by_name: Dict[str, GroupMinimalPlayer] = dict()
+        for player in clan.players:
+            self.players_by_id.setdefault(player.primary_membership.membership_id, player)
+            self.players_by_name.setdefault(player.name, player)
+        self.characters_by_id: Dict[int, Character] = dict()
+        self.characters_by_player_id: Dict[int, List[Character]] = defaultdict(list)
+        for character in clan.characters:
+            self.characters_by_id.setdefault(character.character_id, character)
+            self.characters_by_player_id[character.player.primary_membership.membership_id].append(character)
 
-    def character_from_id(self, character_id) -> Character:
-        return first(filter(lambda c: c.character_id == character_id, self.characters))
+    def is_for(self, clan: Clan) -> bool:
+        return clan.players is self._players and clan.characters is self._characters
@@ -38,6 +38,10 @@ class MinimalPlayer(BaseModel):
             return False
         return self.primary_membership == other.primary_membership
 
+    def __hash__(self) -> int:
+        # Consistent with __eq__, so players key dicts and sets by their primary membership
+        return hash(self.primary_membership)
+
     def __lt__(self, other):
         if isinstance(other, MinimalPlayer):
             return self.name < other.name
@@ -3,6 +3,7 @@ from datetime import timedelta, datetime
 from typing import Sequence, List, Iterable, Set, Iterator
 
 from clan_stats.data.types.activities import Activity
+from clan_stats.data.types.activity_record import PeriodRecord
 from clan_stats.fireteams import Fireteam
 from clan_stats.util.time import TP_1h
 
@@ -51,17 +52,22 @@ def _activity_end_time(a: Activity) -> datetime:
 def find_events(fireteams: Iterable[Fireteam],
                 max_gap: timedelta = TP_1h,
                 min_length: timedelta = timedelta(minutes=45)) -> Sequence[Event]:
-    sorted_fireteams = list(sorted(fireteams, key=lambda f: f.activity_start()))
+    # Events are grouped on whole second periods, read once from each fireteam's activity
+    periods = sorted(((PeriodRecord.from_time_period(f.activity.time_period), f) for f in fireteams),
+                     key=lambda p: p[0].start)
+    max_gap_seconds = max_gap.total_seconds()
 
-    prev_fireteam = sorted_fireteams[0]
+    prev_period, first_fireteam = periods[0]
+    result: List[Event] = [Event(fireteams=[first_fireteam])]
+    spans: List[PeriodRecord] = [PeriodRecord(prev_period.start, prev_period.length)]
 
-    result: List[Event] = [Event(fireteams=[prev_fireteam])]
-
-    for fireteam in sorted_fireteams[1:]:
-        if fireteam.activity_start() - prev_fireteam.activity_end() < max_gap:
+    for period, fireteam in periods[1:]:
+        if period.start - prev_period.end < max_gap_seconds:
             result[-1].add(fireteam)
+            spans[-1].extend(period)
         else:
             result.append(Event(fireteams=[fireteam]))
-        prev_fireteam = fireteam
+            spans.append(PeriodRecord(period.start, period.length))
+        prev_period = period
 
-    return list(e for e in result if e.length() > min_length)
+    return list(e for e, span in zip(result, spans) if span.length > min_length.total_seconds())
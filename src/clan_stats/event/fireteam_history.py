@@ -0,0 +1,120 @@
+import json
+import sqlite3
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from types import TracebackType
+from typing import Optional, Iterable, Sequence, ContextManager, Type, Self
+from logging import getLogger
+
+from clan_stats.data.types.activities import Activity
+from clan_stats.fireteams import Fireteam
+from clan_stats.util.time import TimePeriod
+
+log = getLogger(__name__)
+
+# Activities appear in a player's history once they are over, but are dated from when they started. Searching again
+# from a little before the end of the last search finds the activities still being played at the time.
+SEARCH_OVERLAP = timedelta(hours=6)
+
+
+class FireteamHistory(ContextManager):
+    """The shared fireteams found in a clan, kept between runs so each run only searches newer activities.
+
+    Fireteams are stored by activity instance, with the period of activities that has been searched. Fireteams
+    found again, e.g. in the overlap between searches, are merged with the stored fireteam. Reports then read the
+    fireteams for whatever date range they cover.
+    """
+
+    @classmethod
+    def path(cls, clan_id: int, base_path: Path = Path("cache")) -> Path:
+        return base_path.joinpath(f"fireteams_{clan_id}.sqlite")
+
+    def __init__(self, db_path: Path):
+        self._db_path = db_path
+        self._connection: Optional[sqlite3.Connection] = None
+
+    def __enter__(self) -> Self:
+        self._db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(self._db_path)
+        self._connection.execute("CREATE TABLE IF NOT EXISTS fireteam ("
+                                 "instance_id INTEGER PRIMARY KEY, start REAL NOT NULL, "
+                                 "activity TEXT NOT NULL, member_names TEXT NOT NULL)")
+        self._connection.execute("CREATE INDEX IF NOT EXISTS fireteam_start ON fireteam (start)")
+        self._connection.execute("CREATE TABLE IF NOT EXISTS searched (id INTEGER PRIMARY KEY CHECK (id = 0), "
+                                 "start REAL NOT NULL, end REAL NOT NULL)")
+        return self
+
+    def __exit__(self,
+                 exception_type: Type[BaseException] | None,
+                 exception: BaseException | None,
+                 traceback: TracebackType | None) -> bool | None:
+        self._connection.close()
+        self._connection = None
+        return False
+
+    def searched(self) -> Optional[TimePeriod]:
+        row = self._connection.execute("SELECT start, end FROM searched").fetchone()
+        if row is None:
+            return None
+        return TimePeriod.for_range(_from_timestamp(row[0]), _from_timestamp(row[1]))
+
+    def search_start(self, recency_limit: datetime) -> datetime:
+        """Where to start searching activities for the fireteams since `recency_limit`."""
+        searched = self.searched()
+        if searched is None or recency_limit < searched.start:
+            return recency_limit
+        return max(recency_limit, searched.end - SEARCH_OVERLAP)
+
+    def add(self, fireteams: Iterable[Fireteam], searched: Optional[TimePeriod]) -> None:
+        """Store the fireteams found by searching the activities in `searched`.
+
+        With `searched` None, e.g. when some players' activities couldn't be retrieved, the fireteams are stored
+        but the period searched is left as it was, so the activities are searched again next time.
+        """
+        with self._connection:
+            for fireteam in fireteams:
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO fireteam VALUES (?, ?, ?, ?)",
+                    _row(self._merged(fireteam)))
+            if searched is None:
+                return
+            previous = self.searched()
+            if previous is not None and searched.start <= previous.end and previous.start <= searched.end:
+                # Only a search overlapping the one before extends it: anything between them hasn't been searched
+                searched = searched.combine(previous)
+            self._connection.execute("INSERT OR REPLACE INTO searched VALUES (0, ?, ?)",
+                                     (searched.start.timestamp(), searched.end.timestamp()))
+        log.debug("Searched for fireteams from %s to %s", searched.start, searched.end)
+
+    def fireteams(self, recency_limit: datetime, min_size: int = 2) -> Sequence[Fireteam]:
+        """The stored fireteams in activities started after `recency_limit` with at least `min_size` members."""
+        fireteams = [_fireteam(activity, member_names)
+                     for activity, member_names in self._connection.execute(
+                         "SELECT activity, member_names FROM fireteam WHERE start > ? ORDER BY start",
+                         (recency_limit.timestamp(),))]
+        return [f for f in fireteams if len(f.member_names) >= min_size]
+
+    def _merged(self, fireteam: Fireteam) -> Fireteam:
+        row = self._connection.execute("SELECT activity, member_names FROM fireteam WHERE instance_id = ?",
+                                       (fireteam.activity.instance_id,)).fetchone()
+        if row is None:
+            return fireteam
+        stored = _fireteam(*row)
+        activity = fireteam.activity.model_copy(
+            update={"time_period": fireteam.activity.time_period.combine(stored.activity.time_period)})
+        return Fireteam(activity=activity, member_names=fireteam.member_names | stored.member_names)
+
+
+def _row(fireteam: Fireteam):
+    return (fireteam.activity.instance_id,
+            fireteam.activity.time_period.start.timestamp(),
+            fireteam.activity.model_dump_json(),
+            json.dumps(sorted(fireteam.member_names)))
+
+
+def _fireteam(activity: str, member_names: str) -> Fireteam:
+    return Fireteam(activity=Activity.model_validate_json(activity), member_names=set(json.loads(member_names)))
+
+
+def _from_timestamp(timestamp: float) -> datetime:
+    return datetime.fromtimestamp(timestamp, timezone.utc)
@@ -1,20 +1,27 @@
-import itertools
 from collections import defaultdict
 from datetime import datetime
 from types import TracebackType
-from typing import Mapping, Sequence, Dict, Set, TypeVar, Iterator, Iterable, AsyncContextManager, Type
+from typing import Mapping, Sequence, Dict, Set, Iterator, Iterable, AsyncContextManager, Type, Optional, Tuple
 from logging import getLogger
 
+from clan_stats.data.activity_classification import ModeFamily, mode_family
 from clan_stats.data.retrieval.data_retriever import DataRetriever
-from clan_stats.data.types.individuals import Player, MinimalPlayer
+from clan_stats.event.fireteam_history import FireteamHistory
+from clan_stats.data.types.individuals import Player, MinimalPlayer, GroupMinimalPlayer
 from clan_stats.fireteams import Fireteam
-from clan_stats.data.types.activities import Activity
-from clan_stats.util import async_utils
-from clan_stats.util.itertools import first, rest
-from clan_stats.util.time import is_tz_aware, TimePeriod
+from clan_stats.data.types.activities import Activity, ActivityWithPost
+from clan_stats.data.types.activity_record import ActivityRecord
+from clan_stats.util.async_utils import collect_settled
+from clan_stats.util.time import is_tz_aware, TimePeriod, now
 
 log = getLogger(__name__)
 
+# Activity families where players are matched with others, so may share an activity without being in a fireteam.
+MATCHMADE_FAMILIES = {ModeFamily.STRIKE, ModeFamily.CRUCIBLE, ModeFamily.GAMBIT}
+
+# Post game carnage reports retrieved at once when checking fireteams.
+MAX_CONCURRENT_POSTS = 10
+
 
 class SharedFireteamFinder(AsyncContextManager):
 
@@ -33,84 +40,181 @@ class SharedFireteamFinder(AsyncContextManager):
     async def shared_fireteams(self,
                                players: Iterable[MinimalPlayer],
                                recency_limit: datetime,
-                               min_size: int = 2) -> Sequence[Fireteam]:
+                               min_size: int = 2,
+                               clan_members: Optional[Iterable[MinimalPlayer]] = None,
+                               pgcr_budget: int = 0) -> Sequence[Fireteam]:
+        """Find the fireteams in activities shared by `players` since `recency_limit`.
+
+        Fireteams are found from the activities in the players' histories. With a `pgcr_budget`, up to that many
+        of the activities where that is ambiguous are checked against their post game carnage reports: those only
+        one of the players was in, which may have had other `clan_members` in the fireteam, and matchmade
+        activities, where players may have been in the same activity but not the same fireteam.
+        """
+        fireteams, _ = await self._search_fireteams(players, recency_limit, min_size, clan_members, pgcr_budget)
+        return fireteams
+
+    async def _search_fireteams(self,
+                                players: Iterable[MinimalPlayer],
+                                recency_limit: datetime,
+                                min_size: int,
+                                clan_members: Optional[Iterable[MinimalPlayer]],
+                                pgcr_budget: int) -> Tuple[Sequence[Fireteam], bool]:
+        """The shared fireteams, and whether the activities of all the players could be retrieved."""
         if not is_tz_aware(recency_limit):
             raise ValueError
+        players = list(players)
 
-        tasks_by_player_name = {player.name: self.get_recency_limited_activities_for_player(
-            player, recency_limit)
-            for player in players}
-
-        activities_by_player_name = await async_utils.collect_map(tasks_by_player_name)
-
-        return _find_shared_fireteams(activities_by_player_name, min_size=min_size)
-
-    async def get_recency_limited_activities_for_player(
-            self, player: MinimalPlayer, recency_limit: datetime) -> Sequence[Activity]:
-        log.debug(f"Getting activities for player {player.name}...")
-        return list(
-            filter(
-                lambda a: a.time_period.start > recency_limit,
-                await self._data_retriever.get_activities_for_player(
-                    player, min_start_date=recency_limit)))
-
-
-def _find_shared_fireteams(activities_by_player_name: Mapping[str, Sequence[Activity]],
-                           min_size: int = 2) -> Sequence[Fireteam]:
-    name_to_instance_ids = {player_name: set(map(lambda x: x.instance_id, v)) for player_name, v in
-                            activities_by_player_name.items()}
-
-    all_activities = _flatten(activities_by_player_name.values())
-    return _find_fireteams(name_to_instance_ids,
-                           _activities_by_instance_id(all_activities),
-                           min_size)
-
-
-def _combine_activities(activities: Sequence[Activity]) -> Activity:
-    first_activity = first(activities)
-    time_period: TimePeriod = first_activity.time_period
-
-    for activity in rest(activities):
-        if (activity.instance_id != first_activity.instance_id
-            or activity.director_activity_hash != first_activity.director_activity_hash
-            or activity.primary_mode != first_activity.primary_mode
-            or activity.modes != first_activity.modes):
-            raise ValueError("Cannot combine non-matching activities")
-        time_period = time_period.combine(activity.time_period)
-
-
-    return Activity(
-        instance_id=first_activity.instance_id,
-        director_activity_hash=first_activity.director_activity_hash,
-        primary_mode=first_activity.primary_mode,
-        modes=first_activity.modes,
-        time_period=time_period)
-
-
-def _activities_by_instance_id(activities: Iterable[Activity]) -> Mapping[int, Activity]:
-    def instance_id(a: Activity) -> int:
-        return a.instance_id
-
-    return {key: _combine_activities(list(group)) for key, group in itertools.groupby(sorted(activities, key=instance_id), key=instance_id)}
-
+        results = await self._data_retriever.get_activities_for_player_list(players, min_start_date=recency_limit)
 
+        # Fireteams are found among the players whose activities could be retrieved
+        activities_by_player_name: Dict[str, Sequence[Activity]] = dict()
+        for name, result in results.items():
+            if result.ok:
+                activities_by_player_name[name] = _recency_limited(result.value, recency_limit)
+            else:
+                log.warning("Leaving %s out of shared fireteams: activities %s (%s)",
+                            name, result.status.value, result.error)
+
+        instances = _InstanceIndex(activities_by_player_name)
+        if pgcr_budget > 0:
+            await self._check_posts(instances, clan_members if clan_members is not None else players, pgcr_budget)
+        return _find_fireteams(instances, min_size), len(activities_by_player_name) == len(results)
+
+    async def clan_fireteams(self,
+                             history: FireteamHistory,
+                             players: Iterable[GroupMinimalPlayer],
+                             recency_limit: datetime,
+                             min_size: int = 2,
+                             clan_members: Optional[Iterable[MinimalPlayer]] = None,
+                             pgcr_budget: int = 0) -> Sequence[Fireteam]:
+        """The shared fireteams since `recency_limit`, searching only the activities not already in `history`."""
+        if not is_tz_aware(recency_limit):
+            raise ValueError
 
-def _find_fireteams(name_to_instance_ids: Mapping[str, Set[int]],
-                    activities_by_instance_id: Mapping[int, Activity], min_size: int = 2):
-    fireteams: Dict[int, Fireteam] = dict()
-    for one, two in itertools.combinations(name_to_instance_ids.keys(), 2):
-        shared_ids = name_to_instance_ids[one].intersection(name_to_instance_ids[two])
-        for instance_id in shared_ids:
-            if instance_id not in fireteams:
-                fireteams[instance_id] = Fireteam(activity=activities_by_instance_id[instance_id],
-                                                  member_names={one, two})
+        search_start = history.search_start(recency_limit)
+        search_end = now()
+        # Only players online since the search start can have played newer activities
+        active_players = [p for p in players if p.last_online > search_start]
+        log.info("Searching %s players' activities since %s for fireteams", len(active_players), search_start)
+        found, complete = await self._search_fireteams(
+            active_players,
+            recency_limit=search_start,
+            min_size=2,
+            clan_members=clan_members if clan_members is not None else players,
+            pgcr_budget=pgcr_budget)
+        # Fireteams players left out were in would be missed for good if the period were recorded as searched
+        history.add(found, TimePeriod.for_range(search_start, search_end) if complete else None)
+
+        return history.fireteams(recency_limit, min_size=min_size)
+
+    async def _check_posts(self,
+                           instances: '_InstanceIndex',
+                           clan_members: Iterable[MinimalPlayer],
+                           pgcr_budget: int) -> None:
+        ambiguous = _ambiguous_instances(instances)
+        checked = ambiguous[:pgcr_budget]
+        if not checked:
+            return
+        log.info("Checking post game reports of %s of %s ambiguous activities", len(checked), len(ambiguous))
+
+        posts = await collect_settled(
+            checked,
+            lambda instance_id: self._data_retriever.get_post_for_activity(instances.activity(instance_id)),
+            max_concurrent=MAX_CONCURRENT_POSTS)
+
+        clan_names = {p.primary_membership.membership_id: p.name for p in clan_members}
+        for instance_id, result in posts.items():
+            if result.ok:
+                instances.members[instance_id] = _members_from_post(
+                    result.value, instances.members[instance_id], clan_names)
             else:
-                fireteams[instance_id].member_names.update({one, two})
-    return list(f for f in fireteams.values() if len(f.member_names) >= min_size)
+                log.warning("Could not check post game report of %s: %s", instance_id, result.error)
 
 
-T = TypeVar('T')
+def _recency_limited(activities: Sequence[Activity], recency_limit: datetime) -> Sequence[Activity]:
+    return list(filter(lambda a: a.time_period.start > recency_limit, activities))
 
 
-def _flatten(nested_sequence: Iterable[Iterable[T]]) -> Iterable[T]:
-    return itertools.chain.from_iterable(nested_sequence)
+def _find_shared_fireteams(activities_by_player_name: Mapping[str, Sequence[Activity]],
+                           min_size: int = 2) -> Sequence[Fireteam]:
+    return _find_fireteams(_InstanceIndex(activities_by_player_name), min_size)
+
+
+class _InstanceIndex:
+    """Each activity instance in the players' activities, with the players in it, indexed in one pass.
+
+    An instance only one player was in keeps that player's `Activity`. The players' activities of an instance
+    several of them were in are combined into an `ActivityRecord` as they are found. Only the fireteams found get
+    an `Activity` with the combined time period again.
+    """
+    __slots__ = ("members", "_activities", "_combined")
+
+    def __init__(self, activities_by_player_name: Mapping[str, Sequence[Activity]]):
+        self.members: Dict[int, Set[str]] = dict()
+        self._activities: Dict[int, Activity] = dict()
+        self._combined: Dict[int, ActivityRecord] = dict()
+        for player_name, activities in activities_by_player_name.items():
+            for activity in activities:
+                members = self.members.get(activity.instance_id)
+                if members is None:
+                    self.members[activity.instance_id] = {player_name}
+                    self._activities[activity.instance_id] = activity
+                    continue
+                members.add(player_name)
+                record = self._combined.get(activity.instance_id)
+                if record is None:
+                    record = ActivityRecord.from_activity(self._activities[activity.instance_id])
+                    self._combined[activity.instance_id] = record
+                record.combine(activity)
+
+    def activity(self, instance_id: int) -> Activity:
+        """The instance's activity, as the first player found in it had it."""
+        return self._activities[instance_id]
+
+    def combined_activity(self, instance_id: int) -> Activity:
+        """The instance's activity, covering the time any of the players was in it."""
+        activity = self._activities[instance_id]
+        record = self._combined.get(instance_id)
+        if record is None:
+            return activity
+        # Only the combined fields differ from the already validated activity
+        return activity.model_copy(update={"time_period": record.period.to_time_period(),
+                                           "completed": record.completed})
+
+
+def _ambiguous_instances(instances: _InstanceIndex) -> Sequence[int]:
+    """The instances whose fireteam the activity histories can't settle, most recent first."""
+    def is_ambiguous(instance_id: int) -> bool:
+        return (len(instances.members[instance_id]) == 1
+                or mode_family(instances.activity(instance_id).primary_mode) in MATCHMADE_FAMILIES)
+
+    return sorted(filter(is_ambiguous, instances.members),
+                  key=lambda instance_id: instances.activity(instance_id).time_period.start,
+                  reverse=True)
+
+
+def _members_from_post(post: ActivityWithPost, members: Set[str], clan_names: Mapping[int, str]) -> Set[str]:
+    """The clan members in the fireteam of `members` in the activity, according to its post game report."""
+    clanmates = {p.primary_membership.membership_id: clan_names[p.primary_membership.membership_id]
+                 for p in post.players
+                 if p.primary_membership.membership_id in clan_names}
+    if not post.fireteam_ids:
+        # Reports cached before fireteams were recorded only say who was in the activity
+        return members | set(clanmates.values())
+
+    by_fireteam: Dict[int, Set[str]] = defaultdict(set)
+    for membership_id, name in clanmates.items():
+        if membership_id in post.fireteam_ids:
+            by_fireteam[post.fireteam_ids[membership_id]].add(name)
+    # Matchmade players can be in the activity in different fireteams: take the one most of `members` were in
+    return max((names for names in by_fireteam.values() if names & members),
+               key=lambda names: (len(names & members), len(names)),
+               default=members)
+
+
+def _find_fireteams(instances: _InstanceIndex, min_size: int = 2) -> Sequence[Fireteam]:
+    # A fireteam is always shared by at least two players, even when min_size is smaller
+    min_members = max(2, min_size)
+    return [Fireteam(activity=instances.combined_activity(instance_id), member_names=members)
+            for instance_id, members in instances.members.items()
+            if len(members) >= min_members]
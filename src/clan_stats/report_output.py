@@ -0,0 +1,254 @@
+import csv
+import json
+import sys
+from abc import ABC, abstractmethod
+from datetime import datetime
+from enum import StrEnum
+from pathlib import Path
+from types import TracebackType, NoneType
+from typing import ClassVar, Optional, Dict, Type, Iterable, ContextManager, Self, TextIO, List, Any, Union, \
+    get_origin, get_args
+
+from pydantic import BaseModel, ConfigDict
+
+from clan_stats.exceptions import UserError
+from clan_stats.terminal import term
+
+# Rows of a Parquet report are written in groups of this many, so no more are held at once.
+PARQUET_ROW_GROUP_SIZE = 1000
+
+
+class OutputFormat(StrEnum):
+    TEXT = "text"
+    JSONL = "jsonl"
+    CSV = "csv"
+    PARQUET = "parquet"
+
+    def extension(self) -> str:
+        return self.value
+
+
+class ReportRow(BaseModel):
+    """One row of a report written for other programs to read. Each report's rows are a subclass, its schema."""
+    model_config = ConfigDict(frozen=True)
+
+    report: ClassVar[str]
+
+
+class MemberRow(ReportRow):
+    report: ClassVar[str] = "members"
+
+    clan_id: int
+    player: str
+    membership_id: int
+    discord_name: Optional[str]
+    last_active: Optional[datetime]
+    in_bungie_clan: bool
+    in_clan_database: bool
+
+
+class ClanFireteamRow(ReportRow):
+    """A member of a clan fireteam: one row for each of the fireteam's members."""
+    report: ClassVar[str] = "clan_fireteams"
+
+    clan_id: int
+    instance_id: int
+    activity: str
+    start: datetime
+    player: str
+
+
+class ClanEventRow(ReportRow):
+    """A participant in a clan event: one row for each of the event's participants."""
+    report: ClassVar[str] = "clan_events"
+
+    clan_id: int
+    start: datetime
+    end: datetime
+    activity: str
+    player: str
+
+
+class RaidClearsRow(ReportRow):
+    report: ClassVar[str] = "raid_clears"
+
+    clan_id: int
+    player: str
+    raid: str
+    clears: int
+
+
+class PlayerActivityRow(ReportRow):
+    report: ClassVar[str] = "player_activities"
+
+    player: str
+    membership_id: int
+    instance_id: int
+    activity: str
+    start: datetime
+    length_seconds: float
+    players: int
+    with_clanmates: bool
+
+
+class PlayerRow(ReportRow):
+    """A membership of a player found by a search: one row for each platform they have played on."""
+    report: ClassVar[str] = "players"
+
+    search: str
+    player: str
+    membership_id: int
+    platform: Optional[str]
+    platform_display_name: Optional[str]
+
+
+class ReportOutput(ContextManager):
+    """Writes report rows as they are computed, in a format for other programs to read.
+
+    JSON Lines are written to `destination`, or standard output, with each row naming its report. CSV and Parquet
+    have one schema to a file, so with a `destination` each report is written to its own file in that directory;
+    without, CSV of one report is written to standard output. While open, messages for people are written to
+    standard error so they don't mix with the rows.
+    """
+
+    def __init__(self, output_format: OutputFormat, destination: Optional[Path] = None):
+        if output_format is OutputFormat.TEXT:
+            raise ValueError("Text reports are printed, not written as rows")
+        if output_format is OutputFormat.PARQUET and destination is None:
+            raise UserError("Parquet reports need a directory to be written to")
+        self._format = output_format
+        self._destination = destination
+        self._writers: Dict[str, _RowWriter] = dict()
+
+    def __enter__(self) -> Self:
+        term.redirect(sys.stderr)
+        return self
+
+    def __exit__(self,
+                 exception_type: Type[BaseException] | None,
+                 exception: BaseException | None,
+                 traceback: TracebackType | None) -> bool | None:
+        try:
+            for writer in self._writers.values():
+                writer.close()
+        finally:
+            self._writers = dict()
+            term.redirect(None)
+        return False
+
+    def write(self, row: ReportRow) -> None:
+        if row.report not in self._writers:
+            self._writers[row.report] = self._open(type(row))
+        self._writers[row.report].write(row)
+
+    def write_all(self, rows: Iterable[ReportRow]) -> None:
+        for row in rows:
+            self.write(row)
+
+    def _open(self, schema: Type[ReportRow]) -> '_RowWriter':
+        if self._format is OutputFormat.JSONL:
+            # All reports share the one stream
+            shared = next(iter(self._writers.values()), None)
+            return shared if shared is not None else _JsonLinesWriter(self._open_text(self._destination))
+        if self._destination is None:
+            if len(self._writers) > 0:
+                raise UserError(f"{self._format.name} output of more than one report needs a directory")
+            return _CsvWriter(schema, sys.stdout, close_file=False)
+
+        self._destination.mkdir(parents=True, exist_ok=True)
+        path = self._destination.joinpath(f"{schema.report}.{self._format.extension()}")
+        if self._format is OutputFormat.CSV:
+            return _CsvWriter(schema, self._open_text(path))
+        return _ParquetWriter(schema, path)
+
+    @staticmethod
+    def _open_text(path: Optional[Path]) -> TextIO:
+        return open(path, "w", newline="", encoding="utf-8") if path is not None else sys.stdout
+
+
+class _RowWriter(ABC):
+
+    @abstractmethod
+    def write(self, row: ReportRow) -> None:
+        raise NotImplementedError()
+
+    @abstractmethod
+    def close(self) -> None:
+        raise NotImplementedError()
+
+
+class _JsonLinesWriter(_RowWriter):
+
+    def __init__(self, file: TextIO):
+        self._file = file
+
+    def write(self, row: ReportRow) -> None:
+        self._file.write(json.dumps({"report": row.report, **row.model_dump(mode="json")}) + "\n")
+        self._file.flush()
+
+    def close(self) -> None:
+        if self._file is not sys.stdout:
+            self._file.close()
+
+
+class _CsvWriter(_RowWriter):
+
+    def __init__(self, schema: Type[ReportRow], file: TextIO, close_file: bool = True):
+        self._file = file
+        self._close_file = close_file
+        self._writer = csv.DictWriter(file, fieldnames=list(schema.model_fields))
+        self._writer.writeheader()
+
+    def write(self, row: ReportRow) -> None:
+        self._writer.writerow(row.model_dump(mode="json"))
+        self._file.flush()
+
+    def close(self) -> None:
+        if self._close_file:
+            self._file.close()
+
+
+class _ParquetWriter(_RowWriter):
+
+    def __init__(self, schema: Type[ReportRow], path: Path):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise UserError("Parquet reports need pyarrow: install clan_stats with the parquet extra")
+        self._pyarrow = pyarrow
+        self._schema = pyarrow.schema([(name, _arrow_type(pyarrow, field.annotation))
+                                       for name, field in schema.model_fields.items()])
+        self._writer = pyarrow.parquet.ParquetWriter(path, self._schema)
+        self._rows: List[Dict[str, Any]] = list()
+
+    def write(self, row: ReportRow) -> None:
+        self._rows.append(row.model_dump())
+        if len(self._rows) >= PARQUET_ROW_GROUP_SIZE:
+            self._write_rows()
+
+    def close(self) -> None:
+        self._write_rows()
+        self._writer.close()
+
+    def _write_rows(self) -> None:
+        if len(self._rows) > 0:
+            self._writer.write_table(self._pyarrow.Table.from_pylist(self._rows, schema=self._schema))
+            self._rows = list()
+
+
+def _arrow_type(pyarrow, annotation: Any):
+    if get_origin(annotation) is Union:
+        # Only Optional: any field may be null
+        annotation, = (a for a in get_args(annotation) if a is not NoneType)
+    if annotation is bool:
+        return pyarrow.bool_()
+    if annotation is int:
+        return pyarrow.int64()
+    if annotation is float:
+        return pyarrow.float64()
+    if annotation is str:
+        return pyarrow.string()
+    if annotation is datetime:
+        return pyarrow.timestamp("us", tz="UTC")
+    raise TypeError(f"No Parquet type for {annotation}")
@@ -2,7 +2,7 @@ import os
 from contextlib import contextmanager
 from datetime import datetime, timezone
 from enum import Enum, auto
-from typing import Dict, List, TypeVar, Sequence, Tuple, Iterable, Optional, Iterator
+from typing import Dict, List, TypeVar, Sequence, Tuple, Iterable, Optional, Iterator, TextIO
 
 import blessed
 from tabulate import tabulate
@@ -34,6 +34,8 @@ class _Terminal(object):
         self._terminal: blessed.Terminal = blessed.Terminal(force_styling=True)
         self._blocked: bool = False
         self._buffer: Dict[MessageType, List[str]] = {i: [] for i in MessageType}
+        # None prints to whatever standard output is at the time
+        self._file: Optional[TextIO] = None
 
     def block(self):
         self._blocked = True
@@ -41,6 +43,10 @@ class _Terminal(object):
     def unblock(self):
         self._blocked = False
 
+    def redirect(self, file: Optional[TextIO]):
+        """Print to `file` from now on, or standard output if None."""
+        self._file = file
+
     def print_player_line(self,
                           player: MinimalPlayer,
                           discord_name=None,
@@ -102,7 +108,7 @@ class _Terminal(object):
                 self._print(message)
 
     def print_table(self, headings: Sequence[str], table: Sequence[Sequence[str]]):
-        print(tabulate(table, headers=headings))
+        print(tabulate(table, headers=headings), file=self._file)
 
     def print_columnar_list(self, str_list: Iterable[str]):
         if not self._blocked:
@@ -110,14 +116,20 @@ class _Terminal(object):
                 term.print(MessageType.TEXT, "   {:30s}   {:30s}  {:30s}".format(*line_batch))
 
     def _print(self, message: str) -> None:
-        print(self._terminal.truncate(message), flush=True)
+        print(self._terminal.truncate(message), flush=True, file=self._file)
 
     def _write(self, message: str) -> None:
-        print(self._terminal.truncate(message), end="", flush=True)
+        print(self._terminal.truncate(message), end="", flush=True, file=self._file)
 
     def buffer(self, type: MessageType, message: str):
         self._buffer[type].append(message)
 
+    def progress(self, message: str):
+        """Overwrite the current line with `message`, e.g. to count up work as it is done."""
+        if not self._blocked:
+            self.clear_bol()
+            self._write(message)
+
     def clear_bol(self):
         if not self._blocked:
             self._write(self._terminal.clear_bol + self._terminal.move_x(0))
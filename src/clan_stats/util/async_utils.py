@@ -1,7 +1,52 @@
 import asyncio
-from typing import List, Coroutine, TypeVar, Any, Callable, Awaitable, Optional, Sequence, Mapping
+import collections.abc
+import itertools
+from collections import deque
+from dataclasses import dataclass
+from enum import Enum
+from typing import List, Coroutine, TypeVar, Any, Callable, Awaitable, Optional, Sequence, Mapping, Iterable, \
+    AsyncIterator, Deque, Tuple, Set, Generic, Type, Dict
 
 T = TypeVar('T')
+K = TypeVar('K')
+
+_FINISHED = object()
+
+# Called with the number of keys finished and the total number of keys.
+ProgressCallback = Callable[[int, int], None]
+
+
+class ResultStatus(Enum):
+    VALUE = "value"
+    PRIVATE = "private"
+    ERROR = "error"
+
+
+@dataclass(frozen=True)
+class Result(Generic[T]):
+    """The outcome of one call in a batch: its value, or why there isn't one."""
+    status: ResultStatus
+    value: Optional[T] = None
+    error: Optional[BaseException] = None
+
+    @classmethod
+    def of(cls, value: T) -> 'Result[T]':
+        return cls(ResultStatus.VALUE, value=value)
+
+    @classmethod
+    def private(cls, error: Optional[BaseException] = None) -> 'Result[T]':
+        return cls(ResultStatus.PRIVATE, error=error)
+
+    @classmethod
+    def failed(cls, error: BaseException) -> 'Result[T]':
+        return cls(ResultStatus.ERROR, error=error)
+
+    @property
+    def ok(self) -> bool:
+        return self.status == ResultStatus.VALUE
+
+    def value_or(self, default: T) -> T:
+        return self.value if self.ok else default
 
 
 async def collect_results(coroutines: List[Coroutine[Any, Any, T]]) -> List[T]:
@@ -29,21 +74,164 @@ async def collect_map(coroutine_map: Mapping[str, Coroutine[Any, Any, T]]) -> Ma
     return results
 
 
+async def collect_settled(keys: Iterable[K],
+                          call: Callable[[K], Awaitable[T]],
+                          max_concurrent: int,
+                          on_progress: Optional[ProgressCallback] = None,
+                          private_errors: Tuple[Type[Exception], ...] = ()
+                          ) -> Mapping[K, Result[T]]:
+    """Call `call` for each key, at most `max_concurrent` at a time, and collect a `Result` for every key.
+
+    Unlike `collect_map`, a failing call doesn't cancel the others: its error is kept in its `Result`, and errors
+    of the `private_errors` types give a private result. Cancellation is not caught.
+    """
+    if max_concurrent < 1:
+        raise ValueError(f"max_concurrent must be at least 1, not {max_concurrent}")
+
+    keys = list(keys)
+    semaphore = asyncio.Semaphore(max_concurrent)
+    finished = 0
+
+    async def settle(key: K) -> Result[T]:
+        nonlocal finished
+        async with semaphore:
+            try:
+                result = Result.of(await call(key))
+            except private_errors as e:
+                result = Result.private(e)
+            except Exception as e:
+                result = Result.failed(e)
+        finished += 1
+        if on_progress is not None:
+            on_progress(finished, len(keys))
+        return result
+
+    results: Dict[K, Result[T]] = dict(zip(keys, await asyncio.gather(*[settle(k) for k in keys])))
+    return results
+
+
+async def bounded_in_order(coroutines: Iterable[Coroutine[Any, Any, T]], max_concurrent: int) -> AsyncIterator[T]:
+    """Run `coroutines` at most `max_concurrent` at a time, yielding their results in the order given.
+
+    Results that finish early wait in the window until everything before them has been yielded, so no more than
+    `max_concurrent` results are held at once. `coroutines` is consumed lazily, so it may be a generator over
+    any number of items. Closing the iterator early cancels whatever is still running.
+    """
+    if max_concurrent < 1:
+        raise ValueError(f"max_concurrent must be at least 1, not {max_concurrent}")
+
+    remaining = iter(coroutines)
+    window: Deque[asyncio.Task[T]] = deque(
+        asyncio.ensure_future(c) for c in itertools.islice(remaining, max_concurrent))
+    try:
+        while len(window) > 0:
+            result = await window.popleft()
+            for coroutine in itertools.islice(remaining, 1):
+                window.append(asyncio.ensure_future(coroutine))
+            yield result
+    finally:
+        for task in window:
+            task.cancel()
+        await asyncio.gather(*window, return_exceptions=True)
+
+
+async def merge_async_iterators(iterators: Iterable[Tuple[K, AsyncIterator[T]]],
+                                max_concurrent: int) -> AsyncIterator[Tuple[K, T]]:
+    """Yield the items of several async iterators as they arrive, each paired with the key given with its iterator.
+
+    At most `max_concurrent` iterators are consumed at once, and each waits for its last item to be taken before
+    producing another, so the items held are bounded however slowly they are consumed. An exception from any
+    iterator is raised here. Closing the merged iterator early closes those still running.
+    """
+    if max_concurrent < 1:
+        raise ValueError(f"max_concurrent must be at least 1, not {max_concurrent}")
+
+    remaining = iter(iterators)
+    queue: asyncio.Queue[Tuple[Any, Any, Optional[Exception]]] = asyncio.Queue(maxsize=max_concurrent)
+    tasks: Set[asyncio.Task[None]] = set()
+    active = 0
+
+    async def drain(key: K, iterator: AsyncIterator[T]) -> None:
+        error = None
+        try:
+            async for item in iterator:
+                await queue.put((key, item, None))
+        except Exception as e:
+            error = e
+        finally:
+            # Don't leave a cancelled generator suspended: it may be holding resources, e.g. an open database.
+            if isinstance(iterator, collections.abc.AsyncGenerator):
+                await iterator.aclose()
+        await queue.put((key, _FINISHED, error))
+
+    def start_next() -> int:
+        for key, iterator in itertools.islice(remaining, 1):
+            task = asyncio.ensure_future(drain(key, iterator))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+            return 1
+        return 0
+
+    try:
+        for _ in range(max_concurrent):
+            active += start_next()
+        while active > 0:
+            key, item, error = await queue.get()
+            if item is not _FINISHED:
+                yield key, item
+                continue
+            if error is not None:
+                raise error
+            active += start_next() - 1
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def iter_paged(get_page: Callable[[int], Awaitable[Sequence[T]]],
+                     enough: Optional[Callable[[Sequence[T]], bool]],
+                     page_size: Optional[int] = None
+                     ) -> AsyncIterator[Sequence[T]]:
+    """Yield pages from `get_page` as they are retrieved, the streaming form of `retrieve_paged`.
+
+    Here `enough` is given each page in turn rather than everything so far, so nothing is kept between pages.
+    """
+    n_pages = 0
+    while True:
+        page = await get_page(n_pages)
+        if len(page) > 0:
+            yield page
+        if _is_last_page(page, page_size) or enough is None or enough(page):
+            return
+        n_pages += 1
+
+
 async def retrieve_paged(get_page: Callable[[int], Awaitable[Sequence[T]]],
-                         enough: Optional[Callable[[Sequence[T]], bool]]
+                         enough: Optional[Callable[[Sequence[T]], bool]],
+                         page_size: Optional[int] = None
                          ) -> Sequence[T]:
+    """Retrieve pages from `get_page` until `enough` is satisfied or the pages run out.
+
+    Without `enough` only the first page is retrieved. If `page_size` is given, a page shorter than it is taken to
+    be the last, saving the request for the empty page after it.
+    """
     result = list(await get_page(0))
 
-    if enough is None or len(result) == 0:
+    if enough is None or _is_last_page(result, page_size):
         return result
 
     n_pages = 1
     while not enough(result):
         additional_results = await get_page(n_pages)
-        if len(additional_results) == 0:
-            # Empty page returned, no more objects to search for.
-            break
         result.extend(additional_results)
+        if _is_last_page(additional_results, page_size):
+            break
         n_pages += 1
 
     return result
+
+
+def _is_last_page(page: Sequence[Any], page_size: Optional[int]) -> bool:
+    # An empty page means there are no more objects to search for.
+    return len(page) == 0 or (page_size is not None and len(page) < page_size)
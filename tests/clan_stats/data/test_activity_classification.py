@@ -0,0 +1,17 @@
+from clan_stats.data._bungie_api.bungie_enums import GameMode
+from clan_stats.data.activity_classification import classify, ActivityClass, ModeFamily, Raid, Dungeon, Difficulty
+
+
+def test_classify_raid_from_name():
+    assert classify(4179289725, "Vow of the Disciple: Master", GameMode.RAID) == ActivityClass(
+        ModeFamily.RAID, raid=Raid.VOW, difficulty=Difficulty.MASTER)
+    # Some raid definitions don't say which raid they are
+    assert classify(4103176774, "Raid", None).raid == Raid.UNKNOWN
+
+
+def test_classify_dungeon_and_modes():
+    assert classify(2823159265, "Duality", None) == ActivityClass(ModeFamily.DUNGEON, dungeon=Dungeon.DUALITY)
+    assert classify(1, "The Glassway", GameMode.SCOREDNIGHTFALL).family == ModeFamily.STRIKE
+    assert classify(2, "Javelin-4", GameMode.CONTROL) == ActivityClass(ModeFamily.CRUCIBLE)
+    assert classify(3, "A new raid", GameMode.RAID) == ActivityClass(ModeFamily.RAID)
+    assert classify(4, "Something: Extreme", None) == ActivityClass(ModeFamily.OTHER)
@@ -0,0 +1,40 @@
+from datetime import timedelta
+
+import pytest
+
+from clan_stats.data.types.activity_record import ActivityRecord, PeriodRecord
+from clan_stats.util.time import TimePeriod
+from randomdata import random_activity
+
+
+def _whole_seconds_activity():
+    # Times from the API are whole seconds
+    activity = random_activity()
+    time_period = TimePeriod(start=activity.time_period.start.replace(microsecond=0),
+                             length=activity.time_period.length)
+    return activity.model_copy(update={"time_period": time_period})
+
+
+def test_activity_record_round_trip():
+    activity = _whole_seconds_activity()
+
+    record = ActivityRecord.from_activity(activity)
+
+    assert record.end == record.start + record.length
+    assert record.to_activity() == activity
+
+
+def test_activity_record_combine():
+    activity = _whole_seconds_activity().model_copy(update={"completed": True})
+    late_period = TimePeriod(start=activity.time_period.start + timedelta(minutes=5),
+                             length=activity.time_period.length)
+    late = activity.model_copy(update={"time_period": late_period, "completed": False})
+
+    record = ActivityRecord.from_activity(activity)
+    record.combine(late)
+
+    assert record.period == PeriodRecord.from_time_period(activity.time_period.combine(late.time_period))
+    # Only one of the players completed it
+    assert record.completed is None
+    with pytest.raises(ValueError):
+        record.combine(random_activity())
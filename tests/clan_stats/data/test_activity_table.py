@@ -0,0 +1,51 @@
+from datetime import datetime, timedelta, timezone
+
+from clan_stats.data._bungie_api.bungie_enums import GameMode
+from clan_stats.data.types.activities import Activity
+from clan_stats.data.types.activity_table import ActivityTable
+from clan_stats.util.time import TimePeriod
+from randomdata import random_activity
+
+START = datetime(2024, 5, 5, 16, 45, 12, tzinfo=timezone.utc)
+
+
+def _activity(instance_id: int, start_minutes: int, mode: GameMode, completed: bool = True) -> Activity:
+    return Activity(
+        instance_id=instance_id,
+        director_activity_hash=910380154 if mode == GameMode.RAID else 1078036603,
+        time_period=TimePeriod(start=START + timedelta(minutes=start_minutes), length=timedelta(minutes=30)),
+        primary_mode=mode,
+        modes=sorted([GameMode.ALLPVE, mode]),
+        completed=completed)
+
+
+def test_activity_table_round_trip():
+    activities = [random_activity() for _ in range(20)]
+    activities += [random_activity().model_copy(update={"modes": [GameMode.IronBannerZoneControl],
+                                                        "completed": False})]
+
+    round_tripped = ActivityTable.from_activities(activities).to_activities()
+
+    assert [a.model_copy(update={"modes": sorted(a.modes)}) for a in activities] == round_tripped
+    assert ActivityTable.from_json(a.model_dump_json() for a in activities).to_activities() == round_tripped
+    assert len(ActivityTable.empty()) == 0
+
+
+def test_activity_table_filter_sort_group():
+    table = ActivityTable.from_activities([
+        _activity(1, 60, GameMode.RAID),
+        _activity(2, 0, GameMode.STRIKE),
+        _activity(3, 30, GameMode.RAID, completed=False),
+    ])
+
+    raids = table.filter(table.has_mode(GameMode.RAID))
+    assert list(raids.instance_id) == [1, 3]
+    assert list(raids.filter(raids.completed == 1).instance_id) == [1]
+    assert list(table.started_after(START + timedelta(minutes=15)).instance_id) == [1, 3]
+
+    assert list(table.sort().instance_id) == [2, 3, 1]
+    assert list(table.sort(descending=True).instance_id) == [1, 3, 2]
+
+    groups = table.group_by("director_activity_hash")
+    assert {h: list(g.instance_id) for h, g in groups.items()} == {910380154: [1, 3], 1078036603: [2]}
+    assert list(ActivityTable.concatenate(list(groups.values())).sort().instance_id) == [2, 3, 1]
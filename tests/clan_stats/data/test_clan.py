@@ -0,0 +1,56 @@
+import pytest
+
+from randomdata import random_clan, random_group_minimal_player, random_character
+
+
+def test_clan_lookups():
+    clan = random_clan()
+    player = clan.players[1]
+    member_id = player.primary_membership.membership_id
+
+    assert clan.find_player_with_id(member_id) is player
+    assert clan.player_by_name(player.name) is player
+    assert clan.is_member(member_id)
+    assert clan.characters_for_player(member_id) == [c for c in clan.characters if c.player == player]
+    character = clan.characters_for_player(member_id)[0]
+    assert clan.character_from_id(character.character_id) is character
+    assert clan.find_player_for_character(character.character_id) is player
+
+    with pytest.raises(ValueError):
+        clan.player_by_name("nobody")
+    assert clan.characters_for_player(-1) == []
+
+
+def test_clan_index_follows_changes():
+    clan = random_clan()
+    joined = random_group_minimal_player()
+    clan.find_player_with_id(clan.players[0].primary_membership.membership_id)
+
+    clan.players = [*clan.players, joined]
+    assert clan.player_by_name(joined.name) is joined
+    with pytest.raises(AttributeError):
+        clan.players.append(joined)
+
+    clan.players = [joined]
+    assert not clan.is_member(clan.characters[0].player.primary_membership.membership_id)
+
+    character = random_character(joined)
+    clan.characters = [character]
+    assert clan.characters_for_player(joined.primary_membership.membership_id) == [character]
+
+
+def test_clan_equality_ignores_index():
+    clan = random_clan()
+    copy = clan.model_copy(deep=True)
+
+    clan.is_member(0)
+
+    assert clan == copy
+
+
+def test_players_hash_by_primary_membership():
+    player = random_group_minimal_player()
+    renamed = player.model_copy(update={"name": "renamed"})
+
+    assert {player: 1}[renamed] == 1
+    assert len({player, renamed, random_group_minimal_player()}) == 2
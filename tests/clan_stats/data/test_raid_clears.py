@@ -0,0 +1,61 @@
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock
+
+from clan_stats.data._bungie_api.bungie_enums import GameMode
+from clan_stats.data.activity_classification import ActivityClass, ModeFamily, Raid
+from clan_stats.data.manifest import Manifest
+from clan_stats.data.raid_clears import RaidClears, COUNTED_FROM, SEARCH_OVERLAP
+from clan_stats.data.types.activities import Activity
+from clan_stats.util.time import TimePeriod
+
+START = datetime(2024, 5, 5, 16, 45, 12, tzinfo=timezone.utc)
+MEMBERSHIP_ID = 4611686018469899232
+
+_RAIDS = {910380154: Raid.DSC, 1374392663: Raid.KF}
+
+
+def _manifest() -> Manifest:
+    manifest = MagicMock(spec=Manifest)
+    manifest.get_activity_class.side_effect = lambda h: ActivityClass(ModeFamily.RAID, raid=_RAIDS.get(h))
+    return manifest
+
+
+def _raid(instance_id: int, days: int, activity_hash: int = 910380154, completed: bool = True) -> Activity:
+    return Activity(
+        instance_id=instance_id,
+        director_activity_hash=activity_hash,
+        time_period=TimePeriod(start=START + timedelta(days=days), length=timedelta(minutes=90)),
+        primary_mode=GameMode.RAID,
+        modes=[GameMode.ALLPVE, GameMode.RAID],
+        completed=completed)
+
+
+def test_raid_clears_counts_by_raid_and_day(tmp_path):
+    with RaidClears(RaidClears.path(tmp_path)) as raid_clears:
+        assert raid_clears.clears(MEMBERSHIP_ID) is None
+
+        raid_clears.add(MEMBERSHIP_ID,
+                        [_raid(1, 0), _raid(2, 0, completed=False), _raid(3, 10, 1374392663), _raid(4, 20, 1)],
+                        _manifest(),
+                        searched=START + timedelta(days=30))
+
+    with RaidClears(RaidClears.path(tmp_path)) as raid_clears:
+        assert raid_clears.clears(MEMBERSHIP_ID) == {Raid.DSC: 1, Raid.KF: 1, Raid.UNKNOWN: 1}
+        assert raid_clears.clears(MEMBERSHIP_ID, since=START + timedelta(days=10, hours=3)) == {
+            Raid.KF: 1, Raid.UNKNOWN: 1}
+        assert raid_clears.clears(MEMBERSHIP_ID, since=START + timedelta(days=30)) == {}
+        assert raid_clears.clears(MEMBERSHIP_ID, since=START + timedelta(days=30))[Raid.DSC] == 0
+
+
+def test_raid_clears_only_counts_new_raids(tmp_path):
+    with RaidClears(RaidClears.path(tmp_path)) as raid_clears:
+        assert raid_clears.search_start(MEMBERSHIP_ID) == COUNTED_FROM
+
+        raid_clears.add(MEMBERSHIP_ID, [_raid(1, 0), _raid(2, 1)], _manifest(), searched=START + timedelta(days=1))
+        # The latest raid counted is more recent than the search, less the overlap
+        assert raid_clears.search_start(MEMBERSHIP_ID) == START + timedelta(days=1)
+
+        # Retrieved again with the next raid, only the next raid is counted
+        raid_clears.add(MEMBERSHIP_ID, [_raid(2, 1), _raid(3, 5)], _manifest(), searched=START + timedelta(days=10))
+        assert raid_clears.clears(MEMBERSHIP_ID) == {Raid.DSC: 3}
+        assert raid_clears.search_start(MEMBERSHIP_ID) == START + timedelta(days=10) - SEARCH_OVERLAP
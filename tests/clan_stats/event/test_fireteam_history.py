@@ -0,0 +1,72 @@
+from datetime import datetime, timedelta, timezone
+
+from clan_stats.data._bungie_api.bungie_enums import GameMode
+from clan_stats.data.types.activities import Activity
+from clan_stats.event.fireteam_history import FireteamHistory, SEARCH_OVERLAP
+from clan_stats.fireteams import Fireteam
+from clan_stats.util.time import TimePeriod
+
+START = datetime(2024, 5, 5, 16, 45, 12, tzinfo=timezone.utc)
+
+
+def _fireteam(instance_id: int, days: int, *member_names: str, minutes: int = 30) -> Fireteam:
+    return Fireteam(
+        activity=Activity(
+            instance_id=instance_id,
+            director_activity_hash=910380154,
+            time_period=TimePeriod(start=START + timedelta(days=days), length=timedelta(minutes=minutes)),
+            primary_mode=GameMode.RAID,
+            modes=[GameMode.ALLPVE, GameMode.RAID]),
+        member_names=set(member_names))
+
+
+def test_fireteam_history_windows(tmp_path):
+    with FireteamHistory(FireteamHistory.path(4402352, tmp_path)) as history:
+        history.add([_fireteam(1, 0, "one", "two"), _fireteam(2, 5, "one", "two", "three")],
+                    TimePeriod.for_range(START, START + timedelta(days=10)))
+
+    with FireteamHistory(FireteamHistory.path(4402352, tmp_path)) as history:
+        assert [f.activity.instance_id for f in history.fireteams(START - timedelta(days=1))] == [1, 2]
+        assert [f.activity.instance_id for f in history.fireteams(START + timedelta(days=1))] == [2]
+        assert [f.activity.instance_id for f in history.fireteams(START - timedelta(days=1), min_size=3)] == [2]
+        assert history.fireteams(START - timedelta(days=1))[1] == _fireteam(2, 5, "one", "two", "three")
+
+
+def test_fireteam_history_merges_fireteams_found_again(tmp_path):
+    with FireteamHistory(FireteamHistory.path(4402352, tmp_path)) as history:
+        history.add([_fireteam(1, 0, "one", "two")], TimePeriod.for_range(START, START + timedelta(hours=1)))
+        history.add([_fireteam(1, 0, "two", "three", minutes=90)],
+                    TimePeriod.for_range(START, START + timedelta(days=1)))
+
+        assert history.fireteams(START - timedelta(days=1)) == [_fireteam(1, 0, "one", "two", "three", minutes=90)]
+        assert history.searched() == TimePeriod.for_range(START, START + timedelta(days=1))
+
+
+def test_fireteam_history_search_start(tmp_path):
+    with FireteamHistory(FireteamHistory.path(4402352, tmp_path)) as history:
+        assert history.search_start(START) == START
+
+        history.add([], TimePeriod.for_range(START, START + timedelta(days=10)))
+
+        # Only the newer activities, from a little before the last search ended
+        assert history.search_start(START + timedelta(days=1)) == START + timedelta(days=10) - SEARCH_OVERLAP
+        # Unless the report goes back further than has been searched
+        assert history.search_start(START - timedelta(days=1)) == START - timedelta(days=1)
+
+
+def test_fireteam_history_not_extended_across_unsearched_gap(tmp_path):
+    with FireteamHistory(FireteamHistory.path(4402352, tmp_path)) as history:
+        history.add([], TimePeriod.for_range(START, START + timedelta(days=10)))
+        history.add([], TimePeriod.for_range(START + timedelta(days=20), START + timedelta(days=30)))
+
+        # The days between the searches were never searched, so only the latest search counts
+        assert history.searched() == TimePeriod.for_range(START + timedelta(days=20), START + timedelta(days=30))
+        assert history.search_start(START + timedelta(days=5)) == START + timedelta(days=5)
+
+
+def test_fireteam_history_incomplete_search_not_recorded(tmp_path):
+    with FireteamHistory(FireteamHistory.path(4402352, tmp_path)) as history:
+        history.add([_fireteam(1, 0, "one", "two")], None)
+
+        assert history.searched() is None
+        assert [f.activity.instance_id for f in history.fireteams(START - timedelta(days=1))] == [1]
@@ -0,0 +1,108 @@
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock, AsyncMock
+
+import pytest
+
+from clan_stats.data._bungie_api.bungie_enums import GameMode, MembershipType, ClanMemberType
+from clan_stats.data.types.activities import Activity, ActivityWithPost
+from clan_stats.data.retrieval.data_retriever import DataRetriever
+from clan_stats.data.types.individuals import MinimalPlayerWithClan, Membership, GroupMinimalPlayer
+from clan_stats.event.fireteam_history import FireteamHistory
+from clan_stats.event.fireteams import _find_shared_fireteams, _InstanceIndex, _ambiguous_instances, \
+    _members_from_post, SharedFireteamFinder
+from clan_stats.util.async_utils import Result
+from clan_stats.util.time import TimePeriod
+
+START = datetime(2024, 5, 5, 16, 45, 12, tzinfo=timezone.utc)
+
+
+def _activity(instance_id: int, start_minutes: int = 0, minutes: int = 30, mode: GameMode = GameMode.RAID
+              ) -> Activity:
+    return Activity(
+        instance_id=instance_id,
+        director_activity_hash=910380154,
+        time_period=TimePeriod(start=START + timedelta(minutes=start_minutes), length=timedelta(minutes=minutes)),
+        primary_mode=mode,
+        modes=[GameMode.ALLPVE, mode])
+
+
+def _post(fireteam_ids: dict[int, int]) -> ActivityWithPost:
+    return ActivityWithPost(
+        **_activity(1, mode=GameMode.STRIKE).model_dump(),
+        players=[MinimalPlayerWithClan(primary_membership=Membership(membership_id=membership_id,
+                                                                     membership_type=MembershipType.STEAM),
+                                       name=f"player{membership_id}")
+                 for membership_id in fireteam_ids],
+        fireteam_ids=fireteam_ids)
+
+
+def test_find_shared_fireteams():
+    activities_by_player_name = {
+        "one": [_activity(1), _activity(2), _activity(3)],
+        "two": [_activity(1, start_minutes=5), _activity(2)],
+        "three": [_activity(2, minutes=60), _activity(4)],
+    }
+
+    fireteams = {f.activity.instance_id: f for f in _find_shared_fireteams(activities_by_player_name)}
+
+    assert {i: f.member_names for i, f in fireteams.items()} == {1: {"one", "two"}, 2: {"one", "two", "three"}}
+    # The activity covers the time any member was in it
+    assert fireteams[1].activity.time_period == TimePeriod(start=START, length=timedelta(minutes=35))
+    assert fireteams[2].activity.time_period.length == timedelta(minutes=60)
+
+
+def test_find_shared_fireteams_min_size():
+    activities_by_player_name = {
+        "one": [_activity(1), _activity(2)],
+        "two": [_activity(1), _activity(2)],
+        "three": [_activity(2), _activity(3)],
+    }
+
+    assert [f.activity.instance_id for f in _find_shared_fireteams(activities_by_player_name, min_size=3)] == [2]
+    # Activities played alone are never fireteams
+    assert {f.activity.instance_id for f in _find_shared_fireteams(activities_by_player_name, min_size=1)} == {1, 2}
+
+
+def test_ambiguous_instances():
+    activities_by_player_name = {
+        "one": [_activity(1), _activity(2, start_minutes=60, mode=GameMode.STRIKE), _activity(3, start_minutes=90)],
+        "two": [_activity(1), _activity(2, start_minutes=60, mode=GameMode.STRIKE)],
+    }
+
+    # Matchmade activities and those only one player was in, most recent first
+    assert _ambiguous_instances(_InstanceIndex(activities_by_player_name)) == [3, 2]
+
+
+def test_members_from_post():
+    clan_names = {1: "one", 2: "two", 3: "three", 4: "four"}
+
+    # Clanmates in another fireteam of a matchmade activity are left out
+    assert _members_from_post(_post({1: 10, 2: 10, 3: 20, 5: 10}), {"one", "three"}, clan_names) == {"one", "two"}
+    # Clanmates in the same fireteam are added to a player who was alone among the players searched
+    assert _members_from_post(_post({3: 10, 4: 10}), {"four"}, clan_names) == {"three", "four"}
+    # Without fireteams in the report, everyone from the clan in the activity counts
+    assert _members_from_post(_post({1: 10, 4: 10}).model_copy(update={"fireteam_ids": {}}),
+                              {"one"},
+                              clan_names) == {"one", "four"}
+
+
+@pytest.mark.asyncio
+async def test_clan_fireteams_period_not_searched_while_players_missing(tmp_path):
+    players = [GroupMinimalPlayer(primary_membership=Membership(membership_id=i, membership_type=MembershipType.STEAM),
+                                  name=name,
+                                  last_online=START + timedelta(days=1),
+                                  group_join_date=START - timedelta(days=100),
+                                  group_membership_type=ClanMemberType.MEMBER)
+               for i, name in enumerate(["one", "two", "three"])]
+    retriever: DataRetriever = MagicMock(spec=DataRetriever)
+    retriever.get_activities_for_player_list = AsyncMock(return_value={
+        "one": Result.of([_activity(1)]),
+        "two": Result.of([_activity(1)]),
+        "three": Result.failed(RuntimeError("unavailable"))})
+
+    with FireteamHistory(FireteamHistory.path(1, tmp_path)) as history:
+        fireteams = await SharedFireteamFinder(retriever).clan_fireteams(history, players, START - timedelta(days=1))
+
+        assert [f.member_names for f in fireteams] == [{"one", "two"}]
+        # Searched again next time, for the fireteams the third player was in
+        assert history.searched() is None
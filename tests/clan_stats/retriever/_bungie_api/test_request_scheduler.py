@@ -0,0 +1,113 @@
+import asyncio
+
+import pytest
+
+from clan_stats.data._bungie_api.request_scheduler import RequestScheduler, Priority, request_priority, \
+    current_priority
+
+
+async def _request(scheduler: RequestScheduler, name: str, started: list[str], release: asyncio.Event) -> None:
+    async with scheduler.slot():
+        started.append(name)
+        await release.wait()
+
+
+@pytest.mark.asyncio
+async def test_waiting_requests_start_in_priority_order():
+    scheduler = RequestScheduler(max_concurrent=1)
+    started = []
+    release = asyncio.Event()
+
+    holder = asyncio.create_task(_request(scheduler, "holder", started, release))
+    await asyncio.sleep(0)
+    tasks = []
+    for name, priority in [("background 1", Priority.BACKGROUND),
+                           ("background 2", Priority.BACKGROUND),
+                           ("normal", Priority.NORMAL),
+                           ("interactive", Priority.INTERACTIVE)]:
+        with request_priority(priority):
+            tasks.append(asyncio.create_task(_request(scheduler, name, started, release)))
+    await asyncio.sleep(0)
+    assert started == ["holder"]
+    assert scheduler.waiting(Priority.BACKGROUND) == 2
+
+    release.set()
+    await asyncio.gather(holder, *tasks)
+
+    assert started == ["holder", "interactive", "normal", "background 1", "background 2"]
+
+
+@pytest.mark.asyncio
+async def test_background_limited_to_its_share():
+    scheduler = RequestScheduler(max_concurrent=4, shares={Priority.BACKGROUND: 0.5})
+    started = []
+    release = asyncio.Event()
+
+    with request_priority(Priority.BACKGROUND):
+        background = [asyncio.create_task(_request(scheduler, f"background {i}", started, release))
+                      for i in range(10)]
+    await asyncio.sleep(0)
+    assert scheduler.running(Priority.BACKGROUND) == 2
+
+    with request_priority(Priority.INTERACTIVE):
+        interactive = asyncio.create_task(_request(scheduler, "interactive", started, release))
+    await asyncio.sleep(0)
+    assert "interactive" in started  # didn't wait behind the background work
+
+    release.set()
+    await asyncio.gather(interactive, *background)
+    assert len(started) == 11
+
+
+@pytest.mark.asyncio
+async def test_background_not_held_back_by_normal_at_its_share():
+    scheduler = RequestScheduler(max_concurrent=20)
+    started = []
+    release = asyncio.Event()
+
+    normal = [asyncio.create_task(_request(scheduler, f"normal {i}", started, release)) for i in range(20)]
+    await asyncio.sleep(0)
+    assert scheduler.running(Priority.NORMAL) == 16
+    assert scheduler.waiting(Priority.NORMAL) == 4
+
+    with request_priority(Priority.BACKGROUND):
+        background = asyncio.create_task(_request(scheduler, "background", started, release))
+    await asyncio.sleep(0)
+    assert "background" in started  # slots and its share are free, and the normal requests can't use them
+
+    release.set()
+    await asyncio.gather(background, *normal)
+    assert len(started) == 21
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_leaves_queue():
+    scheduler = RequestScheduler(max_concurrent=1)
+    started = []
+    release = asyncio.Event()
+
+    holder = asyncio.create_task(_request(scheduler, "holder", started, release))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(_request(scheduler, "cancelled", started, release))
+    await asyncio.sleep(0)
+    waiter.cancel()
+    await asyncio.gather(waiter, return_exceptions=True)
+
+    assert scheduler.waiting(Priority.NORMAL) == 0
+    release.set()
+    await holder
+    assert started == ["holder"]
+    assert scheduler.running(Priority.NORMAL) == 0
+
+
+@pytest.mark.asyncio
+async def test_priority_is_inherited_by_tasks():
+    assert current_priority() == Priority.NORMAL
+    with request_priority(Priority.BACKGROUND):
+        inherited = await asyncio.create_task(_priority())
+    assert inherited == Priority.BACKGROUND
+    assert current_priority() == Priority.NORMAL
+
+
+async def _priority() -> Priority:
+    return current_priority()
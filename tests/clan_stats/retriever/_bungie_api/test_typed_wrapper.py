@@ -104,7 +104,7 @@ class TestPydestTypedWrapper:
             assert activity.activityDetails.directorActivityHash != 0
             assert activity.period < datetime.now(timezone.utc)
 
-            assert activity.values["timePlayedSeconds"].basic.value > 0
+            assert activity.values.timePlayedSeconds.basic.value > 0
 
             for activity in activities:
                 await wrapper.get_post_game_carnage_report(activity.activityDetails.instanceId)
@@ -1,6 +1,14 @@
-from clan_stats.data._bungie_api.bungie_enums import MembershipType
-from clan_stats.data._bungie_api.bungie_type_adapters import player_from_user_membership_data
-from clan_stats.data._bungie_api.bungie_types import UserMembershipData, GeneralUser, UserInfoCard
+import json
+from datetime import datetime, timezone, timedelta
+
+import bungio.models
+
+from clan_stats.data._bungie_api.bungie_enums import MembershipType, GameMode
+from clan_stats.data._bungie_api.bungie_type_adapters import player_from_user_membership_data, \
+    activity_from_destiny_activity
+from clan_stats.data._bungie_api.bungie_types import UserMembershipData, GeneralUser, UserInfoCard, \
+    ActivityHistoryPage
+from clan_stats.util.itertools import only
 from random_bungie_data import random_general_user
 from randomdata import random_int, random_string, random_enum, random_excluding
 
@@ -24,3 +32,31 @@ def test_player_from_user_membership_data():
     player = player_from_user_membership_data(user)
 
     assert player.bungie_id == user.bungieNetUser.membershipId
+
+
+def test_activity_from_destiny_activity():
+    def stat(stat_id: str, value: float):
+        return {"statId": stat_id, "basic": {"value": value, "displayValue": str(value)}}
+
+    raw_page = json.dumps({"activities": [{
+        "period": "2024-10-09T20:00:00Z",
+        "activityDetails": {"referenceId": 1, "directorActivityHash": 4179289725, "instanceId": "14797661225",
+                            "mode": 4, "modes": [7, 4], "isPrivate": False, "membershipType": 1},
+        "values": {"kills": stat("kills", 40),
+                   "completed": stat("completed", 1),
+                   "timePlayedSeconds": stat("timePlayedSeconds", 3600),
+                   "fireteamId": stat("fireteamId", 1234)}}]})
+
+    activity = activity_from_destiny_activity(only(ActivityHistoryPage.model_validate_json(raw_page).activities))
+
+    assert activity.instance_id == 14797661225
+    assert activity.director_activity_hash == 4179289725
+    assert activity.time_period.start == datetime(2024, 10, 9, 20, 0, tzinfo=timezone.utc)
+    assert activity.time_period.length == timedelta(hours=1)
+    assert activity.primary_mode == GameMode.RAID
+    assert activity.completed is True
+
+
+def test_empty_activity_history_page():
+    assert ActivityHistoryPage.model_validate({"activities": bungio.models.MISSING}).activities == []
+    assert ActivityHistoryPage.model_validate_json("{}").activities == []
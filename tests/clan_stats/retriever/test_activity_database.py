@@ -22,3 +22,12 @@ def test_activity_database_store_retrieve():
     assert db.get(only(db.keys())) == activity
 
 
+
+
+def test_activity_database_table():
+    db = ActivityDatabase(dict())
+    activities = sorted((random_activity() for _ in range(5)), key=lambda a: a.time_period.start)
+    db.update(activities)
+
+    assert list(db.table().instance_id) == [a.instance_id for a in activities]
+    assert list(db.table(activities[1].time_period.start).instance_id) == [a.instance_id for a in activities[2:]]
@@ -1,5 +1,8 @@
+import asyncio
+import contextlib
 import json
 from datetime import timedelta, datetime, timezone
+from functools import partial
 from typing import Sequence
 from unittest.mock import MagicMock, AsyncMock
 
@@ -10,7 +13,9 @@ from randomdata import random_int, random_player, \
     random_character, random_clan, random_activity, random_post_activity
 from clan_stats.data.retrieval.cached_data_retriever import TimeStampedDataMappingWrapper, TimeStampedData, \
     SerializedMapping, CachedDataRetriever, _get_with_cache, _pydantic_to_python, _python_to_pydantic
+from clan_stats.data._bungie_api.bungie_exceptions import PrivacyError
 from clan_stats.data.retrieval.data_retriever import DataRetriever
+from clan_stats.data.types.activities import ActivityCompletions
 from clan_stats.data.types.individuals import Player
 from clan_stats.util import time
 from clan_stats.util.itertools import only
@@ -28,9 +33,11 @@ class TestCached:
         foo = Foo(value="a")
         mock_supplier = AsyncMock(return_value=foo)
 
-        assert await _get_with_cache(cache, 1, time.TP_1h, Foo, mock_supplier) == foo
-        assert await _get_with_cache(cache, 1, time.TP_1h, Foo, mock_supplier) == foo
-        assert await _get_with_cache(cache, 1, time.TP_1h, Foo, mock_supplier) == foo
+        open_cache = partial(contextlib.nullcontext, cache)
+
+        assert await _get_with_cache(open_cache, 1, time.TP_1h, Foo, mock_supplier) == foo
+        assert await _get_with_cache(open_cache, 1, time.TP_1h, Foo, mock_supplier) == foo
+        assert await _get_with_cache(open_cache, 1, time.TP_1h, Foo, mock_supplier) == foo
 
         assert mock_supplier.call_count == 1
 
@@ -71,6 +78,42 @@ class TestCached:
 
         delegate.get_characters_for_player.assert_called_once_with(player)
 
+    @pytest.mark.asyncio
+    async def test_get_last_played_caching(self, tmp_path):
+        delegate: DataRetriever = MagicMock(spec=DataRetriever)
+
+        player = random_player()
+        never_played = random_player()
+        last_played = datetime(2024, 10, 9, 21, 15, tzinfo=timezone.utc)
+
+        delegate.get_last_played = AsyncMock(side_effect=lambda p: last_played if p == player else None)
+
+        retriever = CachedDataRetriever(delegate, database_directory=tmp_path)
+
+        assert await retriever.get_last_played(player) == last_played
+        assert await retriever.get_last_played(player) == last_played
+        assert await retriever.get_last_played(never_played) is None
+        assert await retriever.get_last_played(never_played) is None
+
+        assert delegate.get_last_played.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_get_activity_completions_caching(self, tmp_path):
+        delegate: DataRetriever = MagicMock(spec=DataRetriever)
+
+        player = random_player()
+        completions = ActivityCompletions(completions={4179289725: 12, 910380154: 2})
+
+        delegate.get_activity_completions = AsyncMock(return_value=completions)
+
+        retriever = CachedDataRetriever(delegate, database_directory=tmp_path)
+
+        assert await retriever.get_activity_completions(player) == completions
+        assert await retriever.get_activity_completions(player) == completions
+        assert await retriever.get_activity_completions(player) == completions
+
+        delegate.get_activity_completions.assert_called_once_with(player)
+
     @pytest.mark.asyncio
     async def test_get_clan_for_player_caching(self, tmp_path):
         delegate: DataRetriever = MagicMock(spec=DataRetriever)
@@ -113,6 +156,50 @@ class TestCached:
 
         # TODO: assert result == activities
 
+    @pytest.mark.asyncio
+    async def test_iter_activities_for_player_caching(self, tmp_path):
+        delegate: DataRetriever = MagicMock(spec=DataRetriever)
+
+        player = random_player()
+
+        batches = [[random_activity(), random_activity()], [random_activity()]]
+
+        async def iter_batches(*args, **kwargs):
+            for batch in batches:
+                yield batch
+
+        delegate.iter_activities_for_player = MagicMock(side_effect=iter_batches)
+
+        retriever = CachedDataRetriever(delegate, database_directory=tmp_path)
+
+        async with retriever:
+            streamed = [batch async for batch in retriever.iter_activities_for_player(player)]
+            cached = [batch async for batch in retriever.iter_activities_for_player(player)]
+
+        delegate.iter_activities_for_player.assert_called_once_with(player, min_start_date=None)
+
+        assert streamed == batches
+        assert ({a.instance_id for a in only(cached)}
+                == {a.instance_id for batch in batches for a in batch})
+
+    @pytest.mark.asyncio
+    async def test_iter_activities_for_private_player(self, tmp_path):
+        delegate: DataRetriever = MagicMock(spec=DataRetriever)
+
+        player = random_player()
+
+        async def iter_private(*args, **kwargs):
+            raise PrivacyError("private")
+            yield
+
+        delegate.iter_activities_for_player = MagicMock(side_effect=iter_private)
+
+        retriever = CachedDataRetriever(delegate, database_directory=tmp_path)
+
+        async with retriever:
+            with pytest.raises(PrivacyError):
+                [batch async for batch in retriever.iter_activities_for_player(player)]
+
     @pytest.mark.asyncio
     async def test_get_post_for_activity_caching(self, tmp_path):
         delegate: DataRetriever = MagicMock(spec=DataRetriever)
@@ -132,6 +219,27 @@ class TestCached:
 
         delegate.get_post_for_activity.assert_called_once_with(activity)
 
+    @pytest.mark.asyncio
+    async def test_get_post_for_activity_concurrently(self, tmp_path):
+        delegate: DataRetriever = MagicMock(spec=DataRetriever)
+
+        activities = [random_activity() for _ in range(5)]
+        posts = {a.instance_id: random_post_activity() for a in activities}
+
+        async def get_post(activity):
+            await asyncio.sleep(0.01)
+            return posts[activity.instance_id]
+
+        delegate.get_post_for_activity = AsyncMock(side_effect=get_post)
+
+        retriever = CachedDataRetriever(delegate, database_directory=tmp_path)
+
+        results = await asyncio.gather(*[retriever.get_post_for_activity(a) for a in activities])
+
+        assert results == [posts[a.instance_id] for a in activities]
+        assert await retriever.get_post_for_activity(activities[0]) == posts[activities[0].instance_id]
+        assert delegate.get_post_for_activity.call_count == 5
+
     @pytest.mark.asyncio
     async def test_get_clan_caching(self, tmp_path):
         delegate: DataRetriever = MagicMock(spec=DataRetriever)
@@ -1,5 +1,19 @@
+import asyncio
+import json
+import os
+import sqlite3
+from contextlib import closing
+from datetime import timedelta
+
+import pytest
+
 from clan_stats.config import read_config
+from clan_stats.data.activity_classification import ActivityClass, ModeFamily, Raid, Dungeon, Difficulty, \
+    UNCLASSIFIED
+from clan_stats.data._bungie_api.bungie_types import DestinyActivityDefinition
+from clan_stats.data.manifest import SqliteManifest, ActivityDefinition, index_path_for, DefinitionTable
 from clan_stats.data.retrieval import get_default_data_retriever
+from clan_stats.data.retrieval.manifest_manager import ManifestManager
 
 
 def test_get_manifest():
@@ -7,4 +21,191 @@ def test_get_manifest():
     config = read_config()
 
     retriever = get_default_data_retriever(config)
-    retriever.get_manifest()
\ No newline at end of file
+    retriever.get_manifest()
+
+
+VOW_HASH = 4179289725  # stored with a negative id, as its top bit is set
+DUALITY_HASH = 2823159265
+
+
+def _write_manifest(path, definitions):
+    with closing(sqlite3.connect(path)) as db:
+        db.execute("CREATE TABLE DestinyActivityDefinition (id INTEGER PRIMARY KEY NOT NULL, json BLOB)")
+        db.executemany("INSERT INTO DestinyActivityDefinition VALUES (?, ?)",
+                       [(h - (1 << 32) if h & (1 << 31) else h, json.dumps(d)) for h, d in definitions.items()])
+        db.commit()
+
+
+def _definition(name, mode, tier=0, activity_type_hash=1):
+    return {"displayProperties": {"name": name}, "directActivityModeType": mode, "tier": tier,
+            "activityTypeHash": activity_type_hash}
+
+
+def test_sqlite_manifest_lookups(tmp_path):
+    manifest_path = tmp_path.joinpath("manifest_test.sqlite3")
+    _write_manifest(manifest_path, {VOW_HASH: _definition("Vow of the Disciple: Normal", 4, tier=2),
+                                    DUALITY_HASH: _definition("Duality", 82)})
+
+    manifest = SqliteManifest(manifest_path)
+
+    assert manifest.get_activity_name(VOW_HASH) == "Vow of the Disciple: Normal"
+    assert manifest.get_activity(DUALITY_HASH) == ActivityDefinition(DUALITY_HASH, "Duality", 82, 0, 1)
+    assert manifest.get_activity(VOW_HASH).tier == 2
+    assert manifest.get_activity(1234) is None
+    assert manifest.get_activity_name(1234) == "Unknown: 1234"
+    assert index_path_for(manifest_path).exists()
+
+
+def test_sqlite_manifest_activity_classes(tmp_path, caplog):
+    manifest_path = tmp_path.joinpath("manifest_test.sqlite3")
+    _write_manifest(manifest_path, {VOW_HASH: _definition("Vow of the Disciple: Normal", 4, tier=2),
+                                    DUALITY_HASH: _definition("Duality", 82)})
+
+    manifest = SqliteManifest(manifest_path)
+
+    assert manifest.get_activity_class(VOW_HASH) == ActivityClass(ModeFamily.RAID, raid=Raid.VOW,
+                                                                  difficulty=Difficulty.NORMAL)
+    assert manifest.get_activity_class(DUALITY_HASH) == ActivityClass(ModeFamily.DUNGEON, dungeon=Dungeon.DUALITY)
+    assert manifest.get_activity_class(1234) == UNCLASSIFIED
+    assert manifest.get_activity_class(1234) == UNCLASSIFIED
+    assert len([r for r in caplog.records if "1234" in r.getMessage()]) == 1  # reported once
+
+
+def test_sqlite_manifest_index_rebuilt_for_new_manifest(tmp_path):
+    manifest_path = tmp_path.joinpath("manifest.sqlite3")
+    _write_manifest(manifest_path, {DUALITY_HASH: _definition("Duality", 82)})
+    assert SqliteManifest(manifest_path).get_activity_name(DUALITY_HASH) == "Duality"
+
+    manifest_path.unlink()
+    _write_manifest(manifest_path, {DUALITY_HASH: _definition("Duality (renamed)", 82),
+                                    VOW_HASH: _definition("Vow of the Disciple: Normal", 4)})
+    os.utime(manifest_path, ns=(0, 0))  # a distinct modification time even on coarse clocks
+
+    manifest = SqliteManifest(manifest_path)
+    assert manifest.get_activity_name(DUALITY_HASH) == "Duality (renamed)"
+    assert manifest.get_activity_name(VOW_HASH) == "Vow of the Disciple: Normal"
+
+
+def _add_table(path, table, definitions):
+    with closing(sqlite3.connect(path)) as db:
+        db.execute(f"CREATE TABLE {table} (id INTEGER PRIMARY KEY NOT NULL, json BLOB)")
+        db.executemany(f"INSERT INTO {table} VALUES (?, ?)",
+                       [(h - (1 << 32) if h & (1 << 31) else h, json.dumps(d)) for h, d in definitions.items()])
+        db.commit()
+
+
+def test_sqlite_manifest_definition_tables(tmp_path):
+    manifest_path = tmp_path.joinpath("manifest_test.sqlite3")
+    _write_manifest(manifest_path, {VOW_HASH: dict(_definition("Vow of the Disciple: Normal", 4), placeHash=2),
+                                    DUALITY_HASH: _definition("Duality", 82)})
+    _add_table(manifest_path, "DestinyPlaceDefinition", {2: {"displayProperties": {"name": "Savathûn's Throne World"}}})
+    _add_table(manifest_path, "DestinyActivityModeDefinition",
+               {3010331418: {"hash": 3010331418, "displayProperties": {"name": "Raid"}, "modeType": 4}})
+
+    manifest = SqliteManifest(manifest_path)
+
+    vow = manifest.activities.get(VOW_HASH)
+    assert vow.hash == VOW_HASH
+    assert manifest.places.get(vow.placeHash).displayProperties.name == "Savathûn's Throne World"
+    assert manifest.activity_modes.get(3010331418).modeType == 4
+    found = manifest.activities.get_many([VOW_HASH, DUALITY_HASH, 1234, VOW_HASH])
+    assert {h: a.displayProperties.name for h, a in found.items()} == {
+        VOW_HASH: "Vow of the Disciple: Normal", DUALITY_HASH: "Duality"}
+
+
+def test_sqlite_manifest_removed_by_another_run(tmp_path):
+    manifest = SqliteManifest(tmp_path.joinpath("manifest_removed.sqlite3"))
+
+    with pytest.raises(sqlite3.OperationalError, match="manifest_removed.sqlite3"):
+        manifest.get_activity_name(DUALITY_HASH)
+    # Not recreated empty, and no half-built index left behind
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_definition_table_cache_is_bounded(tmp_path):
+    manifest_path = tmp_path.joinpath("manifest_test.sqlite3")
+    _write_manifest(manifest_path, {h: _definition(f"Activity {h}", 0) for h in range(1, 11)})
+    queries = []
+    with closing(sqlite3.connect(manifest_path)) as connection:
+        connection.set_trace_callback(queries.append)
+        table = DefinitionTable(lambda: connection, "DestinyActivityDefinition", DestinyActivityDefinition,
+                                cache_size=4)
+
+        assert len(table.get_many(range(1, 11))) == 10
+        assert len(queries) == 1  # one batch
+        assert table.get(10).displayProperties.name == "Activity 10"
+        assert len(queries) == 1  # still cached
+        assert table.get(1).displayProperties.name == "Activity 1"
+        assert len(queries) == 2  # evicted, so fetched again
+
+
+class _FakeBungie:
+    """Serves manifest versions to a `ManifestManager`, counting the requests made."""
+
+    def __init__(self, content_path: str):
+        self.content_path = content_path
+        self.version_checks = 0
+        self.downloads = []
+
+    async def fetch_content_path(self) -> str:
+        self.version_checks += 1
+        return self.content_path
+
+    async def download(self, content_path: str, target) -> None:
+        self.downloads.append(content_path)
+        _write_manifest(target, {DUALITY_HASH: _definition(content_path, 82)})
+
+
+@pytest.mark.asyncio
+async def test_manifest_manager_trusts_recent_version(tmp_path):
+    bungie = _FakeBungie("/content/v1.content")
+    first = ManifestManager(tmp_path, bungie.fetch_content_path, bungie.download)
+    assert (await first.get_manifest()).get_activity_name(DUALITY_HASH) == "/content/v1.content"
+
+    # A later run uses the remembered version without asking Bungie
+    second = ManifestManager(tmp_path, bungie.fetch_content_path, bungie.download)
+    assert (await second.get_manifest()).get_activity_name(DUALITY_HASH) == "/content/v1.content"
+    await second.close()
+
+    assert bungie.version_checks == 1
+    assert bungie.downloads == ["/content/v1.content"]
+
+
+@pytest.mark.asyncio
+async def test_manifest_manager_upgrades_in_background(tmp_path):
+    bungie = _FakeBungie("/content/v1.content")
+    await ManifestManager(tmp_path, bungie.fetch_content_path, bungie.download).get_manifest()
+    bungie.content_path = "/content/v2.content"
+
+    manager = ManifestManager(tmp_path, bungie.fetch_content_path, bungie.download, version_lifetime=timedelta(0))
+    old = await manager.get_manifest()
+    # The old manifest is returned straight away, and stays usable while the new one downloads
+    assert old.get_activity_name(DUALITY_HASH) == "/content/v1.content"
+    await asyncio.sleep(0.1)
+    assert bungie.downloads == ["/content/v1.content", "/content/v2.content"]
+    assert old.get_activity_name(DUALITY_HASH) == "/content/v1.content"
+
+    new = await manager.get_manifest()
+    await manager.close()
+
+    assert new.get_activity_name(DUALITY_HASH) == "/content/v2.content"
+    assert not manager.manifest_path("/content/v1.content").exists()
+    assert manager.manifest_path("/content/v2.content").exists()
+
+
+@pytest.mark.asyncio
+async def test_manifest_manager_keeps_replaced_manifest_for_other_runs(tmp_path):
+    bungie = _FakeBungie("/content/v1.content")
+    await ManifestManager(tmp_path, bungie.fetch_content_path, bungie.download).get_manifest()
+    bungie.content_path = "/content/v2.content"
+    upgrading = ManifestManager(tmp_path, bungie.fetch_content_path, bungie.download, version_lifetime=timedelta(0))
+    await upgrading.get_manifest()
+    await asyncio.sleep(0.1)
+    await upgrading.close()
+
+    # Just replaced, so a run that started earlier may still be reading it
+    manager = ManifestManager(tmp_path, bungie.fetch_content_path, bungie.download)
+    assert (await manager.get_manifest()).get_activity_name(DUALITY_HASH) == "/content/v2.content"
+    await manager.close()
+
+    assert manager.manifest_path("/content/v1.content").exists()
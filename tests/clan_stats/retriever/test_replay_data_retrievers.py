@@ -0,0 +1,252 @@
+import json
+import shutil
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+import pytest_asyncio
+
+from clan_stats.data._bungie_api.bungie_enums import MembershipType, GameMode
+from clan_stats.data._bungie_api.bungie_exceptions import BungieApiError
+from clan_stats.data._bungie_api.bungie_net import bungie_net_url, use_bungie_net_url
+from clan_stats.data.retrieval.aiobungie_rest_data_retriever import AioBungieRestDataRetriever
+from clan_stats.data.retrieval.bungio_data_retriever import BungioDataRetriever
+from clan_stats.data.retrieval.data_retriever import DataRetriever
+from clan_stats.data.retrieval.native_data_retriever import NativeDataRetriever
+from clan_stats.util.async_utils import ResultStatus
+from fake_bungie_api import FakeBungieApi, FixtureStore, RunningServer, ReplayBehaviour, FixtureKey, Fixture
+
+FIXTURES = Path(__file__).parent.joinpath("fixtures", "bungie_api")
+
+BUNGIE_MEMBERSHIP_ID = 17970080
+CLAN_ID = 4402352
+SHARED_RAID_INSTANCE_ID = 14797661225
+
+
+# bungio's client is a singleton bound to the event loop it was first used on, so share one loop.
+@pytest_asyncio.fixture(loop_scope="module")
+async def replay_server():
+    previous_url = bungie_net_url()
+    async with RunningServer(FakeBungieApi(FixtureStore(FIXTURES))) as server:
+        use_bungie_net_url(server.url)
+        try:
+            yield server
+        finally:
+            use_bungie_net_url(previous_url)
+
+
+@pytest.fixture(params=[
+    AioBungieRestDataRetriever,
+    BungioDataRetriever,
+    NativeDataRetriever,
+])
+def retriever(request, replay_server) -> DataRetriever:
+    return request.param(api_key="replay")
+
+
+class TestReplayDataRetrievers:
+
+    @pytest.mark.asyncio(loop_scope="module")
+    async def test_get_clan_and_players(self, retriever: DataRetriever, replay_server: RunningServer):
+        async with retriever:
+            player = await retriever.get_player(BUNGIE_MEMBERSHIP_ID)
+            clan = await retriever.get_clan(CLAN_ID)
+            clan_for_player = await retriever.get_clan_for_player(player)
+            characters = await retriever.get_characters_for_player(player)
+
+        assert player.name == "uayebforever#2982"
+        assert player.primary_membership.membership_type == MembershipType.XBOX
+        assert clan.name == "QUΔNTUM"
+        assert len(clan.players) == 2
+        assert clan_for_player.id == CLAN_ID
+        assert len(characters) == 1
+        assert replay_server.api.missing == []
+
+    @pytest.mark.asyncio(loop_scope="module")
+    async def test_get_activities_and_post(self, retriever: DataRetriever, replay_server: RunningServer):
+        async with retriever:
+            clan = await retriever.get_clan(CLAN_ID)
+            activities = {p.name: await retriever.get_activities_for_player(p) for p in clan.players}
+            raid = next(a for a in activities["uayebforever#2982"] if a.instance_id == SHARED_RAID_INSTANCE_ID)
+            post = await retriever.get_post_for_activity(raid)
+
+        assert len(activities["uayebforever#2982"]) == 3
+        assert len(activities["Percival#1540"]) == 2
+        assert raid.primary_mode == GameMode.RAID
+        assert {p.name for p in post.players} == {"uayebforever#2982", "Percival#1540"}
+        assert post.fireteam_ids == {p.primary_membership.membership_id: 1234 for p in post.players}
+        assert replay_server.api.missing == []
+
+    @pytest.mark.asyncio(loop_scope="module")
+    @pytest.mark.parametrize("page_size", [50, 250])
+    async def test_get_activities_since(self, retriever: DataRetriever, replay_server: RunningServer, page_size: int):
+        retriever = type(retriever)(api_key="replay", page_size=page_size)
+        async with retriever:
+            clan = await retriever.get_clan(CLAN_ID)
+            activities = {p.name: await retriever.get_activities_for_player(
+                p, min_start_date=datetime(2024, 1, 1, tzinfo=timezone.utc)) for p in clan.players}
+
+        assert len(activities["uayebforever#2982"]) == 3
+        assert len(activities["Percival#1540"]) == 2
+        assert replay_server.api.missing == []
+
+    @pytest.mark.asyncio(loop_scope="module")
+    async def test_iter_clan_activities(self, retriever: DataRetriever, replay_server: RunningServer):
+        async with retriever:
+            clan = await retriever.get_clan(CLAN_ID)
+            activities = {}
+            async for player, batch in retriever.iter_clan_activities(
+                    clan, min_start_date=datetime(2024, 1, 1, tzinfo=timezone.utc)):
+                activities.setdefault(player.name, []).extend(batch)
+
+        assert len(activities["uayebforever#2982"]) == 3
+        assert len(activities["Percival#1540"]) == 2
+        assert replay_server.api.missing == []
+
+    @pytest.mark.asyncio(loop_scope="module")
+    async def test_get_activities_for_player_list(self, retriever: DataRetriever, replay_server: RunningServer):
+        progress = []
+        async with retriever:
+            clan = await retriever.get_clan(CLAN_ID)
+            results = await retriever.get_activities_for_player_list(
+                clan.players,
+                min_start_date=datetime(2024, 1, 1, tzinfo=timezone.utc),
+                on_progress=lambda done, total: progress.append(done))
+
+        assert {name: len(r.value) for name, r in results.items()} == {"uayebforever#2982": 3, "Percival#1540": 2}
+        assert progress == [1, 2]
+        assert replay_server.api.missing == []
+
+    @pytest.mark.asyncio(loop_scope="module")
+    async def test_get_last_played_for_player_list(self, retriever: DataRetriever, replay_server: RunningServer):
+        async with retriever:
+            clan = await retriever.get_clan(CLAN_ID)
+            results = await retriever.get_last_played_for_player_list(clan.players)
+
+        assert {name: r.value for name, r in results.items()} == {
+            "uayebforever#2982": datetime(2024, 10, 9, 21, 15, tzinfo=timezone.utc),
+            "Percival#1540": datetime(2024, 10, 10, 20, 0, tzinfo=timezone.utc)}
+        assert replay_server.api.missing == []
+
+    @pytest.mark.asyncio(loop_scope="module")
+    async def test_get_activity_completions(self, retriever: DataRetriever, replay_server: RunningServer):
+        async with retriever:
+            clan = await retriever.get_clan(CLAN_ID)
+            results = await retriever.get_activity_completions_for_player_list(clan.players)
+
+        assert {name: dict(r.value.completions) for name, r in results.items()} == {
+            "uayebforever#2982": {4179289725: 12, 1078036603: 3, 313828469: 0},
+            "Percival#1540": {4179289725: 5, 910380154: 2}}
+        assert replay_server.api.missing == []
+
+
+@pytest.mark.asyncio(loop_scope="module")
+@pytest.mark.parametrize("retriever_type", [AioBungieRestDataRetriever, BungioDataRetriever, NativeDataRetriever])
+async def test_get_manifest(replay_server: RunningServer, tmp_path, retriever_type):
+    retriever = retriever_type(api_key="replay", manifest_directory=tmp_path)
+    async with retriever:
+        manifest = await retriever.get_manifest()
+
+    assert manifest.get_activity_name(4179289725) == "Vow of the Disciple: Normal"
+    assert [p.name for p in tmp_path.iterdir() if p.name.endswith(".partial")] == []
+    assert replay_server.api.missing == []
+
+
+@pytest.mark.asyncio(loop_scope="module")
+async def test_get_manifest_resumes_interrupted_download(tmp_path):
+    api = FakeBungieApi(FixtureStore(FIXTURES), behaviour=ReplayBehaviour(interrupt_downloads_after=100))
+    previous_url = bungie_net_url()
+    async with RunningServer(api) as server:
+        use_bungie_net_url(server.url)
+        try:
+            retriever = NativeDataRetriever(api_key="replay", manifest_directory=tmp_path)
+            async with retriever:
+                manifest = await retriever.get_manifest()
+        finally:
+            use_bungie_net_url(previous_url)
+
+    assert manifest.get_activity_name(4179289725) == "Vow of the Disciple: Normal"
+    assert api.request_count == 3  # the manifest version, the interrupted download and its resumption
+
+
+@pytest.mark.asyncio(loop_scope="module")
+async def test_replay_injects_errors():
+    api = FakeBungieApi(FixtureStore(FIXTURES), behaviour=ReplayBehaviour(error_rate=1.0, error_paths=["/profile/"]))
+    previous_url = bungie_net_url()
+    async with RunningServer(api) as server:
+        use_bungie_net_url(server.url)
+        try:
+            retriever = AioBungieRestDataRetriever(api_key="replay")
+            async with retriever:
+                player = await retriever.get_player(BUNGIE_MEMBERSHIP_ID)
+                characters = await retriever.get_characters_for_player(player)
+        finally:
+            use_bungie_net_url(previous_url)
+
+    assert characters == []
+    assert api.request_count > 2  # aiobungie retries 5xx responses before giving up
+
+
+@pytest.mark.asyncio(loop_scope="module")
+async def test_get_activities_for_player_list_isolates_errors():
+    api = FakeBungieApi(FixtureStore(FIXTURES),
+                        behaviour=ReplayBehaviour(error_rate=1.0, error_status=404,
+                                                  error_paths=["/account/4611686018467471522/"]))
+    previous_url = bungie_net_url()
+    async with RunningServer(api) as server:
+        use_bungie_net_url(server.url)
+        try:
+            retriever = NativeDataRetriever(api_key="replay")
+            async with retriever:
+                clan = await retriever.get_clan(CLAN_ID)
+                results = await retriever.get_activities_for_player_list(
+                    clan.players, min_start_date=datetime(2024, 1, 1, tzinfo=timezone.utc))
+        finally:
+            use_bungie_net_url(previous_url)
+
+    assert len(results["uayebforever#2982"].value) == 3
+    assert results["Percival#1540"].status == ResultStatus.ERROR
+
+
+@pytest.mark.asyncio(loop_scope="module")
+async def test_native_invalid_response_is_api_error(tmp_path):
+    store = FixtureStore(tmp_path)
+    store.put(FixtureKey(method="GET", path=f"/platform/groupv2/{CLAN_ID}/", query=()),
+              Fixture(status=200, content_type="text/html", body=b"<html>Maintenance</html>"))
+    previous_url = bungie_net_url()
+    async with RunningServer(FakeBungieApi(store)) as server:
+        use_bungie_net_url(server.url)
+        try:
+            retriever = NativeDataRetriever(api_key="replay")
+            async with retriever:
+                with pytest.raises(BungieApiError):
+                    await retriever.get_clan(CLAN_ID)
+        finally:
+            use_bungie_net_url(previous_url)
+
+
+@pytest.mark.asyncio(loop_scope="module")
+@pytest.mark.parametrize("retriever_type", [AioBungieRestDataRetriever, BungioDataRetriever, NativeDataRetriever])
+async def test_private_activity_completions(tmp_path, retriever_type):
+    store = FixtureStore(tmp_path)
+    shutil.copytree(FIXTURES, tmp_path, dirs_exist_ok=True)
+    for character_id in [2305843009400000001, 2305843009400000002]:
+        store.put(FixtureKey(method="GET", query=(),
+                             path=f"/platform/destiny2/3/account/4611686018467471522/character/{character_id}"
+                                  f"/stats/aggregateactivitystats/"),
+                  Fixture(status=500, content_type="application/json", body=json.dumps({
+                      "ErrorCode": 1665, "ErrorStatus": "DestinyPrivacyRestriction", "ThrottleSeconds": 0,
+                      "Message": "The user has chosen for this data to be private.", "MessageData": {}}).encode()))
+    previous_url = bungie_net_url()
+    async with RunningServer(FakeBungieApi(store)) as server:
+        use_bungie_net_url(server.url)
+        try:
+            retriever = retriever_type(api_key="replay")
+            async with retriever:
+                clan = await retriever.get_clan(CLAN_ID)
+                results = await retriever.get_activity_completions_for_player_list(clan.players)
+        finally:
+            use_bungie_net_url(previous_url)
+
+    assert results["uayebforever#2982"].status == ResultStatus.VALUE
+    assert results["Percival#1540"].status == ResultStatus.PRIVATE
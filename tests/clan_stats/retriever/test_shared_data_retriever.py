@@ -0,0 +1,120 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock, AsyncMock
+
+import pytest
+
+from randomdata import random_player, random_clan, random_activity
+from clan_stats.actions import clan_report
+from clan_stats.data._bungie_api.bungie_enums import GameMode
+from clan_stats.data.raid_clears import RaidClears
+from clan_stats.data.retrieval.data_retriever import DataRetriever
+from clan_stats.data.retrieval.shared_data_retriever import SharedDataRetriever
+from clan_stats.data.types.activities import Activity
+from clan_stats.data.types.clan import Clan
+from clan_stats.util.time import TimePeriod
+
+START = datetime(2024, 5, 5, 16, 45, 12, tzinfo=timezone.utc)
+
+
+def _activity(instance_id: int, days: int, mode: GameMode) -> Activity:
+    return Activity(
+        instance_id=instance_id,
+        director_activity_hash=1,
+        time_period=TimePeriod(start=START + timedelta(days=days), length=timedelta(minutes=30)),
+        primary_mode=mode,
+        modes=[GameMode.ALLPVE, mode])
+
+
+@pytest.mark.asyncio
+async def test_get_clan_shared():
+    delegate: DataRetriever = MagicMock(spec=DataRetriever)
+    clan = random_clan()
+    delegate.get_clan = AsyncMock(return_value=clan)
+
+    retriever = SharedDataRetriever(delegate)
+
+    # Concurrent requests share the one retrieval
+    assert await asyncio.gather(retriever.get_clan(123), retriever.get_clan(123)) == [clan, clan]
+    assert await retriever.get_clan(123) == clan
+
+    delegate.get_clan.assert_called_once_with(123)
+
+
+@pytest.mark.asyncio
+async def test_get_activities_answered_from_earlier_retrieval():
+    delegate: DataRetriever = MagicMock(spec=DataRetriever)
+    player = random_player()
+    activities = [_activity(1, 0, GameMode.RAID), _activity(2, 5, GameMode.STRIKE), _activity(3, 10, GameMode.RAID)]
+    delegate.get_activities_for_player = AsyncMock(return_value=activities)
+
+    retriever = SharedDataRetriever(delegate)
+
+    assert await retriever.get_activities_for_player(player, START - timedelta(days=1)) == activities
+    assert await retriever.get_activities_for_player(player, START + timedelta(days=1)) == activities[1:]
+    assert await retriever.get_activities_for_player(player, START, GameMode.RAID) == [activities[2]]
+
+    delegate.get_activities_for_player.assert_called_once_with(player, START - timedelta(days=1))
+
+    # Earlier than retrieved so far, so retrieved again
+    await retriever.get_activities_for_player(player)
+    delegate.get_activities_for_player.assert_called_with(player, None)
+    assert delegate.get_activities_for_player.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_get_activities_of_one_mode_not_kept():
+    delegate: DataRetriever = MagicMock(spec=DataRetriever)
+    player = random_player()
+    raids = [_activity(1, 0, GameMode.RAID)]
+    delegate.get_activities_for_player = AsyncMock(return_value=raids)
+
+    retriever = SharedDataRetriever(delegate)
+
+    assert await retriever.get_activities_for_player(player, mode=GameMode.RAID) == raids
+    assert await retriever.get_activities_for_player(player, mode=GameMode.RAID) == raids
+
+    assert delegate.get_activities_for_player.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_delegate_entered_once():
+    delegate: DataRetriever = MagicMock(spec=DataRetriever)
+    delegate.__aenter__ = AsyncMock()
+    delegate.__aexit__ = AsyncMock()
+
+    retriever = SharedDataRetriever(delegate)
+
+    async with retriever as outer:
+        async with retriever as inner:
+            assert outer is retriever and inner is retriever
+        delegate.__aexit__.assert_not_called()
+
+    delegate.__aenter__.assert_called_once()
+    delegate.__aexit__.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_clans_sharing_a_member_retrieve_once(tmp_path):
+    delegate: DataRetriever = MagicMock(spec=DataRetriever)
+    shared_activity = random_activity()
+    delegate.get_activities_for_player = AsyncMock(return_value=[shared_activity])
+    delegate.get_post_for_activity = AsyncMock()
+    first_clan = random_clan()
+    second_clan = Clan(id=first_clan.id + 1, name="second", players=[first_clan.players[0], *random_clan().players],
+                       characters=[])
+    recency_limit = START - timedelta(days=30)
+
+    retriever = SharedDataRetriever(delegate)
+    with RaidClears(RaidClears.path(tmp_path)) as raid_clears:
+        await clan_report._retrieve_activities(retriever, [first_clan, second_clan], recency_limit, tmp_path,
+                                               raid_clears)
+    # Each clan's reports then read the activities and PGCRs of its own members
+    for clan in [first_clan, second_clan]:
+        for player in clan.players:
+            for activity in await retriever.get_activities_for_player(player, recency_limit):
+                await retriever.get_post_for_activity(activity)
+
+    assert sorted(call.args[0].name for call in delegate.get_activities_for_player.call_args_list) == sorted(
+        {p.name for p in [*first_clan.players, *second_clan.players]})
+    delegate.get_post_for_activity.assert_called_once_with(shared_activity)
@@ -0,0 +1,67 @@
+import csv
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+from clan_stats.exceptions import UserError
+from clan_stats.report_output import ReportOutput, OutputFormat, RaidClearsRow, ClanFireteamRow, MemberRow
+
+START = datetime(2024, 5, 5, 16, 45, 12, tzinfo=timezone.utc)
+
+
+def _fireteam_row(player: str) -> ClanFireteamRow:
+    return ClanFireteamRow(clan_id=1, instance_id=2, activity="Vow of the Disciple", start=START, player=player)
+
+
+def test_jsonl_rows_name_their_report(capsys):
+    with ReportOutput(OutputFormat.JSONL) as output:
+        output.write(RaidClearsRow(clan_id=1, player="a#1", raid="VOW", clears=3))
+        output.write(_fireteam_row("a#1"))
+
+    lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert lines == [
+        {"report": "raid_clears", "clan_id": 1, "player": "a#1", "raid": "VOW", "clears": 3},
+        {"report": "clan_fireteams", "clan_id": 1, "instance_id": 2, "activity": "Vow of the Disciple",
+         "start": "2024-05-05T16:45:12Z", "player": "a#1"}]
+
+
+def test_csv_file_for_each_report(tmp_path):
+    with ReportOutput(OutputFormat.CSV, tmp_path) as output:
+        output.write_all([_fireteam_row("a#1"), _fireteam_row("b#2")])
+        output.write(MemberRow(clan_id=1, player="a#1", membership_id=3, discord_name=None, last_active=None,
+                               in_bungie_clan=True, in_clan_database=False))
+
+    with open(tmp_path.joinpath("clan_fireteams.csv"), newline="") as f:
+        assert [row["player"] for row in csv.DictReader(f)] == ["a#1", "b#2"]
+    with open(tmp_path.joinpath("members.csv"), newline="") as f:
+        assert list(csv.DictReader(f)) == [{"clan_id": "1", "player": "a#1", "membership_id": "3", "discord_name": "",
+                                            "last_active": "", "in_bungie_clan": "True",
+                                            "in_clan_database": "False"}]
+
+
+def test_csv_to_standard_output_is_one_report(capsys):
+    with pytest.raises(UserError):
+        with ReportOutput(OutputFormat.CSV) as output:
+            output.write(_fireteam_row("a#1"))
+            output.write(RaidClearsRow(clan_id=1, player="a#1", raid="VOW", clears=3))
+
+    assert capsys.readouterr().out.splitlines() == [
+        "clan_id,instance_id,activity,start,player",
+        "1,2,Vow of the Disciple,2024-05-05T16:45:12Z,a#1"]
+
+
+def test_parquet_needs_a_directory():
+    with pytest.raises(UserError):
+        ReportOutput(OutputFormat.PARQUET)
+
+
+def test_parquet_file_for_each_report(tmp_path):
+    parquet = pytest.importorskip("pyarrow.parquet")
+
+    with ReportOutput(OutputFormat.PARQUET, tmp_path) as output:
+        output.write_all([_fireteam_row("a#1"), _fireteam_row("b#2")])
+
+    table = parquet.read_table(tmp_path.joinpath("clan_fireteams.parquet"))
+    assert table.column("player").to_pylist() == ["a#1", "b#2"]
+    assert table.column("start").to_pylist() == [START, START]
@@ -0,0 +1,205 @@
+import asyncio
+import contextlib
+import random
+
+import pytest
+
+from clan_stats.util.async_utils import bounded_in_order, retrieve_paged, merge_async_iterators, iter_paged, \
+    collect_settled, Result, ResultStatus
+
+
+async def _after(delay: float, value: int, running: list[int]) -> int:
+    running.append(value)
+    await asyncio.sleep(delay)
+    running.remove(value)
+    return value
+
+
+@pytest.mark.asyncio
+async def test_bounded_in_order_yields_in_order():
+    running = []
+    max_running = 0
+    delays = [random.uniform(0, 0.02) for _ in range(20)]
+
+    results = []
+    async for result in bounded_in_order((_after(d, i, running) for i, d in enumerate(delays)), 4):
+        max_running = max(max_running, len(running))
+        results.append(result)
+
+    assert results == list(range(20))
+    assert max_running <= 4
+
+
+@pytest.mark.asyncio
+async def test_bounded_in_order_cancels_on_close():
+    finished = []
+
+    async def slow(value: int) -> int:
+        await asyncio.sleep(10)
+        finished.append(value)
+        return value
+
+    async def fast() -> int:
+        return -1
+
+    async with contextlib.aclosing(bounded_in_order((c for c in [fast(), slow(1), slow(2), slow(3)]), 3)) as results:
+        assert await anext(results) == -1
+        await asyncio.sleep(0)
+
+    await asyncio.sleep(0.01)
+    assert finished == []
+    assert len([t for t in asyncio.all_tasks() if t is not asyncio.current_task()]) == 0
+
+
+@pytest.mark.asyncio
+async def test_bounded_in_order_rejects_empty_window():
+    with pytest.raises(ValueError):
+        await anext(bounded_in_order([], 0))
+
+
+def _pages(items: list[int], page_size: int, requested: list[int]):
+    async def get_page(page_num: int) -> list[int]:
+        requested.append(page_num)
+        return items[page_num * page_size:(page_num + 1) * page_size]
+    return get_page
+
+
+@pytest.mark.asyncio
+async def test_retrieve_paged_stops_when_enough():
+    requested = []
+    result = await retrieve_paged(_pages(list(range(100)), 10, requested), enough=lambda r: len(r) >= 25)
+
+    assert result == list(range(30))
+    assert requested == [0, 1, 2]
+
+
+@pytest.mark.asyncio
+async def test_retrieve_paged_first_page_only_without_enough():
+    requested = []
+    result = await retrieve_paged(_pages(list(range(100)), 10, requested), enough=None)
+
+    assert result == list(range(10))
+    assert requested == [0]
+
+
+@pytest.mark.asyncio
+async def test_retrieve_paged_short_page_is_last():
+    requested = []
+    result = await retrieve_paged(_pages(list(range(25)), 10, requested), enough=lambda r: False, page_size=10)
+    assert result == list(range(25))
+    assert requested == [0, 1, 2]
+
+    requested = []
+    result = await retrieve_paged(_pages(list(range(20)), 10, requested), enough=lambda r: False)
+    assert result == list(range(20))
+    assert requested == [0, 1, 2]  # without page_size only an empty page ends the history
+
+
+@pytest.mark.asyncio
+async def test_iter_paged_yields_each_page():
+    requested = []
+    pages = [page async for page in iter_paged(_pages(list(range(25)), 10, requested),
+                                               enough=lambda page: False, page_size=10)]
+
+    assert pages == [list(range(10)), list(range(10, 20)), list(range(20, 25))]
+    assert requested == [0, 1, 2]
+
+
+@pytest.mark.asyncio
+async def test_iter_paged_stops_when_enough():
+    requested = []
+    pages = [page async for page in iter_paged(_pages(list(range(100)), 10, requested),
+                                               enough=lambda page: page[-1] >= 15)]
+
+    assert pages == [list(range(10)), list(range(10, 20))]
+    assert requested == [0, 1]
+
+
+async def _counting(key: str, count: int, running: list[str]):
+    running.append(key)
+    try:
+        for i in range(count):
+            await asyncio.sleep(random.uniform(0, 0.005))
+            yield i
+    finally:
+        running.remove(key)
+
+
+@pytest.mark.asyncio
+async def test_merge_async_iterators_yields_everything_with_keys():
+    running = []
+    max_running = 0
+    counts = {str(k): k for k in range(10)}
+
+    merged = {}
+    async for key, item in merge_async_iterators(((k, _counting(k, c, running)) for k, c in counts.items()), 3):
+        max_running = max(max_running, len(running))
+        merged.setdefault(key, []).append(item)
+
+    assert merged == {k: list(range(c)) for k, c in counts.items() if c > 0}
+    assert max_running <= 3
+
+
+@pytest.mark.asyncio
+async def test_merge_async_iterators_raises_errors():
+    async def failing():
+        yield 1
+        raise RuntimeError("failed")
+
+    with pytest.raises(RuntimeError):
+        async for _ in merge_async_iterators([("ok", _counting("ok", 100, [])), ("bad", failing())], 2):
+            pass
+    assert len([t for t in asyncio.all_tasks() if t is not asyncio.current_task()]) == 0
+
+
+@pytest.mark.asyncio
+async def test_merge_async_iterators_closes_on_close():
+    running = []
+    async with contextlib.aclosing(merge_async_iterators(
+            ((k, _counting(k, 100, running)) for k in "abcd"), 2)) as merged:
+        await anext(merged)
+
+    assert running == []
+    assert len([t for t in asyncio.all_tasks() if t is not asyncio.current_task()]) == 0
+
+
+class _Private(Exception):
+    pass
+
+
+@pytest.mark.asyncio
+async def test_collect_settled_isolates_failures():
+    running = []
+    max_running = 0
+    progress = []
+
+    async def call(key: int) -> int:
+        nonlocal max_running
+        running.append(key)
+        max_running = max(max_running, len(running))
+        await asyncio.sleep(random.uniform(0, 0.005))
+        running.remove(key)
+        if key == 3:
+            raise RuntimeError("failed")
+        if key == 5:
+            raise _Private()
+        return key * 2
+
+    results = await collect_settled(range(10), call, 4,
+                                    on_progress=lambda done, total: progress.append((done, total)),
+                                    private_errors=(_Private,))
+
+    assert {k: r.value for k, r in results.items() if r.ok} == {k: k * 2 for k in range(10) if k not in (3, 5)}
+    assert results[3].status == ResultStatus.ERROR
+    assert isinstance(results[3].error, RuntimeError)
+    assert results[5].status == ResultStatus.PRIVATE
+    assert results[5].value_or([]) == []
+    assert max_running <= 4
+    assert progress == [(i, 10) for i in range(1, 11)]
+
+
+def test_result():
+    assert Result.of(0).ok
+    assert Result.of(None).value_or(1) is None
+    assert not Result.failed(RuntimeError()).ok
+    assert Result.private().value_or(1) == 1
@@ -0,0 +1,146 @@
+"""Time shared fireteam detection on synthetic clans, against the pairwise comparison it replaced.
+
+Each synthetic player plays a number of activities, some of them alone and the rest with a random group of
+clanmates who may join a little late, so the clans have the mix of solo and shared activities that real ones do.
+Both implementations must find the same fireteams.
+
+Usage:
+    python tests_src/benchmark_fireteams.py --players 25 50 100 200 --activities 300 --repeat 3
+"""
+import argparse
+import itertools
+import random
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Mapping, Sequence, Dict, List, Set
+
+from clan_stats.data._bungie_api.bungie_enums import GameMode
+from clan_stats.data.types.activities import Activity
+from clan_stats.event.fireteams import _find_shared_fireteams
+from clan_stats.fireteams import Fireteam
+from clan_stats.util.itertools import first, rest
+from clan_stats.util.time import TimePeriod
+
+_START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def synthetic_clan(players: int, activities: int, shared_fraction: float, seed: int = 0
+                   ) -> Mapping[str, Sequence[Activity]]:
+    rng = random.Random(seed)
+    names = [f"Player#{i:04d}" for i in range(players)]
+    activities_by_player_name: Dict[str, List[Activity]] = {name: [] for name in names}
+    instance_ids = itertools.count(10_000_000_000)
+    for name in names:
+        while len(activities_by_player_name[name]) < activities:
+            activity = Activity(
+                instance_id=next(instance_ids),
+                director_activity_hash=rng.choice([910380154, 313828469, 1078036603]),
+                time_period=TimePeriod(start=_START + timedelta(minutes=rng.randrange(90 * 24 * 60)),
+                                       length=timedelta(minutes=rng.randrange(10, 120))),
+                primary_mode=GameMode.RAID,
+                modes=[GameMode.ALLPVE, GameMode.RAID])
+            fireteam = [name]
+            if rng.random() < shared_fraction:
+                fireteam += rng.sample(names, rng.randrange(1, 6))
+            for member in set(fireteam):
+                # Each member has their own copy of the activity, from when they joined it
+                joined = timedelta(minutes=rng.randrange(5)) if member != name else timedelta()
+                activities_by_player_name[member].append(activity.model_copy(update={"time_period": TimePeriod(
+                    start=activity.time_period.start + joined, length=activity.time_period.length - joined)}))
+    return activities_by_player_name
+
+
+def pairwise_shared_fireteams(activities_by_player_name: Mapping[str, Sequence[Activity]],
+                              min_size: int = 2) -> Sequence[Fireteam]:
+    """The previous implementation: intersect the activities of every pair of players."""
+    name_to_instance_ids = {name: {a.instance_id for a in activities}
+                            for name, activities in activities_by_player_name.items()}
+
+    def instance_id(a: Activity) -> int:
+        return a.instance_id
+
+    all_activities = itertools.chain.from_iterable(activities_by_player_name.values())
+    activities_by_instance_id = {key: _combine_activities(list(group))
+                                 for key, group in itertools.groupby(sorted(all_activities, key=instance_id),
+                                                                     key=instance_id)}
+
+    fireteams: Dict[int, Fireteam] = dict()
+    for one, two in itertools.combinations(name_to_instance_ids.keys(), 2):
+        for shared_id in name_to_instance_ids[one].intersection(name_to_instance_ids[two]):
+            if shared_id not in fireteams:
+                fireteams[shared_id] = Fireteam(activity=activities_by_instance_id[shared_id],
+                                                member_names={one, two})
+            else:
+                fireteams[shared_id].member_names.update({one, two})
+    return list(f for f in fireteams.values() if len(f.member_names) >= min_size)
+
+
+def _combine_activities(activities: Sequence[Activity]) -> Activity:
+    first_activity = first(activities)
+    time_period: TimePeriod = first_activity.time_period
+
+    for activity in rest(activities):
+        if (activity.instance_id != first_activity.instance_id
+            or activity.director_activity_hash != first_activity.director_activity_hash
+            or activity.primary_mode != first_activity.primary_mode
+            or activity.modes != first_activity.modes):
+            raise ValueError("Cannot combine non-matching activities")
+        time_period = time_period.combine(activity.time_period)
+
+    return Activity(
+        instance_id=first_activity.instance_id,
+        director_activity_hash=first_activity.director_activity_hash,
+        primary_mode=first_activity.primary_mode,
+        modes=first_activity.modes,
+        time_period=time_period)
+
+
+def _by_instance(fireteams: Sequence[Fireteam]) -> Mapping[int, Set[str]]:
+    return {f.activity.instance_id: f.member_names for f in fireteams}
+
+
+def benchmark(players: Sequence[int], activities: int, shared_fraction: float, min_size: int, repeat: int) -> None:
+    for player_count in players:
+        clan = synthetic_clan(player_count, activities, shared_fraction)
+        timings = {}
+        results = {}
+        peaks = {}
+        for name, find in (("pairwise", pairwise_shared_fireteams), ("inverted index", _find_shared_fireteams)):
+            # The best of the runs, as the others are slowed by whatever else is running
+            timings[name] = float("inf")
+            for _ in range(repeat):
+                start = time.perf_counter()
+                results[name] = find(clan, min_size=min_size)
+                timings[name] = min(timings[name], time.perf_counter() - start)
+            # Memory is measured on a separate run, as tracing slows it down
+            tracemalloc.start()
+            find(clan, min_size=min_size)
+            peaks[name] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        if _by_instance(results["pairwise"]) != _by_instance(results["inverted index"]):
+            raise AssertionError(f"Implementations disagree for {player_count} players")
+        print(f"{player_count:5d} players: {len(results['pairwise']):6d} fireteams, "
+              + ", ".join(f"{name} {timings[name] * 1000:9.1f} ms {peaks[name] / 2**20:6.1f} MiB peak"
+                          for name in timings)
+              + f", {timings['pairwise'] / timings['inverted index']:.1f}x faster")
+
+
+def _parse_args(args: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark shared fireteam detection on synthetic clans.")
+    parser.add_argument("--players", type=int, nargs="+", default=[25, 50, 100, 200])
+    parser.add_argument("--activities", type=int, default=300, help="Activities per player.")
+    parser.add_argument("--shared-fraction", type=float, default=0.3,
+                        help="Fraction of each player's own activities played with clanmates.")
+    parser.add_argument("--min-size", type=int, default=2)
+    parser.add_argument("--repeat", type=int, default=3)
+    return parser.parse_args(args)
+
+
+def main(args: Optional[list[str]] = None) -> None:
+    parsed = _parse_args(args)
+    benchmark(parsed.players, parsed.activities, parsed.shared_fraction, parsed.min_size, parsed.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Compare the data retriever backends against the replay server.
+
+Each backend runs the same workload (a clan, every member's activity history and the post game carnage reports of
+those activities) against `fake_bungie_api` replaying a fixture directory, so the comparison measures the clients
+and the response parsing rather than bungie.net.
+
+Usage:
+    python tests_src/benchmark_retrievers.py --fixtures DIR --clan-id 4402352 --repeat 20 --latency 0.02
+"""
+import argparse
+import asyncio
+import json
+import time
+from pathlib import Path
+from typing import Optional, Any
+
+from pydantic import TypeAdapter
+
+from clan_stats.data._bungie_api.bungie_net import use_bungie_net_url
+from clan_stats.data._bungie_api.bungie_types import BungieResponse, DestinyActivityHistoryResults, ActivityHistoryPage
+from clan_stats.data.retrieval import DataRetrieverType
+from clan_stats.data.retrieval.aiobungie_rest_data_retriever import AioBungieRestDataRetriever
+from clan_stats.data.retrieval.bungio_data_retriever import BungioDataRetriever
+from clan_stats.data.retrieval.data_retriever import DataRetriever
+from clan_stats.data.retrieval.native_data_retriever import NativeDataRetriever
+from fake_bungie_api import FakeBungieApi, FixtureStore, RunningServer, ReplayBehaviour
+
+DEFAULT_FIXTURES = Path(__file__).parent.parent.joinpath("tests", "clan_stats", "retriever", "fixtures", "bungie_api")
+
+_RETRIEVERS = {
+    DataRetrieverType.BUNGIO: BungioDataRetriever,
+    DataRetrieverType.AIOBUNGIE_REST: AioBungieRestDataRetriever,
+    DataRetrieverType.NATIVE: NativeDataRetriever,
+}
+
+
+async def _workload(retriever: DataRetriever, clan_id: int) -> int:
+    clan = await retriever.get_clan(clan_id)
+    histories = await asyncio.gather(*[retriever.get_activities_for_player(p) for p in clan.players])
+    activities = {a.instance_id: a for history in histories for a in (history or [])}
+    await asyncio.gather(*[retriever.get_post_for_activity(a) for a in activities.values()])
+    return len(activities)
+
+
+async def benchmark_backends(fixtures: Path, clan_id: int, repeat: int, behaviour: ReplayBehaviour) -> None:
+    api = FakeBungieApi(FixtureStore(fixtures), behaviour=behaviour)
+    async with RunningServer(api) as server:
+        use_bungie_net_url(server.url)
+        for backend, retriever_type in _RETRIEVERS.items():
+            retriever = retriever_type(api_key="benchmark")
+            async with retriever:
+                await _workload(retriever, clan_id)  # warm up connections and validators
+                requests_before = api.request_count
+                start = time.perf_counter()
+                for _ in range(repeat):
+                    activity_count = await _workload(retriever, clan_id)
+                elapsed = time.perf_counter() - start
+            print(f"{backend:>15}: {elapsed / repeat * 1000:8.1f} ms per run, "
+                  f"{(api.request_count - requests_before) / repeat:.0f} requests, {activity_count} activities")
+        if api.missing:
+            print(f"{len(api.missing)} requests had no fixture, e.g. {api.missing[0]}")
+
+
+def benchmark_parsing(page_size: int, repeat: int) -> None:
+    """Time parsing one activity history page: JSON to dicts to models, against JSON bytes straight to models."""
+    def stat(name: str) -> dict:
+        return {"statId": name, "basic": {"value": 1.0, "displayValue": "1"}}
+
+    entry = {"period": "2024-10-09T20:00:00Z",
+             "activityDetails": {"referenceId": 1, "directorActivityHash": 1, "instanceId": "1", "mode": 4,
+                                 "modes": [7, 4], "isPrivate": False, "membershipType": 1},
+             "values": {name: stat(name) for name in ("assists", "completed", "deaths", "kills",
+                                                      "opponentsDefeated", "efficiency", "killsDeathsRatio",
+                                                      "killsDeathsAssists", "score", "activityDurationSeconds",
+                                                      "completionReason", "fireteamId", "startSeconds",
+                                                      "timePlayedSeconds", "playerCount", "teamScore")}}
+    body = json.dumps({"Response": {"activities": [entry] * page_size},
+                       "ErrorCode": 1, "ThrottleSeconds": 0, "ErrorStatus": "Success", "Message": "Ok"}).encode()
+    adapter = TypeAdapter(BungieResponse[DestinyActivityHistoryResults])
+    projection_adapter = TypeAdapter(BungieResponse[ActivityHistoryPage])
+
+    def two_pass() -> Any:
+        return DestinyActivityHistoryResults.model_validate(json.loads(body)["Response"])
+
+    def one_pass() -> Any:
+        return adapter.validate_json(body).Response
+
+    def projection() -> Any:
+        return projection_adapter.validate_json(body).Response
+
+    for name, parse in (("dict then model", two_pass), ("validate_json", one_pass), ("projection", projection)):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            parse()
+        print(f"{name:>15}: {(time.perf_counter() - start) / repeat * 1000:8.2f} ms per {page_size} activity page")
+
+
+def _parse_args(args: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the data retriever backends against replayed responses.")
+    parser.add_argument("--fixtures", type=Path, default=DEFAULT_FIXTURES)
+    parser.add_argument("--clan-id", type=int, default=4402352)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds of latency added to each response.")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Maximum random seconds added to the latency.")
+    parser.add_argument("--page-size", type=int, default=250, help="Activities per page for the parsing benchmark.")
+    return parser.parse_args(args)
+
+
+def main(args: Optional[list[str]] = None) -> None:
+    parsed = _parse_args(args)
+    benchmark_parsing(parsed.page_size, parsed.repeat)
+    asyncio.run(benchmark_backends(parsed.fixtures, parsed.clan_id, parsed.repeat,
+                                   ReplayBehaviour(latency=parsed.latency, jitter=parsed.jitter, seed=0)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,341 @@
+"""A local stand-in for the Bungie API.
+
+In record mode every request is forwarded to bungie.net and the response saved as a fixture file. In replay mode
+the fixtures are served back, optionally with added latency, jitter, throttling and injected errors, so the data
+retrievers can be exercised and load tested without network access.
+
+Point the retrievers at the server by setting `DESTINY_BUNGIE_NET_URL` (or calling
+`clan_stats.data._bungie_api.bungie_net.use_bungie_net_url`) to the server URL.
+
+Usage:
+    python tests_src/fake_bungie_api.py record --fixtures DIR --port 8765
+    python tests_src/fake_bungie_api.py replay --fixtures DIR --port 8765 --latency 0.1 --jitter 0.05
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import random
+import re
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional, Tuple, Collection, Self
+
+import aiohttp
+from aiohttp import web
+
+log = logging.getLogger(__name__)
+
+UPSTREAM_URL = "https://www.bungie.net"
+UPSTREAM_STATS_URL = "https://stats.bungie.net"
+
+# Query parameters that identify the caller rather than the request.
+_IGNORED_QUERY_PARAMETERS = {"api_key"}
+
+# Headers forwarded to bungie.net when recording.
+_FORWARDED_HEADERS = ("X-API-Key", "Authorization", "Content-Type")
+
+# Bungie's response body for errors raised by this server.
+_ERROR_STATUSES = {
+    404: (2102, "NotFound"),
+    500: (1, "UnhandledException"),
+    503: (5, "SystemDisabled"),
+}
+
+
+@dataclass(frozen=True)
+class FixtureKey:
+    method: str
+    path: str
+    query: Tuple[Tuple[str, str], ...]
+    body: str = ""  # the request body, e.g. the search terms of a POST search
+
+    @classmethod
+    async def for_request(cls, request: web.BaseRequest) -> Self:
+        # aiobungie builds some routes with a doubled slash, which bungie.net ignores.
+        path = re.sub(r"/+", "/", request.path.rstrip("/") + "/")
+        query = tuple(sorted((k, v)
+                             for k, v in request.query.items()
+                             if k.lower() not in _IGNORED_QUERY_PARAMETERS))
+        body = (await request.read()).decode() if request.can_read_body else ""
+        return cls(method=request.method.upper(), path=path.lower(), query=query, body=body)
+
+    def file_stem(self) -> str:
+        stem = self.method + "_" + re.sub(r"[^a-z0-9]+", "_", self.path).strip("_")
+        if len(self.query) > 0 or self.body != "":
+            digest = hashlib.sha1(json.dumps([self.query, self.body]).encode()).hexdigest()[:10]
+            stem += "__" + digest
+        return stem
+
+
+@dataclass
+class Fixture:
+    status: int
+    content_type: str
+    body: bytes
+
+
+class FixtureStore:
+    """Fixtures stored as one JSON file per request.
+
+    JSON bodies are stored inline so the fixtures stay readable and editable. Any other body (e.g. the zipped
+    manifest) is written to a sidecar file next to the JSON.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+
+    def get(self, key: FixtureKey) -> Optional[Fixture]:
+        path = self._path(key)
+        if not path.exists():
+            return None
+        with open(path, "r") as f:
+            stored = json.load(f)
+        if "body_file" in stored:
+            body = self.directory.joinpath(stored["body_file"]).read_bytes()
+        else:
+            body = json.dumps(stored["body"]).encode()
+        return Fixture(status=stored["status"], content_type=stored["content_type"], body=body)
+
+    def put(self, key: FixtureKey, fixture: Fixture) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        stored = {
+            "method": key.method,
+            "path": key.path,
+            "query": dict(key.query),
+            "request_body": key.body,
+            "status": fixture.status,
+            "content_type": fixture.content_type,
+        }
+        if fixture.content_type.startswith("application/json"):
+            stored["body"] = json.loads(fixture.body)
+        else:
+            body_file = key.file_stem() + ".body"
+            self.directory.joinpath(body_file).write_bytes(fixture.body)
+            stored["body_file"] = body_file
+        with open(self._path(key), "w") as f:
+            json.dump(stored, f, indent=2)
+
+    def _path(self, key: FixtureKey) -> Path:
+        return self.directory.joinpath(key.file_stem() + ".json")
+
+
+@dataclass
+class ReplayBehaviour:
+    latency: float = 0.0  # seconds added to every response
+    jitter: float = 0.0  # maximum random seconds added on top of latency
+    requests_per_second: Optional[float] = None  # requests beyond this rate are delayed
+    error_rate: float = 0.0  # fraction of requests answered with `error_status`
+    error_status: int = 503
+    error_paths: Collection[str] = field(default_factory=list)  # only inject errors for paths containing these
+    interrupt_downloads_after: Optional[int] = None  # drop the first download of each file after this many bytes
+    seed: Optional[int] = None
+
+
+class _Throttle:
+    """Spaces requests out to a maximum rate, as Bungie's throttling does to a busy client."""
+
+    def __init__(self, requests_per_second: Optional[float]):
+        self._interval = 1 / requests_per_second if requests_per_second else 0.0
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        if self._interval == 0.0:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self._interval
+        await asyncio.sleep(slot - now)
+
+
+class FakeBungieApi:
+
+    def __init__(self,
+                 store: FixtureStore,
+                 record: bool = False,
+                 behaviour: Optional[ReplayBehaviour] = None):
+        self.store = store
+        self.record = record
+        self.behaviour = behaviour if behaviour is not None else ReplayBehaviour()
+        self.request_count = 0
+        self.missing: list[FixtureKey] = []
+        self._random = random.Random(self.behaviour.seed)
+        self._throttle = _Throttle(self.behaviour.requests_per_second)
+        self._interrupted: set[FixtureKey] = set()
+        self._upstream: Optional[aiohttp.ClientSession] = None
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_route("*", "/{tail:.*}", self._handle)
+        app.on_cleanup.append(self._close_upstream)
+        return app
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        self.request_count += 1
+        key = await FixtureKey.for_request(request)
+
+        if self.record:
+            fixture = await self._record(request, key)
+        else:
+            await self._throttle.wait()
+            await self._delay()
+            if self._inject_error(key):
+                return _error_response(self.behaviour.error_status, "Injected error")
+            fixture = self.store.get(key)
+
+        if fixture is None:
+            log.warning("No fixture for %s %s %s", key.method, key.path, dict(key.query))
+            self.missing.append(key)
+            return _error_response(404, f"No fixture for {key.method} {key.path}")
+
+        if fixture.content_type.startswith("application/json") or fixture.status != 200:
+            return web.Response(status=fixture.status, body=fixture.body, content_type=fixture.content_type)
+        return await self._download(request, key, fixture)
+
+    async def _download(self, request: web.Request, key: FixtureKey, fixture: Fixture) -> web.StreamResponse:
+        # Files such as the zipped manifest support resuming with a Range request, as bungie.net's CDN does.
+        start = _range_start(request.headers.get("Range"))
+        if start >= len(fixture.body) > 0:
+            return web.Response(status=416, headers={"Content-Range": f"bytes */{len(fixture.body)}"})
+        body = fixture.body[start:]
+        response = web.StreamResponse(status=206 if start > 0 else 200)
+        if start > 0:
+            response.headers["Content-Range"] = f"bytes {start}-{len(fixture.body) - 1}/{len(fixture.body)}"
+        response.content_type = fixture.content_type
+        response.content_length = len(body)
+        await response.prepare(request)
+
+        interrupt_after = self.behaviour.interrupt_downloads_after
+        if interrupt_after is not None and key not in self._interrupted and interrupt_after < len(body):
+            self._interrupted.add(key)
+            await response.write(body[:interrupt_after])
+            log.info("Interrupting download of %s after %s bytes", key.path, interrupt_after)
+            assert request.transport is not None
+            request.transport.close()
+            return response
+
+        await response.write(body)
+        await response.write_eof()
+        return response
+
+    async def _delay(self) -> None:
+        delay = self.behaviour.latency + self._random.uniform(0, self.behaviour.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def _inject_error(self, key: FixtureKey) -> bool:
+        if self.behaviour.error_rate <= 0:
+            return False
+        if self.behaviour.error_paths and not any(p.lower() in key.path for p in self.behaviour.error_paths):
+            return False
+        return self._random.random() < self.behaviour.error_rate
+
+    async def _record(self, request: web.Request, key: FixtureKey) -> Fixture:
+        if self._upstream is None:
+            self._upstream = aiohttp.ClientSession()
+
+        upstream = UPSTREAM_STATS_URL if "/postgamecarnagereport/" in key.path else UPSTREAM_URL
+        headers = {h: request.headers[h] for h in _FORWARDED_HEADERS if h in request.headers}
+        async with self._upstream.request(request.method,
+                                          upstream + request.path_qs,
+                                          headers=headers,
+                                          data=await request.read()) as response:
+            fixture = Fixture(status=response.status,
+                              content_type=response.content_type,
+                              body=await response.read())
+        self.store.put(key, fixture)
+        log.info("Recorded %s %s (%s bytes)", key.method, key.path, len(fixture.body))
+        return fixture
+
+    async def _close_upstream(self, _: web.Application) -> None:
+        if self._upstream is not None:
+            await self._upstream.close()
+
+
+def _range_start(range_header: Optional[str]) -> int:
+    match = re.fullmatch(r"bytes=(\d+)-", range_header.strip()) if range_header is not None else None
+    return int(match.group(1)) if match else 0
+
+
+def _error_response(status: int, message: str) -> web.Response:
+    error_code, error_status = _ERROR_STATUSES.get(status, (1, "UnhandledException"))
+    return web.json_response(
+        {
+            "Response": None,
+            "ErrorCode": error_code,
+            "ThrottleSeconds": 0,
+            "ErrorStatus": error_status,
+            "Message": message,
+            "MessageData": {},
+        },
+        status=status)
+
+
+class RunningServer:
+    """Runs a `FakeBungieApi` on a local port for the duration of an `async with` block."""
+
+    def __init__(self, api: FakeBungieApi, host: str = "127.0.0.1", port: int = 0):
+        self.api = api
+        self._host = host
+        self._port = port
+        self._runner: Optional[web.AppRunner] = None
+        self.url = ""
+
+    async def __aenter__(self) -> Self:
+        self._runner = web.AppRunner(self.api.app())
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self._host, self._port)
+        await site.start()
+        _, port = self._runner.addresses[0][:2]
+        self.url = f"http://{self._host}:{port}"
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+
+def _parse_args(args: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Record or replay Bungie API responses.")
+    parser.add_argument("mode", choices=["record", "replay"])
+    parser.add_argument("--fixtures", type=Path, required=True, help="Directory holding the fixture files.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds of latency added to each response.")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Maximum random seconds added to the latency.")
+    parser.add_argument("--requests-per-second", type=float, default=None,
+                        help="Delay requests beyond this rate.")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="Fraction of requests to fail with --error-status.")
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--error-path", action="append", default=[], dest="error_paths",
+                        help="Only inject errors on paths containing this string. May be repeated.")
+    parser.add_argument("--seed", type=int, default=None)
+    return parser.parse_args(args)
+
+
+def main(args: Optional[list[str]] = None) -> None:
+    parsed = _parse_args(args)
+    logging.basicConfig(level=logging.INFO)
+    api = FakeBungieApi(
+        FixtureStore(parsed.fixtures),
+        record=parsed.mode == "record",
+        behaviour=ReplayBehaviour(
+            latency=parsed.latency,
+            jitter=parsed.jitter,
+            requests_per_second=parsed.requests_per_second,
+            error_rate=parsed.error_rate,
+            error_status=parsed.error_status,
+            error_paths=parsed.error_paths,
+            seed=parsed.seed))
+    print(f"Serving {parsed.mode} on http://{parsed.host}:{parsed.port}, "
+          f"set DESTINY_BUNGIE_NET_URL to use it.")
+    web.run_app(api.app(), host=parsed.host, port=parsed.port, print=None)
+
+
+if __name__ == "__main__":
+    main()